@@ -0,0 +1,191 @@
+"""Headless batch upload of classified files to Dalux.
+
+Reads a CSV manifest with one row per file:
+
+    path,projekt_sifra,tip,faza,lok,ime,datum,target_subfolder
+
+``projekt_sifra`` may differ per row; rows without it use ``--project``.
+Files are grouped by project, each project is resolved once and the
+groups are uploaded concurrently. A JSON report is printed or written to
+``--report``.
+
+With ``--dry-run`` nothing is uploaded and no file is read; the plan
+(original → new name → target path → folder id → action) is written
+instead, as CSV if ``--report`` ends in ``.csv``. With an API key the
+Dalux folders are resolved and existing files are checked too.
+``--diff-against`` compares the plan with a previously exported one.
+
+``--provision-folders`` first creates whatever folders of the project's
+structure template (see folder_templates) are missing in Dalux.
+
+Very large batches can be spread over worker processes with
+``--processes`` (see sharded_upload); ``--journal`` records uploaded files
+so a rerun skips them, and ``--rate-limit`` caps the requests per second
+of all workers together.
+
+    python batch_upload.py archive.csv --processes 8 --journal migration.db --rate-limit 50
+
+    DALUX_API_KEY=... python batch_upload.py manifest.csv --project 2024-017
+    python batch_upload.py manifest.csv --project 2024-017 --dry-run --report plan.csv
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from typing import Dict, List, Tuple
+
+import file_processing
+import sharded_upload
+import upload_plan
+from rate_limit import RateLimiter, set_rate_limiter
+
+
+MANIFEST_FIELDS = ("projekt_sifra", "tip", "faza", "lok", "ime", "datum", "target_subfolder")
+
+
+def load_manifest(path: str) -> Tuple[List[Dict], List[Dict]]:
+    """Read manifest rows into file entries; returns (entries, skipped rows)"""
+    entries, skipped = [], []
+    base_dir = os.path.dirname(os.path.abspath(path))
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for line_no, row in enumerate(csv.DictReader(f), start=2):
+            file_path = os.path.join(base_dir, (row.get("path") or "").strip())
+            if not row.get("path") or not os.path.isfile(file_path):
+                skipped.append({"line": line_no, "path": row.get("path"), "error": "File not found"})
+                continue
+            entry = file_processing.build_file_entry(os.path.basename(file_path))
+            entry['blob_path'] = file_path
+            for field in MANIFEST_FIELDS:
+                value = (row.get(field) or "").strip()
+                if value:
+                    entry[field] = value.replace(' ', '_')[:100] if field == "ime" else value
+            if not file_processing.is_file_complete(entry):
+                skipped.append({"line": line_no, "path": row["path"], "error": "Missing required fields"})
+                continue
+            entries.append(entry)
+    return entries, skipped
+
+
+def upload_files_by_project(api_key: str, files_by_project: Dict, base_url: str,
+                            max_concurrency: int, file_area_name: str = "",
+                            verify: bool = False, reupload_mismatched: bool = False,
+                            provision_folders: bool = False) -> Dict:
+    file_area_names = {number: file_area_name for number in files_by_project} if file_area_name else None
+    try:
+        from dalux_async import bulk_upload_multi_project_sync
+    except ImportError:
+        from dalux_api import DaluxUploadManager
+        manager = DaluxUploadManager(api_key, base_url=base_url, file_area_names=file_area_names)
+        return manager.bulk_upload_multi_project(files_by_project, verify=verify,
+                                                 reupload_mismatched=reupload_mismatched,
+                                                 provision_folders=provision_folders)
+    return bulk_upload_multi_project_sync(
+        api_key, files_by_project, max_concurrency=max_concurrency, base_url=base_url,
+        file_area_names=file_area_names, verify=verify,
+        reupload_mismatched=reupload_mismatched, provision_folders=provision_folders
+    )
+
+
+def write_plan(args, entries: List[Dict], skipped: List[Dict]) -> int:
+    resolvers = (None, None)
+    if args.api_key:
+        from dalux_api import DaluxUploadManager
+        file_area_names = {}
+        if args.file_area:
+            file_area_names = {file_processing.file_project(e, args.project): args.file_area for e in entries}
+        manager = DaluxUploadManager(args.api_key, base_url=args.base_url, file_area_names=file_area_names)
+        resolvers = upload_plan.dalux_resolvers(manager)
+    plan = upload_plan.build_plan(entries, args.project, *resolvers)
+
+    if args.diff_against:
+        with open(args.diff_against, encoding="utf-8") as f:
+            previous = upload_plan.load_plan(f.read())
+        report = json.dumps(upload_plan.diff_plans(previous, plan), ensure_ascii=False, indent=2)
+    elif args.report.endswith(".csv"):
+        report = upload_plan.plan_to_csv(plan)
+    else:
+        report = upload_plan.plan_to_json(plan)
+
+    if args.report == "-" or args.diff_against:
+        print(report)
+    else:
+        with open(args.report, "w", encoding="utf-8", newline="") as f:
+            f.write(report)
+    if skipped:
+        print(f"{len(skipped)} manifest rows skipped", file=sys.stderr)
+
+    summary = upload_plan.plan_summary(plan)
+    return 0 if not summary["skip"] and not summary["collide"] and not skipped else 1
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Upload a classified batch to Dalux")
+    parser.add_argument("manifest", help="CSV manifest of files and their metadata")
+    parser.add_argument("--project", default="", help="default project number for rows without one")
+    parser.add_argument("--api-key", default=os.environ.get("DALUX_API_KEY", ""))
+    parser.add_argument("--base-url", default="https://node2.field.dalux.com/service/api")
+    parser.add_argument("--max-concurrency", type=int, default=100)
+    parser.add_argument("--file-area", default="", help="file area name, default is the first one")
+    parser.add_argument("--verify", action="store_true",
+                        help="compare size/checksum of every upload with the remote file")
+    parser.add_argument("--reupload-mismatched", action="store_true",
+                        help="with --verify, upload mismatching files once more")
+    parser.add_argument("--provision-folders", action="store_true",
+                        help="create missing folders of the project's structure template first")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="worker processes; above 1 the batch is uploaded in shards")
+    parser.add_argument("--shard-by", choices=sharded_upload.SHARD_MODES, default="folder",
+                        help="with --processes, keep folders together or spread files by hash")
+    parser.add_argument("--journal", default="",
+                        help="SQLite journal of uploaded files; files already in it are skipped")
+    parser.add_argument("--rate-limit", type=float, default=0.0,
+                        help="max Dalux requests per second over all processes, 0 for no limit")
+    parser.add_argument("--dry-run", action="store_true", help="write the upload plan, upload nothing")
+    parser.add_argument("--diff-against", default="", help="with --dry-run, previous plan (CSV or JSON) to diff")
+    parser.add_argument("--report", default="-", help="JSON report file, '-' for stdout")
+    args = parser.parse_args(argv)
+
+    if not args.api_key and not args.dry_run:
+        parser.error("Dalux API key missing: pass --api-key or set DALUX_API_KEY")
+
+    entries, skipped = load_manifest(args.manifest)
+    if any(not file_processing.file_project(e, args.project) for e in entries):
+        parser.error("Some rows have no projekt_sifra: pass --project")
+
+    if args.dry_run:
+        return write_plan(args, entries, skipped)
+
+    if args.processes > 1 or args.journal:
+        results = sharded_upload.upload_sharded(
+            args.api_key, entries, args.project, args.base_url,
+            processes=args.processes, shard_by=args.shard_by,
+            max_concurrency=args.max_concurrency, file_area_name=args.file_area,
+            verify=args.verify or args.reupload_mismatched,
+            reupload_mismatched=args.reupload_mismatched,
+            provision_folders=args.provision_folders,
+            journal_path=args.journal, rate_limit=args.rate_limit
+        )
+    else:
+        if args.rate_limit > 0:
+            set_rate_limiter(RateLimiter(args.rate_limit))
+        files_by_project = file_processing.build_files_by_project(entries, args.project)
+        results = upload_files_by_project(args.api_key, files_by_project, args.base_url,
+                                          args.max_concurrency, args.file_area,
+                                          verify=args.verify or args.reupload_mismatched,
+                                          reupload_mismatched=args.reupload_mismatched,
+                                          provision_folders=args.provision_folders)
+    results["skipped"] = skipped
+
+    report = json.dumps(results, ensure_ascii=False, indent=2, default=str)
+    if args.report == "-":
+        print(report)
+    else:
+        with open(args.report, "w", encoding="utf-8") as f:
+            f.write(report)
+
+    return 0 if not results["failed"] and not skipped else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Cold-start timing of the Streamlit app.
+
+Each sample runs in a fresh interpreter and measures:
+
+- ``import_ms``: importing the modules the app script imports at start
+- ``first_paint_ms``: the first full script run (the start screen) via
+  streamlit's AppTest, when streamlit is installed
+
+It also reports which network modules were loaded by then; none of them
+should be, since Dalux modules are imported on first use.
+
+    python -m benchmarks.cold_start --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+
+APP_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          "streamlit_preimenovanje.py")
+
+# What the app script imports before drawing anything
+APP_MODULES = ("upload_progress", "upload_jobs", "file_processing", "upload_plan", "metrics",
+               "workspace_store", "code_registry", "dalux_cache")
+
+NETWORK_MODULES = ("requests", "aiohttp", "dalux_api", "dalux_async", "http.server")
+
+
+def sample() -> Dict:
+    """One measurement in the current (fresh) interpreter"""
+    import importlib
+    import time
+
+    started = time.perf_counter()
+    for name in APP_MODULES:
+        importlib.import_module(name)
+    result = {"import_ms": (time.perf_counter() - started) * 1000}
+
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        result["first_paint_ms"] = None
+    else:
+        started = time.perf_counter()
+        AppTest.from_file(APP_SCRIPT, default_timeout=60).run()
+        result["first_paint_ms"] = (time.perf_counter() - started) * 1000
+
+    result["network_modules_loaded"] = [name for name in NETWORK_MODULES if name in sys.modules]
+    return result
+
+
+def _summary(values: List[float]) -> Dict:
+    return {"median": statistics.median(values), "min": min(values), "max": max(values)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the app's cold start")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="-", help="JSON file, '-' for stdout")
+    # Internal: take one sample in this process and print it
+    parser.add_argument("--sample", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.sample:
+        print(json.dumps(sample()))
+        return
+
+    samples = []
+    for _ in range(args.repeat):
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.cold_start", "--sample"],
+            capture_output=True, text=True,
+            cwd=os.path.dirname(APP_SCRIPT)
+        )
+        if proc.returncode != 0:
+            raise SystemExit(proc.stderr.strip())
+        samples.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    paints = [s["first_paint_ms"] for s in samples if s["first_paint_ms"] is not None]
+    result = {
+        "case": "cold_start",
+        "samples": len(samples),
+        "import_ms": _summary([s["import_ms"] for s in samples]),
+        "first_paint_ms": _summary(paints) if paints else None,
+        "network_modules_loaded": sorted({name for s in samples for name in s["network_modules_loaded"]}),
+    }
+    report = json.dumps(result)
+    if args.output == "-":
+        print(report)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""Throughput benchmarks for the upload, export and ingestion paths.
+
+Every case runs in a fresh subprocess so peak RSS is measured per case.
+Uploads go to the local Dalux stub server (benchmarks.stub_server).
+Results are written as JSON lines, one object per case.
+
+The ``*_blobs`` cases keep contents in blob files on disk, as the app
+does, and stream them in chunks; ``zip_blobs`` also writes the archive
+to a temporary file. Their peak RSS should stay near a fixed overhead
+regardless of batch size (about 12,000 files make 2 GB). The ``*_large``
+cases do the same with a single ``--large-mb`` blob, run once instead of
+per batch size, so peak RSS must not grow with the largest file either:
+
+    python -m benchmarks.run_benchmarks --cases zip_blobs --sizes 1000,12000
+    python -m benchmarks.run_benchmarks --cases zip_large,upload_large --large-mb 400
+
+    python -m benchmarks.run_benchmarks --sizes 100,1000 --latency 0.01
+    python -m benchmarks.run_benchmarks --cases zip,ingest --output bench.jsonl
+"""
+import argparse
+import io
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, List
+
+from folder_templates import get_template, template_paths
+
+
+CASES = ("ingest", "zip", "zip_blobs", "upload_sync", "upload_async", "upload_blobs",
+         "upload_verify", "zip_large", "upload_large")
+PROJECT_NUMBER = "BENCH"
+FOLDER_PATHS = tuple(template_paths(get_template()))
+
+# (share of files, size in bytes) for a mixed batch of documents and photos
+SIZE_MIX = (
+    (0.70, 8 * 1024),
+    (0.25, 256 * 1024),
+    (0.05, 2 * 1024 * 1024),
+)
+
+
+def make_batch(file_count: int, seed: int = 42, blob_dir: str = "") -> List[Dict]:
+    """Synthetic batch of complete file entries with mixed sizes.
+
+    Files of the same size class share one content buffer, so a 10k batch
+    does not need gigabytes of RAM before the measured code even runs.
+    With ``blob_dir`` the buffers are written there as blob files and the
+    entries reference them by ``blob_path`` like workspace entries do.
+    """
+    rng = random.Random(seed)
+    contents = [(share, os.urandom(size)) for share, size in SIZE_MIX]
+    if blob_dir:
+        blobs = []
+        for index, (share, content) in enumerate(contents):
+            path = os.path.join(blob_dir, f"blob_{index}")
+            with open(path, "wb") as f:
+                f.write(content)
+            blobs.append((share, {'blob_path': path, 'size': len(content)}))
+        contents = blobs
+    paths = FOLDER_PATHS
+    files = []
+    for i in range(file_count):
+        roll = rng.random()
+        content = contents[-1][1]
+        for share, candidate in contents:
+            if roll < share:
+                content = candidate
+                break
+            roll -= share
+        files.append({
+            **({'content': content} if not blob_dir else content),
+            'original_name': f"dokument_{i:05d}.pdf",
+            'extension': "pdf",
+            'tip': "DOK",
+            'faza': "IZV",
+            'lok': "IZV",
+            'ime': f"dokument_{i:05d}",
+            'datum': '',
+            'target_subfolder': paths[i % len(paths)]
+        })
+    return files
+
+
+def make_large_file(blob_dir: str, size_mb: int) -> Dict:
+    """One complete entry backed by a ``size_mb`` blob, written 1 MB at a time"""
+    path = os.path.join(blob_dir, "blob_large")
+    chunk = os.urandom(1024 * 1024)
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(chunk)
+    return {
+        'blob_path': path,
+        'size': size_mb * 1024 * 1024,
+        'original_name': "arhiv.pdf",
+        'extension': "pdf",
+        'tip': "DOK",
+        'faza': "IZV",
+        'lok': "IZV",
+        'ime': "arhiv",
+        'datum': '',
+        'target_subfolder': FOLDER_PATHS[0]
+    }
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(case: str, file_count: int, base_url: str, large_mb: int = 400) -> Dict:
+    import file_processing
+
+    blob_dir = tempfile.mkdtemp(prefix="bench_blobs_") if case.endswith(("_blobs", "_large")) else ""
+    if case.endswith("_large"):
+        files = [make_large_file(blob_dir, large_mb)]
+        file_count = 1
+    else:
+        files = make_batch(file_count, blob_dir=blob_dir)
+    total_bytes = sum(f['size'] if blob_dir else len(f['content']) for f in files)
+    rss_before = peak_rss_mb()
+    extra = {}
+    if case == "ingest":
+        # The app's ingestion path: spool to the blob store, one metadata row per file
+        from workspace_store import WorkspaceStore
+        blob_dir = tempfile.mkdtemp(prefix="bench_workspace_")
+        store = WorkspaceStore(blob_dir)
+
+    started = time.perf_counter()
+    if case == "ingest":
+        stored = 0
+        for f in files:
+            entry = file_processing.build_file_entry(f['original_name'])
+            if store.add_file("bench", f['original_name'], io.BytesIO(f['content']), entry):
+                stored += 1
+        extra["stored"] = stored
+    elif case == "zip":
+        zip_buffer = file_processing.create_zip_with_structure(files, PROJECT_NUMBER)
+        extra["zip_bytes"] = zip_buffer.getbuffer().nbytes
+    elif case in ("zip_blobs", "zip_large"):
+        with tempfile.TemporaryFile(dir=blob_dir) as output:
+            file_processing.create_zip_with_structure(files, PROJECT_NUMBER, output=output)
+            extra["zip_bytes"] = output.seek(0, os.SEEK_END)
+    elif case in ("upload_sync", "upload_async", "upload_blobs", "upload_verify", "upload_large"):
+        files_dict = file_processing.build_files_dict(files, PROJECT_NUMBER)
+        if case == "upload_sync":
+            from dalux_api import DaluxUploadManager
+            manager = DaluxUploadManager("bench-key", base_url=base_url)
+            results = manager.bulk_upload_from_structure(PROJECT_NUMBER, files_dict)
+        else:
+            from dalux_async import bulk_upload_sync
+            verify = case == "upload_verify"
+            results = bulk_upload_sync("bench-key", PROJECT_NUMBER, files_dict,
+                                       base_url=base_url, verify=verify,
+                                       reupload_mismatched=verify)
+        extra["succeeded"] = results["success"]
+        extra["failed"] = results["failed"]
+        for key in ("verified", "mismatched", "reuploaded"):
+            if key in results:
+                extra[key] = results[key]
+    else:
+        raise ValueError(f"Unknown benchmark case: {case}")
+    elapsed = time.perf_counter() - started
+    if blob_dir:
+        shutil.rmtree(blob_dir, ignore_errors=True)
+
+    return {
+        "case": case,
+        "files": file_count,
+        "total_mb": total_bytes / (1024 * 1024),
+        "seconds": elapsed,
+        "files_per_s": file_count / elapsed if elapsed else None,
+        "mb_per_s": total_bytes / (1024 * 1024) / elapsed if elapsed else None,
+        "rss_before_mb": rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+        **extra,
+    }
+
+
+def _stub_call(base_url: str, path: str, method: str = "GET") -> Dict:
+    request = urllib.request.Request(f"{base_url}{path}", method=method)
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.loads(response.read() or b"{}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark upload, ZIP export and ingestion")
+    parser.add_argument("--sizes", default="100,1000,10000", help="comma separated batch sizes")
+    parser.add_argument("--cases", default=",".join(CASES))
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--bandwidth", type=float, default=None, help="stub upload bytes per second")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--truncate-rate", type=float, default=0.0,
+                        help="fraction of uploads the stub stores truncated")
+    parser.add_argument("--large-mb", type=int, default=400, help="blob size of the *_large cases")
+    parser.add_argument("--output", default="-", help="JSON lines file, '-' for stdout")
+    # Internal: run one case in this process and print its result
+    parser.add_argument("--single", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", default="", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        case, file_count = args.single.split(":")
+        print(json.dumps(run_case(case, int(file_count), args.base_url, args.large_mb)))
+        return
+
+    from benchmarks.stub_server import start_stub_server
+
+    server, _, base_url = start_stub_server(
+        latency=args.latency, bandwidth=args.bandwidth,
+        error_rate=args.error_rate, throttle_rate=args.throttle_rate, seed=0,
+        projects=(PROJECT_NUMBER,), truncate_rate=args.truncate_rate
+    )
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        for index, file_count in enumerate(int(size) for size in args.sizes.split(",")):
+            for case in args.cases.split(","):
+                if case.endswith("_large") and index > 0:
+                    continue
+                _stub_call(base_url, "/_reset", method="POST")
+                proc = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.run_benchmarks",
+                     "--single", f"{case}:{file_count}", "--base-url", base_url,
+                     "--large-mb", str(args.large_mb)],
+                    capture_output=True, text=True
+                )
+                if proc.returncode != 0:
+                    result = {"case": case, "files": file_count,
+                              "error": proc.stderr.strip().splitlines()[-1:]}
+                else:
+                    result = json.loads(proc.stdout.strip().splitlines()[-1])
+                result["api"] = _stub_call(base_url, "/_stats")
+                result["stub"] = {
+                    "latency": args.latency, "bandwidth": args.bandwidth,
+                    "error_rate": args.error_rate, "throttle_rate": args.throttle_rate,
+                    "truncate_rate": args.truncate_rate
+                }
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+    finally:
+        server.shutdown()
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Throughput of the sharded multi-process upload versus worker count.
+
+Starts ``--stubs`` stub servers as separate processes (one in-process
+stub would itself be capped by its GIL), builds a blob-backed batch like
+the ``*_blobs`` cases and uploads it with 1, 2, 4, ... worker processes.
+Every run uploads the same batch to the same servers, so the speedup over
+one process shows how close to linear the client side scales.
+
+    python -m benchmarks.sharded_scaling --files 5000 --processes 1,2,4,8 --latency 0.01
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, List
+
+from benchmarks.run_benchmarks import PROJECT_NUMBER, make_batch
+
+
+def start_stubs(count: int, stub_args: List[str]) -> List[subprocess.Popen]:
+    procs = []
+    for _ in range(count):
+        procs.append(subprocess.Popen(
+            [sys.executable, "-u", "-m", "benchmarks.stub_server", "--port", "0", *stub_args],
+            stdout=subprocess.PIPE, text=True
+        ))
+    return procs
+
+
+def stub_url(proc: subprocess.Popen) -> str:
+    # "Dalux stub listening on http://127.0.0.1:PORT"
+    return proc.stdout.readline().strip().rsplit(" ", 1)[-1]
+
+
+def _stub_call(base_url: str, path: str, method: str = "GET") -> Dict:
+    request = urllib.request.Request(f"{base_url}{path}", method=method)
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.loads(response.read() or b"{}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sharded multi-process uploads")
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--processes", default="1,2,4", help="comma separated worker counts")
+    parser.add_argument("--stubs", type=int, default=0, help="stub server processes, default the largest worker count")
+    parser.add_argument("--shard-by", default="folder")
+    parser.add_argument("--max-concurrency", type=int, default=32, help="per worker")
+    parser.add_argument("--verify", action="store_true")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--bandwidth", type=float, default=None)
+    parser.add_argument("--output", default="-", help="JSON lines file, '-' for stdout")
+    args = parser.parse_args()
+
+    from sharded_upload import upload_sharded
+
+    counts = [int(count) for count in args.processes.split(",")]
+    stub_args = ["--latency", str(args.latency)]
+    if args.bandwidth:
+        stub_args += ["--bandwidth", str(args.bandwidth)]
+    stubs = start_stubs(args.stubs or max(counts), stub_args)
+    blob_dir = tempfile.mkdtemp(prefix="bench_blobs_")
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        urls = [stub_url(proc) for proc in stubs]
+        files = make_batch(args.files, blob_dir=blob_dir)
+        total_mb = sum(f['size'] for f in files) / (1024 * 1024)
+        baseline = None
+        for processes in counts:
+            for url in urls:
+                _stub_call(url, "/_reset", method="POST")
+            started = time.perf_counter()
+            results = upload_sharded(
+                "bench-key", files, PROJECT_NUMBER, urls, processes=processes,
+                shard_by=args.shard_by, max_concurrency=args.max_concurrency,
+                verify=args.verify
+            )
+            elapsed = time.perf_counter() - started
+            files_per_s = args.files / elapsed
+            if baseline is None:
+                # Per-process throughput of the first (smallest) run
+                baseline = files_per_s / processes
+            stats = [_stub_call(url, "/_stats") for url in urls]
+            out.write(json.dumps({
+                "case": "upload_sharded",
+                "processes": processes,
+                "files": args.files,
+                "total_mb": total_mb,
+                "seconds": elapsed,
+                "files_per_s": files_per_s,
+                "mb_per_s": total_mb / elapsed,
+                "speedup": files_per_s / baseline,
+                "efficiency": files_per_s / baseline / processes,
+                "succeeded": results["success"],
+                "failed": results["failed"],
+                "shards": len(results["shards"]),
+                "api_calls": sum(s["total_calls"] for s in stats),
+                "stubs": len(urls),
+                "cpu_count": os.cpu_count(),
+            }) + "\n")
+            out.flush()
+    finally:
+        for proc in stubs:
+            proc.terminate()
+            proc.wait()
+        shutil.rmtree(blob_dir, ignore_errors=True)
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""Local stand-in for the Dalux endpoints used by DaluxAPIClient.
+
+Serves the project, file area, folder listing and creation, folder file
+listing, upload slot, upload and finalize endpoints with configurable
+latency, bandwidth, error rate and 429 injection. ``truncate_rate``
+stores a fraction of uploads with their second half missing, to exercise
+upload verification; ``empty_tree`` starts without folders, to exercise
+provisioning. Call counts per endpoint are available at ``GET /_stats``
+and are cleared with ``POST /_reset``.
+
+    python -m benchmarks.stub_server --port 8765 --latency 0.02
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from folder_templates import MAPNA_STRUKTURA, template_paths
+
+
+PROJECT_ID = "stub-project"
+FILE_AREA_ID = "stub-file-area"
+
+ROUTES = [
+    ("GET", re.compile(r"^/5\.1/projects$"), "projects"),
+    ("GET", re.compile(r"^/5\.1/projects/[^/]+/file_areas$"), "file_areas"),
+    ("GET", re.compile(r"^/5\.1/projects/[^/]+/file_areas/[^/]+/folders$"), "folders"),
+    ("POST", re.compile(r"^/5\.1/projects/[^/]+/file_areas/[^/]+/folders$"), "create_folder"),
+    ("GET", re.compile(r"^/5\.1/projects/[^/]+/file_areas/[^/]+/files$"), "files"),
+    ("POST", re.compile(r"^/1\.0/projects/[^/]+/file_areas/[^/]+/upload$"), "upload_slot"),
+    ("POST", re.compile(r"^/1\.0/projects/[^/]+/file_areas/[^/]+/upload/(?P<guid>[^/]+)$"), "upload"),
+    ("POST", re.compile(r"^/2\.0/projects/[^/]+/file_areas/[^/]+/upload/(?P<guid>[^/]+)/finalize$"), "finalize"),
+]
+
+
+def build_folders(structure: Dict) -> List[Dict]:
+    """Flatten a folder structure template into Dalux-style folder items"""
+    items = []
+    ids = {}
+    for path in template_paths(structure):
+        parent_path, _, name = path.rpartition("/")
+        ids[path] = f"folder-{len(items)}"
+        folder_data = {"folderId": ids[path], "folderName": name}
+        if parent_path:
+            folder_data["parentFolderId"] = ids[parent_path]
+        items.append({"data": folder_data})
+    return items
+
+
+class StubState:
+    def __init__(self, latency: float = 0.0, bandwidth: Optional[float] = None,
+                 error_rate: float = 0.0, throttle_rate: float = 0.0,
+                 projects: Tuple[str, ...] = ("BENCH",), seed: Optional[int] = None,
+                 truncate_rate: float = 0.0, empty_tree: bool = False):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.truncate_rate = truncate_rate
+        self.projects = projects
+        self.random = random.Random(seed)
+        self.folders = [] if empty_tree else build_folders(MAPNA_STRUKTURA)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.calls = Counter()
+            self.errors = Counter()
+            self.bytes_received = 0
+            self.uploads: Dict[str, bytes] = {}
+            self.truncated = 0
+            self.finalized: List[Dict] = []
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                "calls": dict(self.calls),
+                "errors": dict(self.errors),
+                "total_calls": sum(self.calls.values()),
+                "bytes_received": self.bytes_received,
+                "finalized": len(self.finalized),
+                "truncated": self.truncated,
+            }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes on a keep-alive connection;
+    # with Nagle on, the body waits for the client's delayed ACK (~40 ms)
+    disable_nagle_algorithm = True
+    state: StubState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict, headers: Optional[Dict] = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        received = 0
+        chunks = []
+        started = time.monotonic()
+        while received < length:
+            chunk = self.rfile.read(min(256 * 1024, length - received))
+            if not chunk:
+                break
+            received += len(chunk)
+            chunks.append(chunk)
+            if self.state.bandwidth:
+                # Throttle to the configured bytes per second
+                expected = received / self.state.bandwidth
+                elapsed = time.monotonic() - started
+                if expected > elapsed:
+                    time.sleep(expected - elapsed)
+        return b"".join(chunks)
+
+    def _dispatch(self, method: str):
+        path = self.path.split("?", 1)[0]
+
+        if method == "GET" and path == "/_stats":
+            return self._send_json(200, self.state.stats())
+        if method == "POST" and path == "/_reset":
+            self.state.reset()
+            return self._send_json(200, {})
+
+        for route_method, pattern, name in ROUTES:
+            match = pattern.match(path)
+            if route_method == method and match:
+                break
+        else:
+            return self._send_json(404, {"message": f"No stub route for {method} {path}"})
+
+        body = self._read_body() if method == "POST" else b""
+        state = self.state
+        with state.lock:
+            state.calls[name] += 1
+            throttled = state.random.random() < state.throttle_rate
+            failed = not throttled and state.random.random() < state.error_rate
+            if throttled:
+                state.errors[f"{name}:429"] += 1
+            elif failed:
+                state.errors[f"{name}:500"] += 1
+
+        if state.latency:
+            time.sleep(state.latency)
+        if throttled:
+            return self._send_json(429, {"message": "Too many requests"}, {"Retry-After": "1"})
+        if failed:
+            return self._send_json(500, {"message": "Injected error"})
+
+        return getattr(self, f"_handle_{name}")(match, body)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _handle_projects(self, match, body):
+        items = [
+            {"data": {"projectId": f"{PROJECT_ID}-{number}", "number": number,
+                      "projectName": f"Stub projekt {number}"}}
+            for number in self.state.projects
+        ]
+        self._send_json(200, {"items": items})
+
+    def _handle_file_areas(self, match, body):
+        self._send_json(200, {"items": [
+            {"data": {"fileAreaId": FILE_AREA_ID, "fileAreaName": "Dokumenti"}}
+        ]})
+
+    def _handle_folders(self, match, body):
+        with self.state.lock:
+            items = list(self.state.folders)
+        self._send_json(200, {"items": items})
+
+    def _handle_create_folder(self, match, body):
+        payload = json.loads(body or b"{}")
+        name = payload.get("folderName")
+        parent_id = payload.get("parentFolderId")
+        with self.state.lock:
+            ids = {folder["data"]["folderId"] for folder in self.state.folders}
+            if not name or (parent_id and parent_id not in ids):
+                return self._send_json(400, {"message": "Invalid folder name or parent"})
+            for folder in self.state.folders:
+                data = folder["data"]
+                if data["folderName"] == name and data.get("parentFolderId") == parent_id:
+                    return self._send_json(409, {"message": "Folder already exists"})
+            folder_data = {"folderId": f"folder-{uuid.uuid4().hex[:8]}", "folderName": name}
+            if parent_id:
+                folder_data["parentFolderId"] = parent_id
+            self.state.folders.append({"data": folder_data})
+        self._send_json(201, {"data": folder_data})
+
+    def _handle_files(self, match, body):
+        folder_id = parse_qs(urlsplit(self.path).query).get("folderId", [None])[0]
+        with self.state.lock:
+            items = [
+                {"data": file_data} for file_data in self.state.finalized
+                if folder_id is None or file_data["folderId"] == folder_id
+            ]
+        self._send_json(200, {"items": items})
+
+    def _handle_upload_slot(self, match, body):
+        guid = uuid.uuid4().hex
+        with self.state.lock:
+            self.state.uploads[guid] = b""
+        self._send_json(200, {"data": {"uploadGuid": guid}})
+
+    def _handle_upload(self, match, body):
+        guid = match.group("guid")
+        with self.state.lock:
+            if guid not in self.state.uploads:
+                return self._send_json(404, {"message": "Unknown upload"})
+            if body and self.state.random.random() < self.state.truncate_rate:
+                self.state.truncated += 1
+                body = body[:len(body) // 2]
+            self.state.uploads[guid] += body
+            self.state.bytes_received += len(body)
+        self._send_json(200, {})
+
+    def _handle_finalize(self, match, body):
+        guid = match.group("guid")
+        payload = json.loads(body or b"{}")
+        with self.state.lock:
+            content = self.state.uploads.pop(guid, None)
+            if content is None:
+                return self._send_json(404, {"message": "Unknown upload"})
+            file_data = {
+                "fileId": uuid.uuid4().hex,
+                "fileName": payload.get("fileName"),
+                "folderId": payload.get("folderId"),
+                "fileSize": len(content),
+                "sha256": hashlib.sha256(content).hexdigest(),
+            }
+            self.state.finalized.append(file_data)
+        self._send_json(200, {"data": file_data})
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0,
+                      **state_options) -> Tuple[ThreadingHTTPServer, StubState, str]:
+    """Start the stub server on a background thread.
+
+    Returns the server, its state and the base URL to pass to the client.
+    """
+    state = StubState(**state_options)
+    handler = type("BoundStubHandler", (StubHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://{host}:{server.server_address[1]}"
+    return server, state, base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Dalux stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--bandwidth", type=float, default=None, help="upload bytes per second")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of calls answered with 429")
+    parser.add_argument("--truncate-rate", type=float, default=0.0, help="fraction of uploads stored truncated")
+    parser.add_argument("--empty-tree", action="store_true", help="start without any folders")
+    args = parser.parse_args()
+
+    server, _, base_url = start_stub_server(
+        args.host, args.port, latency=args.latency, bandwidth=args.bandwidth,
+        error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+        truncate_rate=args.truncate_rate, empty_tree=args.empty_tree
+    )
+    print(f"Dalux stub listening on {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
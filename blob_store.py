@@ -0,0 +1,144 @@
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO, Iterator, Optional, Tuple, Union
+
+
+class BlobStore:
+    """Content-addressed file store for uploaded file contents.
+
+    Contents are spooled to disk in chunks while hashing, so a blob is never
+    held in memory as a whole. The blob id is the SHA-256 of the content,
+    which also deduplicates identical files across workspaces.
+    """
+
+    def __init__(self, root: str, chunk_size: int = 1024 * 1024):
+        self.root = root
+        self.chunk_size = chunk_size
+        os.makedirs(os.path.join(root, "tmp"), exist_ok=True)
+
+    def path(self, blob_id: str) -> str:
+        return os.path.join(self.root, blob_id[:2], blob_id)
+
+    def exists(self, blob_id: str) -> bool:
+        return os.path.exists(self.path(blob_id))
+
+    def put_stream(self, stream: BinaryIO) -> Tuple[str, int]:
+        """Spool ``stream`` to disk and return ``(blob_id, size)``."""
+        tmp_path, blob_id, size = self.spool(stream)
+        self.commit(tmp_path, blob_id)
+        return blob_id, size
+
+    def spool(self, stream: BinaryIO) -> Tuple[str, str, int]:
+        """Write ``stream`` to a temporary file; returns ``(tmp_path, blob_id, size)``.
+
+        The blob only becomes visible with ``commit`` (or is dropped with
+        ``discard``), so a caller can make that step atomic with its own
+        bookkeeping.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.root, "tmp"))
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                while True:
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            self.discard(tmp_path)
+            raise
+        return tmp_path, digest.hexdigest(), size
+
+    def commit(self, tmp_path: str, blob_id: str):
+        """Move a spooled file into place, unless the blob already exists"""
+        target = self.path(blob_id)
+        if os.path.exists(target):
+            self.discard(tmp_path)
+            return
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(tmp_path, target)
+
+    def discard(self, tmp_path: str):
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+
+    def put_bytes(self, content: bytes) -> Tuple[str, int]:
+        blob_id = hashlib.sha256(content).hexdigest()
+        target = self.path(blob_id)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.root, "tmp"))
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(content)
+            os.replace(tmp_path, target)
+        return blob_id, len(content)
+
+    def open_reader(self, blob_id: str) -> "BlobReader":
+        return BlobReader(self.path(blob_id))
+
+    def read(self, blob_id: str) -> bytes:
+        with open(self.path(blob_id), "rb") as f:
+            return f.read()
+
+    def delete(self, blob_id: str):
+        try:
+            os.remove(self.path(blob_id))
+        except FileNotFoundError:
+            pass
+
+
+class BlobReader:
+    """File content that stands in for ``bytes`` in the upload and ZIP paths.
+
+    It only knows its path and size; the file is opened only while its
+    chunks are iterated (see ``iter_chunks``), so a batch of thousands of
+    files holds neither their bytes nor open file descriptors. Reading goes
+    through a fixed-size buffer, so memory does not grow with the largest
+    file.
+    """
+
+    def __init__(self, path: str, size: Optional[int] = None):
+        self.path = path
+        self.size = os.path.getsize(path) if size is None else size
+
+    def __len__(self) -> int:
+        return self.size
+
+
+Content = Union[bytes, BlobReader]
+
+
+def iter_chunks(content: Content, chunk_size: int,
+                buffer: Optional[bytearray] = None) -> Iterator[Union[bytes, memoryview]]:
+    """Consecutive chunks of ``content``.
+
+    In-memory bytes are sliced without copying. A BlobReader is read
+    ``chunk_size`` bytes at a time; with ``buffer`` it is read into that
+    buffer and each chunk is only valid until the next one is requested,
+    which suits consumers that write each chunk out before asking for more.
+    """
+    if not isinstance(content, BlobReader):
+        view = memoryview(content)
+        for start in range(0, len(view), chunk_size):
+            yield view[start:start + chunk_size]
+        return
+
+    with open(content.path, "rb", buffering=0) as f:
+        if buffer is None:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+        view = memoryview(buffer)[:chunk_size]
+        while True:
+            read = f.readinto(view)
+            if not read:
+                return
+            yield view[:read]
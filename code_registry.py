@@ -0,0 +1,131 @@
+import os
+import sqlite3
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+
+
+REGISTRY_PATH = os.path.join(os.environ.get("WORKSPACE_DIR", ".workspace"), "codes.db")
+
+# Built-in codes per dictionary; codes added at runtime are persisted on top
+DEFAULT_CODES = {
+    "TIP_OPTIONS": {
+        "NAC": "Načrt", "DOK": "Dokument", "FOT": "Fotografija", "SIT": "Situacija",
+        "PRO": "Projekt", "DOP": "Dopis", "POR": "Poročilo", "PON": "Ponudba",
+        "POG": "Pogodba", "NAR": "Naročilo", "RAC": "Račun", "KOI": "Kontrola",
+        "TER": "Terminski plan", "SPE": "Specifikacija", "EVD": "Evidenca"
+    },
+    "FAZA_OPTIONS": {
+        "PON": "Ponudba", "PRO": "Projektiranje", "PGD": "PGD",
+        "PZI": "PZI", "PID": "PID", "IZV": "Izvedba",
+        "ZAK": "Zaključek", "GAR": "Garancija", "SPL": "Splošno"
+    },
+    "LOK_OPTIONS": {
+        "NAR": "Naročnik", "IZV": "Izvajalec", "NAD": "Nadzornik",
+        "PRO": "Projektant", "PDI": "Podizvajalec", "DOB": "Dobavitelj",
+        "SKO": "Ostalo"
+    },
+}
+
+# File entry field filled from each code dictionary
+CODE_KINDS = (("tip", "TIP_OPTIONS"), ("faza", "FAZA_OPTIONS"), ("lok", "LOK_OPTIONS"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS codes (
+    kind TEXT NOT NULL,
+    code TEXT NOT NULL,
+    description TEXT NOT NULL,
+    added_at REAL NOT NULL,
+    PRIMARY KEY (kind, code)
+);
+CREATE TABLE IF NOT EXISTS registry_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+class CodeSnapshot:
+    """Immutable view of all code dictionaries at one registry version.
+
+    ``option_lists`` are the selectbox options (with the empty choice
+    first) and ``index_maps`` map a code to its index in that list.
+    """
+
+    def __init__(self, version: int, codes: Dict[str, Dict[str, str]]):
+        self.version = version
+        self.options: Mapping[str, Mapping[str, str]] = MappingProxyType({
+            kind: MappingProxyType(dict(entries)) for kind, entries in codes.items()
+        })
+        self.option_lists: Mapping[str, Tuple[str, ...]] = MappingProxyType({
+            kind: ("",) + tuple(entries) for kind, entries in codes.items()
+        })
+        self.index_maps: Mapping[str, Mapping[str, int]] = MappingProxyType({
+            kind: MappingProxyType({code: i for i, code in enumerate(options) if code})
+            for kind, options in self.option_lists.items()
+        })
+
+    def index_of(self, kind: str, code: str) -> int:
+        """Selectbox index of ``code``, 0 (the empty choice) if unknown"""
+        return self.index_maps[kind].get(code, 0)
+
+
+class CodeRegistry:
+    """Process-wide, persisted TIP/FAZA/LOK code dictionaries.
+
+    The registry is loaded once and shared read-only by all sessions via
+    ``snapshot()``. Adding a code persists it, bumps the version and
+    builds a new snapshot; existing snapshots are never mutated.
+    """
+
+    def __init__(self, path: str = REGISTRY_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+        self._snapshot = self._load()
+
+    def _load(self) -> CodeSnapshot:
+        codes = {kind: dict(entries) for kind, entries in DEFAULT_CODES.items()}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT kind, code, description FROM codes ORDER BY added_at, rowid"
+            ).fetchall()
+            version = self._conn.execute(
+                "SELECT value FROM registry_meta WHERE key = 'version'"
+            ).fetchone()
+        for kind, code, description in rows:
+            codes.setdefault(kind, {})[code] = description
+        return CodeSnapshot(version[0] if version else 0, codes)
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    def snapshot(self) -> CodeSnapshot:
+        return self._snapshot
+
+    def add_code(self, kind: str, code: str, description: str) -> Optional[CodeSnapshot]:
+        """Persist a new code; returns the new snapshot, or None if it already exists"""
+        with self._lock:
+            current = self._snapshot
+            if kind not in current.options:
+                raise ValueError(f"Unknown code dictionary: {kind}")
+            if code in current.options[kind]:
+                return None
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO codes (kind, code, description, added_at) VALUES (?, ?, ?, ?)",
+                    (kind, code, description, time.time())
+                )
+                self._conn.execute(
+                    "INSERT INTO registry_meta (key, value) VALUES ('version', ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                    (current.version + 1,)
+                )
+            codes = {k: dict(v) for k, v in current.options.items()}
+            codes[kind][code] = description
+            self._snapshot = CodeSnapshot(current.version + 1, codes)
+            return self._snapshot
@@ -1,25 +1,83 @@
 import requests
 import json
-from typing import Dict, List, Optional, Tuple
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
 import io
+from concurrent.futures import ThreadPoolExecutor
+
+from blob_store import Content
+from dalux_cache import DaluxDiscoveryCache, get_discovery_cache, match_folder
+from dalux_common import (
+    DEFAULT_BASE_URL, LISTING_ATTEMPTS, RETRY_STATUSES, FolderProvisioning, UploadManagerBase,
+    file_contents, folder_not_found, new_tracker, reupload_failed, retry_delay
+)
+import folder_templates
+from metrics import get_metrics
+from rate_limit import get_rate_limiter
+from upload_verify import UploadVerifier, mark_mismatches
+from upload_progress import (
+    MultiProjectProgress, ProgressCallback, ProgressReader, UploadProgressTracker,
+    failed_project_results, merge_project_results
+)
 
 
 class DaluxAPIClient:
-    def __init__(self, api_key: str, base_url: str = "https://node2.field.dalux.com/service/api"):
+    """Blocking Dalux client.
+
+    Requests go through one ``requests.Session`` so connections are kept
+    alive and reused, up to ``max_connections`` of them (the multi-project
+    upload shares a client between threads). Each request first takes a
+    slot from the process rate limiter, if one is configured.
+    """
+
+    def __init__(self, api_key: str, base_url: str = DEFAULT_BASE_URL,
+                 max_retries: int = 3, metrics=None, max_connections: int = 16,
+                 rate_limiter=None):
         self.api_key = api_key
         self.base_url = base_url
+        self.max_retries = max_retries
+        self.metrics = metrics or get_metrics()
+        self.rate_limiter = rate_limiter or get_rate_limiter()
         self.headers = {
             "X-API-KEY": api_key,
             "Accept": "application/json"
         }
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=max_connections,
+                                                pool_maxsize=max_connections)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+    
+    def _send(self, endpoint: str, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request, retrying on 429/503 and timing it per endpoint"""
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.wait()
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException:
+                self.metrics.observe("dalux_request_seconds", time.perf_counter() - started,
+                                     endpoint=endpoint, status="error")
+                raise
+            self.metrics.observe("dalux_request_seconds", time.perf_counter() - started,
+                                 endpoint=endpoint, status=response.status_code)
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                break
+            self.metrics.inc("dalux_retries_total", endpoint=endpoint)
+            time.sleep(retry_delay(response.headers.get("Retry-After"), attempt))
+        
+        response.raise_for_status()
+        return response
     
     def get_all_projects(self) -> List[Dict]:
-        response = requests.get(
+        response = self._send(
+            "projects", "GET",
             f"{self.base_url}/5.1/projects",
             headers=self.headers,
             timeout=30
         )
-        response.raise_for_status()
         data = response.json()
 
         # ⬇️ SAMO projekti ki imajo data.number
@@ -42,12 +100,12 @@ class DaluxAPIClient:
     
     def get_file_areas(self, project_id: str) -> List[Dict]:
         try:
-            response = requests.get(
+            response = self._send(
+                "file_areas", "GET",
                 f"{self.base_url}/5.1/projects/{project_id}/file_areas",
                 headers=self.headers,
                 timeout=30
             )
-            response.raise_for_status()
             data = response.json()
             return data.get("items", [])
         except requests.RequestException as e:
@@ -55,53 +113,83 @@ class DaluxAPIClient:
     
     def get_folders(self, project_id: str, file_area_id: str) -> List[Dict]:
         try:
-            response = requests.get(
+            response = self._send(
+                "folders", "GET",
                 f"{self.base_url}/5.1/projects/{project_id}/file_areas/{file_area_id}/folders",
                 headers=self.headers,
                 timeout=30
             )
-            response.raise_for_status()
             data = response.json()
             return data.get("items", [])
         except requests.RequestException as e:
             raise Exception(f"Failed to get folders: {str(e)}")
     
+    def get_folder_files(self, project_id: str, file_area_id: str, folder_id: str) -> List[Dict]:
+        try:
+            response = self._send(
+                "files", "GET",
+                f"{self.base_url}/5.1/projects/{project_id}/file_areas/{file_area_id}/files",
+                headers=self.headers,
+                params={"folderId": folder_id},
+                timeout=30
+            )
+            data = response.json()
+            return data.get("items", [])
+        except requests.RequestException as e:
+            raise Exception(f"Failed to get folder files: {str(e)}")
+    
+    def create_folder(self, project_id: str, file_area_id: str, folder_name: str,
+                      parent_folder_id: Optional[str] = None) -> Dict:
+        payload = {"folderName": folder_name}
+        if parent_folder_id:
+            payload["parentFolderId"] = parent_folder_id
+        try:
+            response = self._send(
+                "create_folder", "POST",
+                f"{self.base_url}/5.1/projects/{project_id}/file_areas/{file_area_id}/folders",
+                headers={
+                    **self.headers,
+                    "Content-Type": "application/json"
+                },
+                json=payload,
+                timeout=30
+            )
+            return response.json()["data"]
+        except requests.RequestException as e:
+            raise Exception(f"Failed to create folder {folder_name}: {str(e)}")
+    
     def get_folder_by_path(self, project_id: str, file_area_id: str, folder_path: str) -> Optional[Dict]:
         folders = self.get_folders(project_id, file_area_id)
-        
-
-        target_name = folder_path.split('/')[-1]
-
-        for folder in folders:
-            folder_data = folder.get("data", {})
-            # LOOK HERE: We changed "name" to "folderName"
-            if folder_data.get("folderName") == target_name:
-                return folder_data
-                
-        return None
+        return match_folder(folders, folder_path)
     
     def create_upload_slot(self, project_id: str, file_area_id: str) -> str:
         try:
-            response = requests.post(
+            response = self._send(
+                "upload_slot", "POST",
                 f"{self.base_url}/1.0/projects/{project_id}/file_areas/{file_area_id}/upload",
                 headers=self.headers,
                 timeout=30
             )
-            response.raise_for_status()
             data = response.json()
             return data["data"]["uploadGuid"]
         except requests.RequestException as e:
             raise Exception(f"Failed to create upload slot: {str(e)}")
     
     def upload_file_content(self, project_id: str, file_area_id: str, 
-                           upload_guid: str, file_content: bytes, 
-                           filename: str) -> bool:
+                           upload_guid: str, file_content: Content, 
+                           filename: str,
+                           on_chunk: Optional[Callable[[int], None]] = None,
+                           on_digest: Optional[Callable[[str], None]] = None) -> bool:
 
         try:
             file_size = len(file_content)
-            
+            body = file_content
+            if on_chunk or on_digest or not isinstance(file_content, bytes):
+                # Streams the content in chunks, blob files included
+                body = ProgressReader(file_content, on_chunk, on_digest=on_digest)
 
-            response = requests.post(
+            self._send(
+                "upload", "POST",
                 f"{self.base_url}/1.0/projects/{project_id}/file_areas/{file_area_id}/upload/{upload_guid}",
                 headers={
                     **self.headers,
@@ -109,10 +197,10 @@ class DaluxAPIClient:
                     "Content-Range": f"bytes 0-{file_size-1}/{file_size}",
                     "Content-Type": "application/octet-stream"
                 },
-                data=file_content,
+                data=body,
                 timeout=60
             )
-            response.raise_for_status()
+            self.metrics.inc("dalux_upload_bytes_total", file_size)
             return True
         except requests.RequestException as e:
             raise Exception(f"Failed to upload file content: {str(e)}")
@@ -122,7 +210,8 @@ class DaluxAPIClient:
                        folder_id: str, file_type: str = "document") -> Dict:
 
         try:
-            response = requests.post(
+            response = self._send(
+                "finalize", "POST",
                 f"{self.base_url}/2.0/projects/{project_id}/file_areas/{file_area_id}/upload/{upload_guid}/finalize",
                 headers={
                     **self.headers,
@@ -135,23 +224,32 @@ class DaluxAPIClient:
                 },
                 timeout=30
             )
-            response.raise_for_status()
             return response.json()
         except requests.RequestException as e:
             raise Exception(f"Failed to finalize upload: {str(e)}")
     
     def upload_complete_file(self, project_id: str, file_area_id: str,
                             folder_id: str, filename: str, 
-                            file_content: bytes) -> Dict:
+                            file_content: Content,
+                            on_stage: Optional[Callable[[str], None]] = None,
+                            on_chunk: Optional[Callable[[int], None]] = None,
+                            on_digest: Optional[Callable[[str], None]] = None) -> Dict:
 
         # Step 1: Create upload slot
+        if on_stage:
+            on_stage("slot")
         upload_guid = self.create_upload_slot(project_id, file_area_id)
         
         # Step 2: Upload content
+        if on_stage:
+            on_stage("upload")
         self.upload_file_content(project_id, file_area_id, upload_guid, 
-                                file_content, filename)
+                                file_content, filename, on_chunk=on_chunk,
+                                on_digest=on_digest)
         
         # Step 3: Finalize
+        if on_stage:
+            on_stage("finalize")
         result = self.finalize_upload(project_id, file_area_id, upload_guid, 
                                       filename, folder_id)
         
@@ -166,90 +264,295 @@ class DaluxAPIClient:
             return folder.get("folderId")
         
 
-        raise Exception(f"Folder not found: {folder_path}. Please create it manually in Dalux.")
+        raise folder_not_found(folder_path)
 
 
-class DaluxUploadManager:
+class DaluxUploadManager(UploadManagerBase):
+    """Uploads files into a project's folder structure.
 
-    def __init__(self, api_key: str):
-        self.client = DaluxAPIClient(api_key)
-        self.project_cache = {}
+    Project, file area and folder lookups go through a DaluxDiscoveryCache
+    shared per API key, so a long-lived manager (or a new one for the same
+    key) skips discovery round-trips until the cache expires or is
+    invalidated. ``file_area_names`` maps a project number to the file
+    area to upload into; projects without an entry use the first area.
+    """
+
+    def __init__(self, api_key: str, base_url: str = DEFAULT_BASE_URL,
+                 metrics=None, cache: Optional[DaluxDiscoveryCache] = None,
+                 file_area_names: Optional[Dict[str, str]] = None):
+        super().__init__(metrics or get_metrics(), cache or get_discovery_cache(api_key),
+                         file_area_names)
+        self.client = DaluxAPIClient(api_key, base_url=base_url, metrics=self.metrics)
+    
+    def list_projects(self, refresh: bool = False) -> List[Dict]:
+        projects = self._cached_projects(refresh)
+        if projects is None:
+            projects = self.client.get_all_projects()
+            self.cache.set_projects(projects)
+        return projects
+    
+    def find_project(self, project_number: str) -> Optional[Dict]:
+        project = self._cached_project(project_number)
+        if project is None:
+            # One listing caches every project, so later lookups hit
+            self.list_projects(refresh=True)
+            project = self.cache.get_project(project_number)
+        return project
+    
+    def get_file_areas(self, project_id: str) -> List[Dict]:
+        file_areas = self._cached_file_areas(project_id)
+        if file_areas is None:
+            file_areas = self.client.get_file_areas(project_id)
+            self.cache.set_file_areas(project_id, file_areas)
+        return file_areas
+    
+    def get_folders(self, project_id: str, file_area_id: str, refresh: bool = False) -> List[Dict]:
+        folders = self._cached_folders(project_id, file_area_id, refresh)
+        if folders is None:
+            folders = self.client.get_folders(project_id, file_area_id)
+            self.cache.set_folders(project_id, file_area_id, folders)
+        return folders
     
-    def setup_project(self, project_number: str) -> Tuple[str, str]:
+    def get_folder_id(self, project_id: str, file_area_id: str, folder_path: str) -> str:
+        folder = match_folder(self.get_folders(project_id, file_area_id), folder_path)
+        if folder is None:
+            # The folder may have been created since the tree was cached
+            folder = match_folder(self.get_folders(project_id, file_area_id, refresh=True), folder_path)
+        if folder is None:
+            raise folder_not_found(folder_path)
+        return folder["folderId"]
+    
+    def provision_folders(self, project_number: str,
+                          structure: Optional[folder_templates.Structure] = None,
+                          max_workers: int = 8) -> Dict:
+        """Create the folders of a template that the project does not have yet.
 
-        project = self.client.find_project_by_number(project_number)
-        if not project:
-            raise Exception(f"Project not found with number: {project_number}")
+        ``structure`` defaults to the project's configured template. The
+        template is compared with the cached folder tree, so with nothing
+        missing this makes no requests; otherwise the tree is fetched once
+        more and the missing folders are created concurrently, one level at
+        a time so parents exist before their subfolders. Returns the
+        created paths and the ones that failed.
+        """
+        if project_number not in self.project_cache:
+            self.setup_project(project_number)
+        project_id, file_area_id = self._project_ids(project_number)
+        if structure is None:
+            structure = folder_templates.template_for_project(project_number)
         
-        project_id = project["projectId"]
+        if not folder_templates.missing_folders(self.get_folders(project_id, file_area_id), structure):
+            return {"created": [], "failed": []}
+        # Do not create duplicates because the cached tree was stale
+        provisioning = FolderProvisioning(self.get_folders(project_id, file_area_id, refresh=True),
+                                          structure, self.metrics)
         
-        file_areas = self.client.get_file_areas(project_id)
-        if not file_areas:
-            raise Exception(f"No file areas found for project {project_number}")
+        def create(folder_path: str) -> Dict:
+            name, parent_id = provisioning.parent_of(folder_path)
+            return self.client.create_folder(project_id, file_area_id, name, parent_id)
         
-        file_area_id = file_areas[0]["data"]["fileAreaId"]
+        for level in provisioning.levels():
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(level)))) as pool:
+                futures = [(folder_path, pool.submit(create, folder_path)) for folder_path in level]
+            for folder_path, future in futures:
+                try:
+                    provisioning.record(folder_path, future.result())
+                except Exception as e:
+                    provisioning.record(folder_path, e)
         
-        self.project_cache[project_number] = {
-            "project_id": project_id,
-            "file_area_id": file_area_id,
-            "project_name": project["projectName"]
-        }
+        self.cache.set_folders(project_id, file_area_id, provisioning.folders)
+        return provisioning.result
+    
+    def setup_project(self, project_number: str, file_area_name: Optional[str] = None) -> Tuple[str, str]:
+
+        project = self.find_project(project_number)
+        if not project:
+            raise Exception(f"Project not found with number: {project_number}")
         
-        return project_id, file_area_id
+        file_areas = self.get_file_areas(project["projectId"])
+        return self._remember_project(project_number, project, file_areas, file_area_name)
     
     def upload_file_to_folder(self, project_number: str, folder_path: str,
-                             filename: str, file_content: bytes) -> Dict:
+                             filename: str, file_content: Content,
+                             on_stage: Optional[Callable[[str], None]] = None,
+                             on_chunk: Optional[Callable[[int], None]] = None,
+                             on_digest: Optional[Callable[[str], None]] = None) -> Dict:
 
         if project_number not in self.project_cache:
             self.setup_project(project_number)
         
-        cache = self.project_cache[project_number]
-        project_id = cache["project_id"]
-        file_area_id = cache["file_area_id"]
-        
-        folder_id = self.client.get_or_create_folder(
-            project_id, file_area_id, folder_path
-        )
+        project_id, file_area_id = self._project_ids(project_number)
+        folder_id = self.get_folder_id(project_id, file_area_id, folder_path)
         
-        result = self.client.upload_complete_file(
-            project_id, file_area_id, folder_id, filename, file_content
-        )
-        
-        return result
+        try:
+            return self.client.upload_complete_file(
+                project_id, file_area_id, folder_id, filename, file_content,
+                on_stage=on_stage, on_chunk=on_chunk, on_digest=on_digest
+            )
+        finally:
+            # The folder's contents may have changed even if finalizing failed
+            self.cache.invalidate_folder_files(project_id, file_area_id, folder_id)
+    
+    def get_folder_files(self, project_id: str, file_area_id: str, folder_id: str) -> List[Dict]:
+        """File listing of a folder, cached for ``cache.files_ttl`` seconds.
+
+        For previews such as upload plans; verification always lists afresh.
+        """
+        files = self._cached_folder_files(project_id, file_area_id, folder_id)
+        if files is None:
+            files = self.client.get_folder_files(project_id, file_area_id, folder_id)
+            self.cache.set_folder_files(project_id, file_area_id, folder_id, files)
+        return files
+    
+    def verify_uploads(self, project_number: str, verifier: UploadVerifier,
+                       tracker: Optional[UploadProgressTracker] = None) -> List[Dict]:
+        """Fetch each touched folder's file listing once; returns the mismatches"""
+        mismatches = []
+        for folder_path in verifier.folders():
+            if tracker is not None:
+                tracker.stage("", folder_path, "verify")
+            try:
+                remote_files = self._list_folder_files(project_number, folder_path)
+            except Exception as e:
+                verifier.mark_unverified(folder_path, f"Could not list remote files: {str(e)}")
+                continue
+            mismatches.extend(verifier.check(folder_path, remote_files))
+        self._record_verification(verifier, mismatches)
+        return mismatches
+    
+    def _list_folder_files(self, project_number: str, folder_path: str) -> List[Dict]:
+        """Folder listing for verification, retried on timeouts and errors.
+
+        429/503 responses are already retried per request by the client.
+        """
+        project_id, file_area_id = self._project_ids(project_number)
+        for attempt in range(LISTING_ATTEMPTS):
+            try:
+                folder_id = self.get_folder_id(project_id, file_area_id, folder_path)
+                return self.client.get_folder_files(project_id, file_area_id, folder_id)
+            except Exception:
+                if attempt == LISTING_ATTEMPTS - 1:
+                    raise
+                time.sleep(self._listing_retry_delay(attempt))
     
     def bulk_upload_from_structure(self, project_number: str, 
-                                   files_dict: Dict[str, List[Tuple[str, bytes]]]) -> Dict:
+                                   files_dict: Dict[str, List[Tuple[str, Content]]],
+                                   progress_callback: Optional[ProgressCallback] = None,
+                                   verify: bool = False,
+                                   reupload_mismatched: bool = False,
+                                   provision_folders: bool = False,
+                                   cancel_event: Optional[threading.Event] = None) -> Dict:
+        """Upload all files one by one.
+
+        With ``verify`` the SHA-256 of every file is computed while it is
+        sent and, after the batch, compared against the remote metadata of
+        each folder (one listing per folder). Mismatching files are counted
+        as failed, or uploaded once more first if ``reupload_mismatched``.
+        With ``provision_folders`` missing folders of the project's template
+        are created first (see provision_folders). Once ``cancel_event`` is
+        set, the file being sent is finished and every file after it is
+        reported with status ``cancelled``.
+        """
         
+        tracker = new_tracker(files_dict, progress_callback)
         results = {
             "success": 0,
             "failed": 0,
+            "cancelled": 0,
             "details": []
         }
         
         if project_number not in self.project_cache:
             self.setup_project(project_number)
         
+        if provision_folders:
+            results["folders_created"] = len(self.provision_folders(project_number)["created"])
+        
+        verifier = UploadVerifier() if verify else None
+        
         for folder_path, files in files_dict.items():
             for filename, file_content in files:
+                detail = {"file": filename, "folder": folder_path}
+                if cancel_event is not None and cancel_event.is_set():
+                    self._record_cancelled(results, detail, tracker)
+                    results["details"].append(detail)
+                    continue
                 try:
                     result = self.upload_file_to_folder(
-                        project_number, folder_path, filename, file_content
+                        project_number, folder_path, filename, file_content,
+                        on_stage=lambda stage: tracker.stage(filename, folder_path, stage),
+                        on_chunk=lambda sent: tracker.set_file_bytes(filename, folder_path, sent),
+                        on_digest=verifier.expect(detail, len(file_content)) if verifier else None
                     )
-                    results["success"] += 1
-                    results["details"].append({
-                        "file": filename,
-                        "folder": folder_path,
-                        "status": "success",
-                        "result": result
-                    })
+                    self._record_success(results, detail, tracker, result)
                 except Exception as e:
-                    results["failed"] += 1
-                    results["details"].append({
-                        "file": filename,
-                        "folder": folder_path,
-                        "status": "failed",
-                        "error": str(e)
-                    })
+                    self._record_failure(results, detail, tracker, e)
+                results["details"].append(detail)
+        
+        if verifier is not None and not (cancel_event is not None and cancel_event.is_set()):
+            mismatches = self.verify_uploads(project_number, verifier, tracker)
+            if mismatches and reupload_mismatched:
+                mismatches = self._reupload_mismatched(
+                    project_number, files_dict, mismatches, results, tracker
+                )
+            mark_mismatches(results, mismatches)
         
         return results
+    
+    def _reupload_mismatched(self, project_number: str,
+                             files_dict: Dict[str, List[Tuple[str, Content]]],
+                             mismatches: List[Dict], results: Dict,
+                             tracker: UploadProgressTracker) -> List[Dict]:
+        """Upload mismatching files once more and verify them again"""
+        contents = file_contents(files_dict)
+        retry_verifier = UploadVerifier()
+        unresolved = []
+        for item in mismatches:
+            detail = item["detail"]
+            self.metrics.inc("dalux_reuploads_total")
+            try:
+                detail["result"] = self.upload_file_to_folder(
+                    project_number, detail["folder"], detail["file"],
+                    contents[(detail["folder"], detail["file"])],
+                    on_digest=retry_verifier.expect(detail, item["size"])
+                )
+                detail["reuploaded"] = True
+            except Exception as e:
+                unresolved.append(reupload_failed(item, e))
+        results["reuploaded"] = sum(1 for item in mismatches if item["detail"].get("reuploaded"))
+        return unresolved + self.verify_uploads(project_number, retry_verifier, tracker)
+    
+    def bulk_upload_multi_project(self, files_by_project: Dict[str, Dict[str, List[Tuple[str, Content]]]],
+                                  max_parallel_projects: int = 4,
+                                  progress_callback: Optional[ProgressCallback] = None,
+                                  verify: bool = False,
+                                  reupload_mismatched: bool = False,
+                                  provision_folders: bool = False,
+                                  cancel_event: Optional[threading.Event] = None) -> Dict:
+        """Upload files of several projects, one worker thread per project.
 
+        Each project is resolved once; a project that cannot be set up only
+        fails its own files. ``cancel_event`` works as in
+        bulk_upload_from_structure.
+        """
+        progress = MultiProjectProgress(progress_callback)
+        callbacks = {
+            project_number: progress.for_project(project_number, files_dict)
+            for project_number, files_dict in files_by_project.items()
+        }
+        
+        def upload_project(project_number: str) -> Dict:
+            files_dict = files_by_project[project_number]
+            try:
+                return self.bulk_upload_from_structure(
+                    project_number, files_dict, progress_callback=callbacks[project_number],
+                    verify=verify, reupload_mismatched=reupload_mismatched,
+                    provision_folders=provision_folders, cancel_event=cancel_event
+                )
+            except Exception as e:
+                return failed_project_results(files_dict, str(e))
+        
+        workers = max(1, min(max_parallel_projects, len(files_by_project)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            project_results = dict(zip(files_by_project, pool.map(upload_project, files_by_project)))
+        
+        return merge_project_results(project_results)
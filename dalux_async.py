@@ -0,0 +1,719 @@
+import asyncio
+import threading
+import time
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
+
+import aiohttp
+
+from blob_store import Content
+from dalux_cache import DaluxDiscoveryCache, get_discovery_cache, match_folder
+from dalux_common import (
+    DEFAULT_BASE_URL, LISTING_ATTEMPTS, RETRY_STATUSES, FolderProvisioning, UploadManagerBase,
+    file_contents, folder_not_found, new_tracker, reupload_failed, retry_delay
+)
+import folder_templates
+from metrics import get_metrics
+from rate_limit import get_rate_limiter
+from upload_verify import UploadVerifier, mark_mismatches
+from upload_progress import (
+    MultiProjectProgress, ProgressCallback, ProgressReader, UploadProgressTracker,
+    failed_project_results, merge_project_results
+)
+
+
+class AsyncDaluxAPIClient:
+    """asyncio variant of DaluxAPIClient with the same method surface.
+
+    All requests share one aiohttp session, so hundreds of requests can be
+    in flight on a single thread (capped by ``max_connections``). Each
+    request first takes a slot from the process rate limiter, if any.
+    """
+
+    def __init__(self, api_key: str, base_url: str = DEFAULT_BASE_URL,
+                 max_connections: int = 100, max_retries: int = 3, metrics=None,
+                 rate_limiter=None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.metrics = metrics or get_metrics()
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.headers = {
+            "X-API-KEY": api_key,
+            "Accept": "application/json"
+        }
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections)
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _request(self, method: str, path: str, error_message: str,
+                       endpoint: str, timeout: int = 30, **kwargs) -> Dict:
+        headers = {**self.headers, **kwargs.pop("headers", {})}
+        # A callable body is a factory, so a streamed body can be resent on retry
+        data = kwargs.pop("data", None)
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                delay = self.rate_limiter.reserve()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            started = time.perf_counter()
+            status = "error"
+            try:
+                async with self.session.request(
+                    method,
+                    f"{self.base_url}{path}",
+                    headers=headers,
+                    timeout=aiohttp.ClientTimeout(total=timeout),
+                    data=data() if callable(data) else data,
+                    **kwargs
+                ) as response:
+                    status = response.status
+                    if response.status in RETRY_STATUSES and attempt < self.max_retries:
+                        delay = retry_delay(response.headers.get("Retry-After"), attempt)
+                    else:
+                        response.raise_for_status()
+                        return await response.json(content_type=None) or {}
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                raise Exception(f"{error_message}: {str(e)}")
+            finally:
+                self.metrics.observe("dalux_request_seconds", time.perf_counter() - started,
+                                     endpoint=endpoint, status=status)
+            self.metrics.inc("dalux_retries_total", endpoint=endpoint)
+            await asyncio.sleep(delay)
+
+    async def get_all_projects(self) -> List[Dict]:
+        data = await self._request("GET", "/5.1/projects", "Failed to get projects",
+                                   endpoint="projects")
+
+        # ⬇️ SAMO projekti ki imajo data.number
+        return [
+            p for p in data.get("items", [])
+            if "data" in p and "number" in p["data"]
+        ]
+
+    async def find_project_by_number(self, project_number: str) -> Optional[Dict]:
+        projects = await self.get_all_projects()
+
+        for project in projects:
+            data = project.get("data")
+            if not data:
+                continue
+            if data.get("number") == project_number:
+                return data
+
+        return None
+
+    async def get_file_areas(self, project_id: str) -> List[Dict]:
+        data = await self._request(
+            "GET",
+            f"/5.1/projects/{project_id}/file_areas",
+            "Failed to get file areas",
+            endpoint="file_areas"
+        )
+        return data.get("items", [])
+
+    async def get_folders(self, project_id: str, file_area_id: str) -> List[Dict]:
+        data = await self._request(
+            "GET",
+            f"/5.1/projects/{project_id}/file_areas/{file_area_id}/folders",
+            "Failed to get folders",
+            endpoint="folders"
+        )
+        return data.get("items", [])
+
+    async def get_folder_files(self, project_id: str, file_area_id: str,
+                               folder_id: str) -> List[Dict]:
+        data = await self._request(
+            "GET",
+            f"/5.1/projects/{project_id}/file_areas/{file_area_id}/files",
+            "Failed to get folder files",
+            endpoint="files",
+            params={"folderId": folder_id}
+        )
+        return data.get("items", [])
+
+    async def create_folder(self, project_id: str, file_area_id: str, folder_name: str,
+                            parent_folder_id: Optional[str] = None) -> Dict:
+        payload = {"folderName": folder_name}
+        if parent_folder_id:
+            payload["parentFolderId"] = parent_folder_id
+        data = await self._request(
+            "POST",
+            f"/5.1/projects/{project_id}/file_areas/{file_area_id}/folders",
+            f"Failed to create folder {folder_name}",
+            endpoint="create_folder",
+            headers={"Content-Type": "application/json"},
+            json=payload
+        )
+        return data["data"]
+
+    async def get_folder_by_path(self, project_id: str, file_area_id: str,
+                                 folder_path: str) -> Optional[Dict]:
+        folders = await self.get_folders(project_id, file_area_id)
+        return match_folder(folders, folder_path)
+
+    async def create_upload_slot(self, project_id: str, file_area_id: str) -> str:
+        data = await self._request(
+            "POST",
+            f"/1.0/projects/{project_id}/file_areas/{file_area_id}/upload",
+            "Failed to create upload slot",
+            endpoint="upload_slot"
+        )
+        return data["data"]["uploadGuid"]
+
+    async def upload_file_content(self, project_id: str, file_area_id: str,
+                                  upload_guid: str, file_content: Content,
+                                  filename: str,
+                                  on_chunk: Optional[Callable[[int], None]] = None,
+                                  on_digest: Optional[Callable[[str], None]] = None) -> bool:
+        file_size = len(file_content)
+        headers = {
+            "Content-Disposition": f'form-data; filename="{filename}"',
+            "Content-Range": f"bytes 0-{file_size-1}/{file_size}",
+            "Content-Type": "application/octet-stream"
+        }
+        body = file_content
+        if on_chunk or on_digest or not isinstance(file_content, bytes):
+            # Explicit length keeps aiohttp from switching to chunked encoding
+            headers["Content-Length"] = str(file_size)
+            reader = ProgressReader(file_content, on_chunk, on_digest=on_digest)
+            body = lambda: _iter_async(reader)
+        await self._request(
+            "POST",
+            f"/1.0/projects/{project_id}/file_areas/{file_area_id}/upload/{upload_guid}",
+            "Failed to upload file content",
+            endpoint="upload",
+            timeout=60,
+            headers=headers,
+            data=body
+        )
+        self.metrics.inc("dalux_upload_bytes_total", file_size)
+        return True
+
+    async def finalize_upload(self, project_id: str, file_area_id: str,
+                              upload_guid: str, filename: str,
+                              folder_id: str, file_type: str = "document") -> Dict:
+        return await self._request(
+            "POST",
+            f"/2.0/projects/{project_id}/file_areas/{file_area_id}/upload/{upload_guid}/finalize",
+            "Failed to finalize upload",
+            endpoint="finalize",
+            headers={"Content-Type": "application/json"},
+            json={
+                "fileName": filename,
+                "fileType": file_type,
+                "folderId": folder_id
+            }
+        )
+
+    async def upload_complete_file(self, project_id: str, file_area_id: str,
+                                   folder_id: str, filename: str,
+                                   file_content: Content,
+                                   on_stage: Optional[Callable[[str], None]] = None,
+                                   on_chunk: Optional[Callable[[int], None]] = None,
+                                   on_digest: Optional[Callable[[str], None]] = None) -> Dict:
+
+        # Step 1: Create upload slot
+        if on_stage:
+            on_stage("slot")
+        upload_guid = await self.create_upload_slot(project_id, file_area_id)
+
+        # Step 2: Upload content
+        if on_stage:
+            on_stage("upload")
+        await self.upload_file_content(project_id, file_area_id, upload_guid,
+                                       file_content, filename, on_chunk=on_chunk,
+                                       on_digest=on_digest)
+
+        # Step 3: Finalize
+        if on_stage:
+            on_stage("finalize")
+        return await self.finalize_upload(project_id, file_area_id, upload_guid,
+                                          filename, folder_id)
+
+    async def get_or_create_folder(self, project_id: str, file_area_id: str,
+                                   folder_path: str) -> str:
+
+        folder = await self.get_folder_by_path(project_id, file_area_id, folder_path)
+
+        if folder:
+            return folder.get("folderId")
+
+        raise folder_not_found(folder_path)
+
+
+async def _iter_async(reader: ProgressReader) -> AsyncIterator[Union[bytes, memoryview]]:
+    for chunk in reader:
+        yield chunk
+
+
+class AsyncDaluxUploadManager(UploadManagerBase):
+    """asyncio variant of DaluxUploadManager.
+
+    Uploads of a batch run as concurrent tasks on one event loop. At most
+    ``max_concurrency`` of them (and of folder creations) are in flight at
+    a time, across all projects uploaded through this manager, and the
+    client keeps as many pooled connections. Discovery lookups share the
+    per-key DaluxDiscoveryCache with the blocking manager. A set
+    ``cancel_event`` cancels in-flight uploads; see
+    bulk_upload_from_structure.
+    """
+
+    def __init__(self, api_key: str, max_concurrency: int = 100,
+                 base_url: str = DEFAULT_BASE_URL, metrics=None,
+                 cache: Optional[DaluxDiscoveryCache] = None,
+                 file_area_names: Optional[Dict[str, str]] = None):
+        super().__init__(metrics or get_metrics(), cache or get_discovery_cache(api_key),
+                         file_area_names)
+        self.client = AsyncDaluxAPIClient(api_key, base_url=base_url,
+                                          max_connections=max_concurrency,
+                                          metrics=self.metrics)
+        self.max_concurrency = max_concurrency
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        await self.client.close()
+
+    def _upload_slots(self) -> asyncio.Semaphore:
+        # Shared by concurrent bulk uploads so max_concurrency holds across projects
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        return self._slots
+
+    async def list_projects(self, refresh: bool = False) -> List[Dict]:
+        projects = self._cached_projects(refresh)
+        if projects is None:
+            projects = await self.client.get_all_projects()
+            self.cache.set_projects(projects)
+        return projects
+
+    async def find_project(self, project_number: str) -> Optional[Dict]:
+        project = self._cached_project(project_number)
+        if project is None:
+            await self.list_projects(refresh=True)
+            project = self.cache.get_project(project_number)
+        return project
+
+    async def get_file_areas(self, project_id: str) -> List[Dict]:
+        file_areas = self._cached_file_areas(project_id)
+        if file_areas is None:
+            file_areas = await self.client.get_file_areas(project_id)
+            self.cache.set_file_areas(project_id, file_areas)
+        return file_areas
+
+    async def get_folders(self, project_id: str, file_area_id: str,
+                          refresh: bool = False) -> List[Dict]:
+        folders = self._cached_folders(project_id, file_area_id, refresh)
+        if folders is None:
+            folders = await self.client.get_folders(project_id, file_area_id)
+            self.cache.set_folders(project_id, file_area_id, folders)
+        return folders
+
+    async def get_folder_id(self, project_id: str, file_area_id: str, folder_path: str) -> str:
+        folder = match_folder(await self.get_folders(project_id, file_area_id), folder_path)
+        if folder is None:
+            # The folder may have been created since the tree was cached
+            folders = await self.get_folders(project_id, file_area_id, refresh=True)
+            folder = match_folder(folders, folder_path)
+        if folder is None:
+            raise folder_not_found(folder_path)
+        return folder["folderId"]
+
+    async def provision_folders(self, project_number: str,
+                                structure: Optional[folder_templates.Structure] = None) -> Dict:
+        """Create the template folders the project is missing, level by level.
+
+        Works as DaluxUploadManager.provision_folders; each level is created
+        with one gather, bounded by the shared upload slots.
+        """
+        if project_number not in self.project_cache:
+            await self.setup_project(project_number)
+        project_id, file_area_id = self._project_ids(project_number)
+        if structure is None:
+            structure = folder_templates.template_for_project(project_number)
+
+        if not folder_templates.missing_folders(await self.get_folders(project_id, file_area_id), structure):
+            return {"created": [], "failed": []}
+        # Do not create duplicates because the cached tree was stale
+        provisioning = FolderProvisioning(await self.get_folders(project_id, file_area_id, refresh=True),
+                                          structure, self.metrics)
+        semaphore = self._upload_slots()
+
+        async def create(folder_path: str) -> Dict:
+            name, parent_id = provisioning.parent_of(folder_path)
+            async with semaphore:
+                return await self.client.create_folder(project_id, file_area_id, name, parent_id)
+
+        for level in provisioning.levels():
+            outcomes = await asyncio.gather(*[create(folder_path) for folder_path in level],
+                                            return_exceptions=True)
+            for folder_path, outcome in zip(level, outcomes):
+                provisioning.record(folder_path, outcome)
+
+        self.cache.set_folders(project_id, file_area_id, provisioning.folders)
+        return provisioning.result
+
+    async def setup_project(self, project_number: str,
+                            file_area_name: Optional[str] = None) -> Tuple[str, str]:
+
+        project = await self.find_project(project_number)
+        if not project:
+            raise Exception(f"Project not found with number: {project_number}")
+
+        file_areas = await self.get_file_areas(project["projectId"])
+        return self._remember_project(project_number, project, file_areas, file_area_name)
+
+    async def upload_file_to_folder(self, project_number: str, folder_path: str,
+                                    filename: str, file_content: Content,
+                                    on_stage: Optional[Callable[[str], None]] = None,
+                                    on_chunk: Optional[Callable[[int], None]] = None,
+                                    on_digest: Optional[Callable[[str], None]] = None) -> Dict:
+
+        if project_number not in self.project_cache:
+            await self.setup_project(project_number)
+
+        project_id, file_area_id = self._project_ids(project_number)
+        folder_id = await self.get_folder_id(project_id, file_area_id, folder_path)
+
+        try:
+            return await self.client.upload_complete_file(
+                project_id, file_area_id, folder_id, filename, file_content,
+                on_stage=on_stage, on_chunk=on_chunk, on_digest=on_digest
+            )
+        finally:
+            # Cached listings are shared with the blocking manager's upload plans
+            self.cache.invalidate_folder_files(project_id, file_area_id, folder_id)
+
+    async def verify_uploads(self, project_number: str, verifier: UploadVerifier,
+                             tracker: Optional[UploadProgressTracker] = None) -> List[Dict]:
+        """Fetch the touched folders' file listings concurrently; returns the mismatches"""
+
+        async def verify_folder(folder_path: str) -> List[Dict]:
+            if tracker is not None:
+                tracker.stage("", folder_path, "verify")
+            try:
+                remote_files = await self._list_folder_files(project_number, folder_path)
+            except Exception as e:
+                verifier.mark_unverified(folder_path, f"Could not list remote files: {str(e)}")
+                return []
+            return verifier.check(folder_path, remote_files)
+
+        folder_mismatches = await asyncio.gather(*[
+            verify_folder(folder_path) for folder_path in verifier.folders()
+        ])
+        mismatches = [item for items in folder_mismatches for item in items]
+        self._record_verification(verifier, mismatches)
+        return mismatches
+
+    async def _list_folder_files(self, project_number: str, folder_path: str) -> List[Dict]:
+        """Folder listing for verification, retried on timeouts and errors.
+
+        429/503 responses are already retried per request by the client.
+        """
+        project_id, file_area_id = self._project_ids(project_number)
+        for attempt in range(LISTING_ATTEMPTS):
+            try:
+                folder_id = await self.get_folder_id(project_id, file_area_id, folder_path)
+                return await self.client.get_folder_files(project_id, file_area_id, folder_id)
+            except Exception:
+                if attempt == LISTING_ATTEMPTS - 1:
+                    raise
+                await asyncio.sleep(self._listing_retry_delay(attempt))
+
+    async def bulk_upload_from_structure(self, project_number: str,
+                                         files_dict: Dict[str, List[Tuple[str, Content]]],
+                                         cancel_event: Optional[asyncio.Event] = None,
+                                         progress_callback: Optional[ProgressCallback] = None,
+                                         verify: bool = False,
+                                         reupload_mismatched: bool = False,
+                                         provision_folders: bool = False) -> Dict:
+        """Upload all files concurrently, at most ``max_concurrency`` at a time.
+
+        Project, file area and folder tree come from the shared discovery
+        cache, so a warm batch starts uploading without any lookups. Once
+        ``cancel_event`` is set, in-flight uploads are cancelled and every
+        unfinished file is reported with status ``cancelled``.
+        ``progress_callback`` receives the event dicts produced by
+        UploadProgressTracker. ``verify``, ``reupload_mismatched`` and
+        ``provision_folders`` work as in
+        DaluxUploadManager.bulk_upload_from_structure.
+        """
+        results = {
+            "success": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "details": []
+        }
+
+        if project_number not in self.project_cache:
+            await self.setup_project(project_number)
+
+        project_id, file_area_id = self._project_ids(project_number)
+
+        if provision_folders:
+            results["folders_created"] = len((await self.provision_folders(project_number))["created"])
+
+        folder_ids = {}
+        for folder_path in files_dict:
+            try:
+                folder_ids[folder_path] = await self.get_folder_id(project_id, file_area_id, folder_path)
+            except Exception:
+                folder_ids[folder_path] = None
+
+        tracker = new_tracker(files_dict, progress_callback)
+        semaphore = self._upload_slots()
+        verifier = UploadVerifier() if verify else None
+
+        started = set()
+
+        async def upload_one(index: int, folder_path: str, filename: str,
+                             file_content: Content):
+            started.add(index)
+            detail = {"file": filename, "folder": folder_path}
+            try:
+                async with semaphore:
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise asyncio.CancelledError()
+                    folder_id = folder_ids[folder_path]
+                    if folder_id is None:
+                        raise folder_not_found(folder_path)
+                    result = await self.client.upload_complete_file(
+                        project_id, file_area_id, folder_id, filename, file_content,
+                        on_stage=lambda stage: tracker.stage(filename, folder_path, stage),
+                        on_chunk=lambda sent: tracker.set_file_bytes(filename, folder_path, sent),
+                        on_digest=verifier.expect(detail, len(file_content)) if verifier else None
+                    )
+                self._record_success(results, detail, tracker, result)
+            except asyncio.CancelledError:
+                self._record_cancelled(results, detail, tracker)
+            except Exception as e:
+                self._record_failure(results, detail, tracker, e)
+            results["details"].append(detail)
+
+        queued = [
+            (folder_path, filename, file_content)
+            for folder_path, files in files_dict.items()
+            for filename, file_content in files
+        ]
+        tasks = [
+            asyncio.ensure_future(upload_one(index, *item))
+            for index, item in enumerate(queued)
+        ]
+
+        watcher = None
+        if cancel_event is not None:
+            async def cancel_on_event():
+                await cancel_event.wait()
+                for task in tasks:
+                    task.cancel()
+            watcher = asyncio.ensure_future(cancel_on_event())
+
+        try:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+
+        # Tasks cancelled before they started never recorded a detail
+        for index, (folder_path, filename, _) in enumerate(queued):
+            if index not in started:
+                detail = {"file": filename, "folder": folder_path}
+                self._record_cancelled(results, detail, tracker)
+                results["details"].append(detail)
+
+        if verifier is not None and not (cancel_event is not None and cancel_event.is_set()):
+            mismatches = await self.verify_uploads(project_number, verifier, tracker)
+            if mismatches and reupload_mismatched:
+                mismatches = await self._reupload_mismatched(
+                    project_number, files_dict, mismatches, results, tracker
+                )
+            mark_mismatches(results, mismatches)
+
+        return results
+
+    async def _reupload_mismatched(self, project_number: str,
+                                   files_dict: Dict[str, List[Tuple[str, Content]]],
+                                   mismatches: List[Dict], results: Dict,
+                                   tracker: UploadProgressTracker) -> List[Dict]:
+        """Upload mismatching files once more and verify them again"""
+        contents = file_contents(files_dict)
+        retry_verifier = UploadVerifier()
+        semaphore = self._upload_slots()
+
+        async def reupload(item: Dict) -> Optional[Dict]:
+            detail = item["detail"]
+            self.metrics.inc("dalux_reuploads_total")
+            try:
+                async with semaphore:
+                    detail["result"] = await self.upload_file_to_folder(
+                        project_number, detail["folder"], detail["file"],
+                        contents[(detail["folder"], detail["file"])],
+                        on_digest=retry_verifier.expect(detail, item["size"])
+                    )
+                detail["reuploaded"] = True
+                return None
+            except Exception as e:
+                return reupload_failed(item, e)
+
+        outcomes = await asyncio.gather(*[reupload(item) for item in mismatches])
+        results["reuploaded"] = sum(1 for item in mismatches if item["detail"].get("reuploaded"))
+        unresolved = [item for item in outcomes if item is not None]
+        return unresolved + await self.verify_uploads(project_number, retry_verifier, tracker)
+
+    async def bulk_upload_multi_project(self, files_by_project: Dict[str, Dict[str, List[Tuple[str, Content]]]],
+                                        cancel_event: Optional[asyncio.Event] = None,
+                                        progress_callback: Optional[ProgressCallback] = None,
+                                        verify: bool = False,
+                                        reupload_mismatched: bool = False,
+                                        provision_folders: bool = False) -> Dict:
+        """Upload files of several projects concurrently.
+
+        Each project is resolved once and all projects share the same
+        ``max_concurrency`` upload slots; a project that cannot be set up
+        only fails its own files.
+        """
+        progress = MultiProjectProgress(progress_callback)
+
+        async def upload_project(project_number: str, files_dict) -> Dict:
+            try:
+                return await self.bulk_upload_from_structure(
+                    project_number, files_dict, cancel_event=cancel_event,
+                    progress_callback=progress.for_project(project_number, files_dict),
+                    verify=verify, reupload_mismatched=reupload_mismatched,
+                    provision_folders=provision_folders
+                )
+            except Exception as e:
+                return failed_project_results(files_dict, str(e))
+
+        project_results = await asyncio.gather(*[
+            upload_project(project_number, files_dict)
+            for project_number, files_dict in files_by_project.items()
+        ])
+        return merge_project_results(dict(zip(files_by_project, project_results)))
+
+
+def run_sync(coro):
+    """Run a coroutine from synchronous code (e.g. the Streamlit script).
+
+    If an event loop is already running in this thread, the coroutine is
+    run on a separate thread instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    outcome = {}
+
+    def runner():
+        try:
+            outcome["result"] = asyncio.run(coro)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=runner, daemon=True)
+    thread.start()
+    thread.join()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+def _run_with_manager(api_key: str, max_concurrency: int,
+                      cancel_event: Optional[threading.Event], base_url: str, upload,
+                      file_area_names: Optional[Dict[str, str]] = None):
+    """Run ``upload(manager, async_cancel)`` on a fresh manager from sync code.
+
+    ``cancel_event`` is a ``threading.Event`` that another thread may set;
+    it is polled every 100 ms and forwarded as an asyncio cancellation.
+    """
+
+    async def main():
+        async_cancel = asyncio.Event()
+        poller = None
+        if cancel_event is not None:
+            async def poll_cancel():
+                while not cancel_event.is_set():
+                    await asyncio.sleep(0.1)
+                async_cancel.set()
+            poller = asyncio.ensure_future(poll_cancel())
+
+        async with AsyncDaluxUploadManager(api_key, max_concurrency=max_concurrency,
+                                           base_url=base_url,
+                                           file_area_names=file_area_names) as manager:
+            try:
+                return await upload(manager, async_cancel)
+            finally:
+                if poller is not None:
+                    poller.cancel()
+
+    return run_sync(main())
+
+
+def bulk_upload_sync(api_key: str, project_number: str,
+                     files_dict: Dict[str, List[Tuple[str, Content]]],
+                     max_concurrency: int = 100,
+                     cancel_event: Optional[threading.Event] = None,
+                     progress_callback: Optional[ProgressCallback] = None,
+                     base_url: str = DEFAULT_BASE_URL,
+                     file_area_name: Optional[str] = None,
+                     verify: bool = False,
+                     reupload_mismatched: bool = False,
+                     provision_folders: bool = False) -> Dict:
+    """Synchronous wrapper around AsyncDaluxUploadManager.bulk_upload_from_structure."""
+    return _run_with_manager(
+        api_key, max_concurrency, cancel_event, base_url,
+        lambda manager, async_cancel: manager.bulk_upload_from_structure(
+            project_number, files_dict, cancel_event=async_cancel,
+            progress_callback=progress_callback,
+            verify=verify, reupload_mismatched=reupload_mismatched,
+            provision_folders=provision_folders
+        ),
+        file_area_names={project_number: file_area_name} if file_area_name else None
+    )
+
+
+def bulk_upload_multi_project_sync(api_key: str,
+                                   files_by_project: Dict[str, Dict[str, List[Tuple[str, Content]]]],
+                                   max_concurrency: int = 100,
+                                   cancel_event: Optional[threading.Event] = None,
+                                   progress_callback: Optional[ProgressCallback] = None,
+                                   base_url: str = DEFAULT_BASE_URL,
+                                   file_area_names: Optional[Dict[str, str]] = None,
+                                   verify: bool = False,
+                                   reupload_mismatched: bool = False,
+                                   provision_folders: bool = False) -> Dict:
+    """Synchronous wrapper around AsyncDaluxUploadManager.bulk_upload_multi_project."""
+    return _run_with_manager(
+        api_key, max_concurrency, cancel_event, base_url,
+        lambda manager, async_cancel: manager.bulk_upload_multi_project(
+            files_by_project, cancel_event=async_cancel,
+            progress_callback=progress_callback,
+            verify=verify, reupload_mismatched=reupload_mismatched,
+            provision_folders=provision_folders
+        ),
+        file_area_names=file_area_names
+    )
@@ -0,0 +1,162 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+CACHE_TTL = float(os.environ.get("DALUX_CACHE_TTL", "900"))
+# Folder contents change with every upload, so their listings expire sooner
+FILES_CACHE_TTL = float(os.environ.get("DALUX_FILES_CACHE_TTL", "60"))
+
+_MISSING = object()
+
+
+class DaluxDiscoveryCache:
+    """TTL cache for project → file areas → folder tree lookups.
+
+    One instance is shared per API key (see ``get_discovery_cache``) by the
+    blocking and the asyncio upload managers, so a new upload does not
+    repeat the project listing, file area and folder round-trips. Entries
+    expire after ``ttl`` seconds or when explicitly invalidated; the file
+    listings of single folders (for upload plans) after ``files_ttl``.
+    """
+
+    def __init__(self, ttl: float = CACHE_TTL, files_ttl: float = FILES_CACHE_TTL):
+        self.ttl = ttl
+        self.files_ttl = files_ttl
+        self._entries: Dict[Tuple, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: Tuple, ttl: Optional[float] = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            stored_at, value = entry
+            if time.monotonic() - stored_at > (self.ttl if ttl is None else ttl):
+                del self._entries[key]
+                return _MISSING
+            return value
+
+    def _set(self, key: Tuple, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+
+    def get_project(self, project_number: str) -> Optional[Dict]:
+        """Cached project data, None on a miss"""
+        value = self._get(("project", project_number))
+        return None if value is _MISSING else value
+
+    def set_projects(self, projects: List[Dict]):
+        """Cache a full project listing (items as returned by get_all_projects)"""
+        self._set(("projects",), projects)
+        for project in projects:
+            data = project.get("data") or {}
+            if "number" in data:
+                self._set(("project", data["number"]), data)
+
+    def get_projects(self) -> Optional[List[Dict]]:
+        value = self._get(("projects",))
+        return None if value is _MISSING else value
+
+    def get_file_areas(self, project_id: str) -> Optional[List[Dict]]:
+        value = self._get(("file_areas", project_id))
+        return None if value is _MISSING else value
+
+    def set_file_areas(self, project_id: str, file_areas: List[Dict]):
+        self._set(("file_areas", project_id), file_areas)
+
+    def get_folders(self, project_id: str, file_area_id: str) -> Optional[List[Dict]]:
+        value = self._get(("folders", project_id, file_area_id))
+        return None if value is _MISSING else value
+
+    def set_folders(self, project_id: str, file_area_id: str, folders: List[Dict]):
+        self._set(("folders", project_id, file_area_id), folders)
+
+    def invalidate_folders(self, project_id: str, file_area_id: str):
+        with self._lock:
+            self._entries.pop(("folders", project_id, file_area_id), None)
+
+    def get_folder_files(self, project_id: str, file_area_id: str, folder_id: str) -> Optional[List[Dict]]:
+        value = self._get(("folder_files", project_id, file_area_id, folder_id), self.files_ttl)
+        return None if value is _MISSING else value
+
+    def set_folder_files(self, project_id: str, file_area_id: str, folder_id: str, files: List[Dict]):
+        self._set(("folder_files", project_id, file_area_id, folder_id), files)
+
+    def invalidate_folder_files(self, project_id: str, file_area_id: str, folder_id: str):
+        with self._lock:
+            self._entries.pop(("folder_files", project_id, file_area_id, folder_id), None)
+
+    def invalidate(self, project_id: Optional[str] = None):
+        """Drop everything cached for ``project_id``, or the whole cache"""
+        with self._lock:
+            if project_id is None:
+                self._entries.clear()
+                return
+            for key in list(self._entries):
+                if key[0] in ("file_areas", "folders", "folder_files") and key[1] == project_id:
+                    del self._entries[key]
+                elif key[0] == "project" and self._entries[key][1].get("projectId") == project_id:
+                    del self._entries[key]
+
+
+def select_file_area(file_areas: List[Dict], file_area_name: Optional[str] = None) -> Dict:
+    """Pick the file area named ``file_area_name``, or the first one"""
+    if not file_area_name:
+        return file_areas[0]["data"]
+    for file_area in file_areas:
+        if file_area["data"].get("fileAreaName") == file_area_name:
+            return file_area["data"]
+    available = ", ".join(fa["data"].get("fileAreaName", "?") for fa in file_areas)
+    raise Exception(f"File area not found: {file_area_name}. Available: {available}")
+
+
+def folder_tree_paths(folders: List[Dict]) -> Dict[str, Dict]:
+    """Map full folder paths (``main/sub``) to folder data via ``parentFolderId``.
+
+    Folders whose parent is not in the listing are treated as top level.
+    """
+    by_id = {folder["data"]["folderId"]: folder["data"] for folder in folders if "data" in folder}
+    paths: Dict[str, Dict] = {}
+    for folder_data in by_id.values():
+        names = [folder_data.get("folderName", "")]
+        parent = by_id.get(folder_data.get("parentFolderId"))
+        seen = {folder_data["folderId"]}
+        while parent is not None and parent["folderId"] not in seen:
+            seen.add(parent["folderId"])
+            names.append(parent.get("folderName", ""))
+            parent = by_id.get(parent.get("parentFolderId"))
+        paths.setdefault("/".join(reversed(names)), folder_data)
+    return paths
+
+
+def match_folder(folders: List[Dict], folder_path: str) -> Optional[Dict]:
+    """Folder at ``folder_path``, else the first folder with its last name"""
+    if '/' in folder_path:
+        folder = folder_tree_paths(folders).get(folder_path)
+        if folder is not None:
+            return folder
+
+    target_name = folder_path.split('/')[-1]
+
+    for folder in folders:
+        folder_data = folder.get("data", {})
+        if folder_data.get("folderName") == target_name:
+            return folder_data
+
+    return None
+
+
+_caches: Dict[str, DaluxDiscoveryCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_discovery_cache(api_key: str) -> DaluxDiscoveryCache:
+    """Process-wide cache for one API key"""
+    key = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = DaluxDiscoveryCache()
+        return _caches[key]
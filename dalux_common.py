@@ -0,0 +1,205 @@
+"""Upload manager logic shared by the blocking and the asyncio clients.
+
+DaluxUploadManager (dalux_api) and AsyncDaluxUploadManager (dalux_async)
+differ only in how they talk to Dalux. Everything that decides what to
+request, what to cache and how to report outcomes lives here and makes no
+requests itself, so both managers keep only their transport.
+"""
+from typing import Dict, List, Optional, Tuple
+
+from blob_store import Content
+from dalux_cache import DaluxDiscoveryCache, folder_tree_paths, match_folder, select_file_area
+import folder_templates
+from upload_progress import ProgressCallback, UploadProgressTracker
+from upload_verify import UploadVerifier
+
+
+DEFAULT_BASE_URL = "https://node2.field.dalux.com/service/api"
+
+# Responses worth retrying after a pause: rate limiting and temporary overload
+RETRY_STATUSES = (429, 503)
+
+# Attempts at a folder listing for verification; a failed listing leaves files unverified
+LISTING_ATTEMPTS = 3
+
+FilesDict = Dict[str, List[Tuple[str, Content]]]
+
+
+def retry_delay(retry_after: Optional[str], attempt: int) -> float:
+    try:
+        return min(float(retry_after), 30.0)
+    except (TypeError, ValueError):
+        return min(0.5 * 2 ** attempt, 30.0)
+
+
+def folder_not_found(folder_path: str) -> Exception:
+    return Exception(f"Folder not found: {folder_path}. Please create it manually in Dalux.")
+
+
+def new_tracker(files_dict: FilesDict,
+                progress_callback: Optional[ProgressCallback] = None) -> UploadProgressTracker:
+    return UploadProgressTracker(
+        total_files=sum(len(files) for files in files_dict.values()),
+        total_bytes=sum(len(content) for files in files_dict.values() for _, content in files),
+        callback=progress_callback
+    )
+
+
+def file_contents(files_dict: FilesDict) -> Dict[Tuple[str, str], Content]:
+    """Contents by (folder, file name), to re-upload mismatching files"""
+    return {
+        (folder_path, filename): file_content
+        for folder_path, files in files_dict.items()
+        for filename, file_content in files
+    }
+
+
+def reupload_failed(item: Dict, error: Exception) -> Dict:
+    """A mismatch that stays unresolved because its re-upload failed"""
+    return {**item, "error": f"{item['error']}; re-upload failed: {str(error)}"}
+
+
+class FolderProvisioning:
+    """The template folders a project lacks, and the outcome of creating them.
+
+    Built from a freshly listed folder tree. Folders are created one level
+    of ``levels()`` at a time; ``parent_of`` resolves a folder's parent
+    from the tree, including folders created on earlier levels, and
+    ``record`` notes each creation's outcome.
+    """
+
+    def __init__(self, folders: List[Dict], structure: folder_templates.Structure, metrics):
+        self.folders = list(folders)
+        self.missing = folder_templates.missing_folders(self.folders, structure)
+        self.paths = folder_tree_paths(self.folders)
+        self.metrics = metrics
+        self.result = {"created": [], "failed": []}
+
+    def levels(self) -> List[List[str]]:
+        return folder_templates.by_depth(self.missing)
+
+    def parent_of(self, folder_path: str) -> Tuple[str, Optional[str]]:
+        """Name and parent folder id of a folder to create"""
+        parent_path, _, name = folder_path.rpartition('/')
+        parent = self.paths.get(parent_path) if parent_path else None
+        if parent_path and parent is None:
+            parent = match_folder(self.folders, parent_path) if parent_path not in self.missing else None
+            if parent is None:
+                raise Exception(f"Parent folder missing: {parent_path}")
+        return name, parent["folderId"] if parent else None
+
+    def record(self, folder_path: str, outcome):
+        """Record the created folder data, or the exception creating it raised"""
+        if isinstance(outcome, Exception):
+            self.metrics.inc("dalux_folders_provisioned_total", result="failed")
+            self.result["failed"].append({"folder": folder_path, "error": str(outcome)})
+            return
+        self.metrics.inc("dalux_folders_provisioned_total", result="created")
+        self.paths[folder_path] = outcome
+        self.folders.append({"data": outcome})
+        self.result["created"].append(folder_path)
+
+
+class UploadManagerBase:
+    """State and bookkeeping of an upload manager, without any requests.
+
+    ``project_cache`` holds the ids of the projects set up by this
+    manager; discovery lookups go through the shared ``cache``.
+    """
+
+    def __init__(self, metrics, cache: DaluxDiscoveryCache,
+                 file_area_names: Optional[Dict[str, str]] = None):
+        self.metrics = metrics
+        self.cache = cache
+        self.file_area_names = dict(file_area_names or {})
+        self.project_cache = {}
+
+    def _cache_result(self, cache_name: str, hit: bool):
+        self.metrics.inc("dalux_cache_lookups_total", cache=cache_name, result="hit" if hit else "miss")
+
+    def _cached_projects(self, refresh: bool) -> Optional[List[Dict]]:
+        projects = None if refresh else self.cache.get_projects()
+        self._cache_result("projects", projects is not None)
+        return projects
+
+    def _cached_project(self, project_number: str) -> Optional[Dict]:
+        project = self.cache.get_project(project_number)
+        self._cache_result("project", project is not None)
+        return project
+
+    def _cached_file_areas(self, project_id: str) -> Optional[List[Dict]]:
+        file_areas = self.cache.get_file_areas(project_id)
+        self._cache_result("file_areas", file_areas is not None)
+        return file_areas
+
+    def _cached_folders(self, project_id: str, file_area_id: str, refresh: bool) -> Optional[List[Dict]]:
+        folders = None if refresh else self.cache.get_folders(project_id, file_area_id)
+        self._cache_result("folder", folders is not None)
+        return folders
+
+    def _cached_folder_files(self, project_id: str, file_area_id: str,
+                             folder_id: str) -> Optional[List[Dict]]:
+        files = self.cache.get_folder_files(project_id, file_area_id, folder_id)
+        self._cache_result("folder_files", files is not None)
+        return files
+
+    def invalidate(self, project_number: Optional[str] = None):
+        """Forget cached discovery data for one project, or for all of them"""
+        if project_number is None:
+            self.project_cache.clear()
+            self.cache.invalidate()
+            return
+        entry = self.project_cache.pop(project_number, None)
+        project = self.cache.get_project(project_number)
+        project_id = entry["project_id"] if entry else (project or {}).get("projectId")
+        if project_id:
+            self.cache.invalidate(project_id)
+
+    def _remember_project(self, project_number: str, project: Optional[Dict],
+                          file_areas: List[Dict], file_area_name: Optional[str]) -> Tuple[str, str]:
+        """Select the file area of a looked up project and cache its ids"""
+        if not file_areas:
+            raise Exception(f"No file areas found for project {project_number}")
+        file_area = select_file_area(
+            file_areas, file_area_name or self.file_area_names.get(project_number)
+        )
+        self.project_cache[project_number] = {
+            "project_id": project["projectId"],
+            "file_area_id": file_area["fileAreaId"],
+            "file_area_name": file_area.get("fileAreaName", ""),
+            "project_name": project["projectName"]
+        }
+        return project["projectId"], file_area["fileAreaId"]
+
+    def _project_ids(self, project_number: str) -> Tuple[str, str]:
+        cache = self.project_cache[project_number]
+        return cache["project_id"], cache["file_area_id"]
+
+    def _listing_retry_delay(self, attempt: int) -> float:
+        self.metrics.inc("dalux_retries_total", endpoint="files")
+        return retry_delay(None, attempt)
+
+    def _record_verification(self, verifier: UploadVerifier, mismatches: List[Dict]):
+        verified = sum(1 for items in verifier.pending.values()
+                       for item in items if item["detail"].get("verified"))
+        self.metrics.inc("dalux_verify_total", verified, result="ok")
+        self.metrics.inc("dalux_verify_total", len(mismatches), result="mismatch")
+
+    def _record_success(self, results: Dict, detail: Dict, tracker: UploadProgressTracker,
+                        result: Dict):
+        tracker.stage(detail["file"], detail["folder"], "success")
+        self.metrics.inc("dalux_files_total", status="success")
+        results["success"] += 1
+        detail.update({"status": "success", "result": result})
+
+    def _record_cancelled(self, results: Dict, detail: Dict, tracker: UploadProgressTracker):
+        tracker.stage(detail["file"], detail["folder"], "cancelled")
+        results["cancelled"] += 1
+        detail.update({"status": "cancelled", "error": "Upload cancelled"})
+
+    def _record_failure(self, results: Dict, detail: Dict, tracker: UploadProgressTracker,
+                        error: Exception):
+        tracker.stage(detail["file"], detail["folder"], "failed", str(error))
+        self.metrics.inc("dalux_files_total", status="failed")
+        results["failed"] += 1
+        detail.update({"status": "failed", "error": str(error)})
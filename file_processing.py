@@ -0,0 +1,242 @@
+import io
+import os
+from datetime import datetime
+from functools import lru_cache
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from blob_store import Content, BlobReader, iter_chunks
+from code_registry import CODE_KINDS
+from folder_templates import template_for_project, template_paths
+from metrics import get_metrics, peak_rss_bytes
+
+ZIP_CHUNK_SIZE = 1024 * 1024
+
+
+# Target folder suggested for a document type when nothing more specific is known
+TIP_FOLDERS = {
+    "PON": "01_Pogodba_Admin/01_Ponudbe",
+    "POG": "01_Pogodba_Admin/02_Pogodba",
+    "TER": "04_Planiranje/01_Terminski_Plan",
+    "NAR": "05_Nabava/01_Narocila",
+    "SIT": "06_Financno/01_Situacije",
+    "RAC": "06_Financno/03_Racuni",
+    "FOT": "07_Gradnja/03_Foto_Porocila",
+    "KOI": "07_Gradnja/04_Kontrole",
+    "DOP": "08_Korespondenca/01_Dopisi",
+}
+
+
+@lru_cache(maxsize=None)
+def project_folder_options(projekt_sifra: str) -> Tuple[Tuple[str, ...], Dict[str, int]]:
+    """Target folder options and their indices from the template of a project
+
+    Computed once per project; projects without a template of their own
+    get the default options.
+    """
+    options = ("",) + tuple(template_paths(template_for_project(projekt_sifra)))
+    return options, {path: i for i, path in enumerate(options) if path}
+
+
+def classify_filename(file_name: str, code_options: Dict[str, Dict[str, str]],
+                      projects: Tuple[str, ...] = (), projekt_sifra: str = "") -> Dict:
+    """Derive metadata fields from a file name.
+
+    Understands names that already follow the naming scheme
+    (``PROJEKT-TIP-FAZA-LOK-IME-DATUM``) as well as loose names with codes
+    somewhere in them. Codes are assigned to the first of TIP, FAZA, LOK
+    that accepts them. A target folder is only suggested when the template
+    of the file's project (from the name, else ``projekt_sifra``) has it.
+    Returns only the fields that could be derived.
+    """
+    stem = os.path.splitext(file_name)[0]
+    derived = {}
+
+    # Project numbers may contain the separator, so match them as a prefix
+    for project in sorted(projects, key=len, reverse=True):
+        if stem == project or stem.startswith(project + '-') or stem.startswith(project + '_'):
+            derived['projekt_sifra'] = project
+            stem = stem[len(project) + 1:]
+            break
+
+    rest = []
+    for token in stem.replace(' ', '-').split('-'):
+        code = token.upper()
+        kind = next((field for field, key in CODE_KINDS
+                     if field not in derived and code in code_options.get(key, {})), None)
+        if kind:
+            derived[kind] = code
+        elif 'datum' not in derived and len(token) == 8 and token.isdigit():
+            try:
+                datetime.strptime(token, "%Y%m%d")
+                derived['datum'] = token
+            except ValueError:
+                rest.append(token)
+        elif token:
+            rest.append(token)
+
+    if rest:
+        derived['ime'] = '_'.join(rest)[:100]
+    # Only suggest folders the project's structure actually has
+    _, folder_index = project_folder_options(derived.get('projekt_sifra') or projekt_sifra)
+    if TIP_FOLDERS.get(derived.get('tip')) in folder_index:
+        derived['target_subfolder'] = TIP_FOLDERS[derived['tip']]
+    return derived
+
+
+def build_file_entry(file_name: str, file_content: Optional[bytes] = None) -> Dict:
+    """Create the metadata entry for a newly added file
+
+    Without ``file_content`` the entry holds metadata only; the content is
+    then expected to be attached as ``blob_path`` by the workspace store.
+    """
+    entry = {
+        'original_name': file_name,
+        'extension': os.path.splitext(file_name)[1][1:],
+        'tip': '',
+        'faza': '',
+        'lok': '',
+        'ime': os.path.splitext(file_name)[0].replace(' ', '_')[:100],
+        'datum': '',
+        'target_subfolder': '',
+        'projekt_sifra': ''
+    }
+    if file_content is not None:
+        entry['content'] = file_content
+    return entry
+
+
+def entry_content(file_data: Dict) -> Content:
+    """File content without reading it: the in-memory bytes or a BlobReader of the blob"""
+    if 'content' in file_data:
+        return file_data['content']
+    return BlobReader(file_data['blob_path'], file_data.get('size'))
+
+
+def entry_size(file_data: Dict) -> int:
+    """Content size of an entry without reading it; 0 if its blob is gone"""
+    if 'size' in file_data:
+        return file_data['size']
+    if 'content' in file_data:
+        return len(file_data['content'])
+    try:
+        return os.path.getsize(file_data['blob_path'])
+    except (KeyError, OSError):
+        return 0
+
+
+def file_project(file_data: Dict, projekt_sifra: str) -> str:
+    """Project number of a file: its own tag, else the session project"""
+    return file_data.get('projekt_sifra') or projekt_sifra
+
+
+def generate_new_filename(file_data: Dict, projekt_sifra: str) -> str:
+    """Generate new filename from metadata"""
+    parts = [
+        file_project(file_data, projekt_sifra),
+        file_data.get('tip', ''),
+        file_data.get('faza', ''),
+        file_data.get('lok', ''),
+        file_data.get('ime', '')
+    ]
+
+    if file_data.get('datum'):
+        try:
+            dt = datetime.strptime(file_data['datum'], "%Y%m%d")
+            parts.append(dt.strftime("%Y%m%d"))
+        except:
+            pass
+
+    parts = [p for p in parts if p]
+    if not parts:
+        return ""
+
+    ext = file_data.get('extension', '')
+    return f"{'-'.join(parts)}{'.' + ext if ext else ''}"
+
+
+def is_file_complete(file_data: Dict) -> bool:
+    """Check if file has all required data"""
+    return all([
+        file_data.get('tip'),
+        file_data.get('faza'),
+        file_data.get('lok'),
+        file_data.get('ime'),
+        file_data.get('target_subfolder')
+    ])
+
+
+def build_files_dict(files: List[Dict], projekt_sifra: str) -> Dict[str, List[Tuple[str, Content]]]:
+    """Group complete files by target folder as (new name, content) pairs.
+
+    Blob-backed entries are passed as BlobReader, so nothing is read here.
+    """
+    files_dict = {}
+    for file_data in files:
+        if is_file_complete(file_data):
+            folder_path = file_data['target_subfolder']
+            filename = generate_new_filename(file_data, projekt_sifra)
+
+            if folder_path not in files_dict:
+                files_dict[folder_path] = []
+            files_dict[folder_path].append((filename, entry_content(file_data)))
+    return files_dict
+
+
+def build_files_by_project(files: List[Dict], projekt_sifra: str) -> Dict[str, Dict[str, List[Tuple[str, Content]]]]:
+    """Group complete files by project number, then by target folder"""
+    by_project = {}
+    for file_data in files:
+        if is_file_complete(file_data):
+            project = file_project(file_data, projekt_sifra)
+            by_project.setdefault(project, []).append(file_data)
+    return {
+        project: build_files_dict(project_files, project)
+        for project, project_files in by_project.items()
+    }
+
+
+def create_zip_with_structure(files: List[Dict], projekt_sifra: str,
+                              output: Optional[BinaryIO] = None) -> BinaryIO:
+    """Create ZIP file with proper folder structure and renamed files
+
+    Each file goes into the folder structure of its own project's template.
+    When the files span several projects, every project gets a top-level
+    folder named after it. File contents are streamed into the archive
+    chunk by chunk from their blob files through one reused buffer. Pass a
+    file as ``output`` to keep the archive itself out of memory too; by
+    default it is built in a BytesIO.
+    """
+    import zipfile
+
+    metrics = get_metrics()
+    zip_buffer = output if output is not None else io.BytesIO()
+    # One read buffer for all files; each chunk is compressed before the next read
+    buffer = bytearray(ZIP_CHUNK_SIZE)
+
+    with metrics.timer("zip_build_seconds"), \
+            zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        complete = [f for f in files if is_file_complete(f)]
+        projects = sorted({file_project(f, projekt_sifra) for f in complete} or {projekt_sifra})
+        prefixes = {project: f"{project}/" if len(projects) > 1 else "" for project in projects}
+
+        # Create folder structure (empty folders)
+        for project in projects:
+            for folder_path in template_paths(template_for_project(project)):
+                zip_file.writestr(f"{prefixes[project]}{folder_path}/", "")
+
+        # Add renamed files
+        for file_data in complete:
+            project = file_project(file_data, projekt_sifra)
+            new_name = generate_new_filename(file_data, projekt_sifra)
+            target_path = f"{prefixes[project]}{file_data['target_subfolder']}/{new_name}"
+            content = entry_content(file_data)
+            with zip_file.open(target_path, 'w',
+                               force_zip64=len(content) >= zipfile.ZIP64_LIMIT) as dest:
+                for chunk in iter_chunks(content, ZIP_CHUNK_SIZE, buffer):
+                    dest.write(chunk)
+
+    if metrics.enabled:
+        metrics.set_gauge("zip_size_bytes", zip_buffer.tell())
+        metrics.set_gauge("process_peak_rss_bytes", peak_rss_bytes())
+    zip_buffer.seek(0)
+    return zip_buffer
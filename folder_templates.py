@@ -0,0 +1,119 @@
+"""Project folder structure templates.
+
+The built-in ``standard`` template is the company folder structure. More
+templates, the default one and per-project choices are read from a JSON
+file (``DALUX_FOLDER_TEMPLATES``, default ``folder_templates.json``):
+
+    {
+      "default": "standard",
+      "templates": {
+        "infrastruktura": {
+          "00_Navodila": [],
+          "02_Projektna_dok": ["01_IDZ", "02_PZI"],
+          "07_Gradnja": {"01_Odseki": ["01_Odsek_A", "02_Odsek_B"]}
+        }
+      },
+      "projects": {"2024-017": "infrastruktura"}
+    }
+
+A template maps folder names to their subfolders, either a list of names
+or another mapping for deeper levels. Folder paths use ``/``.
+"""
+import functools
+import json
+import os
+from typing import Dict, List, Optional, Union
+
+from dalux_cache import folder_tree_paths, match_folder
+
+
+MAPNA_STRUKTURA = {
+    "00_Navodila": [],
+    "01_Pogodba_Admin": [
+        "01_Ponudbe", "02_Pogodba", "03_Dodatki_Pogodbi",
+        "04_Imenovanja", "05_Odlocbe", "06_Zavarovanja"
+    ],
+    "02_Projektna_dok": ["01_IDZ", "02_PGD", "03_PZI", "04_PID", "05_Soglasja"],
+    "03_Izvedbena_dok": ["01_Atesti", "02_Delavniski_Nacrti", "03_Izjave_Certifikati", "04_Tehnicna_Dok"],
+    "04_Planiranje": ["01_Terminski_Plan", "02_Fazni_Plan", "03_Sestanki"],
+    "05_Nabava": ["01_Narocila", "02_Podizvajalci", "03_Dobavnice", "04_Ponudbe_Dobav"],
+    "06_Financno": ["01_Situacije", "02_Dodatna_Dela", "03_Racuni", "04_Poravnave"],
+    "07_Gradnja": ["01_Gradbeni_Dnevnik", "02_Zapisniki", "03_Foto_Porocila", "04_Kontrole", "05_Meritve"],
+    "08_Korespondenca": ["01_Dopisi", "02_Odgovori", "03_Zahtevki", "04_Reklamacije"],
+    "09_Prevzem_garancije": ["01_PID_Izvedeno", "02_Tehnicni_Prevzem", "03_Uporabno_Dovoljenje",
+                             "04_Garancije", "05_Vzdrz_Navodila"],
+    "10_Interno": ["01_Interni_Zapiski", "02_Kolektor"]
+}
+
+DEFAULT_TEMPLATE = "standard"
+
+TEMPLATES_PATH = os.environ.get("DALUX_FOLDER_TEMPLATES", "folder_templates.json")
+
+Structure = Dict[str, Union[List[str], Dict]]
+
+
+@functools.lru_cache(maxsize=None)
+def load_templates(path: str = TEMPLATES_PATH) -> Dict:
+    """Template config from ``path`` merged over the built-in template.
+
+    A missing file is not an error: only ``standard`` is then available.
+    Read once per process.
+    """
+    config = {}
+    if os.path.isfile(path):
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+    return {
+        "default": config.get("default", DEFAULT_TEMPLATE),
+        "templates": {DEFAULT_TEMPLATE: MAPNA_STRUKTURA, **config.get("templates", {})},
+        "projects": dict(config.get("projects", {})),
+    }
+
+
+def get_template(name: Optional[str] = None, path: str = TEMPLATES_PATH) -> Structure:
+    """Template called ``name``, or the configured default"""
+    config = load_templates(path)
+    name = name or config["default"]
+    if name not in config["templates"]:
+        available = ", ".join(config["templates"])
+        raise Exception(f"Folder template not found: {name}. Available: {available}")
+    return config["templates"][name]
+
+
+def template_for_project(project_number: str, path: str = TEMPLATES_PATH) -> Structure:
+    return get_template(load_templates(path)["projects"].get(project_number), path)
+
+
+def template_paths(structure: Structure, prefix: str = "") -> List[str]:
+    """All folder paths of a template, each parent before its subfolders"""
+    paths = []
+    for name, subs in structure.items():
+        path = f"{prefix}/{name}" if prefix else name
+        paths.append(path)
+        if isinstance(subs, dict):
+            paths.extend(template_paths(subs, path))
+        else:
+            paths.extend(f"{path}/{sub}" for sub in subs)
+    return paths
+
+
+def missing_folders(folders: List[Dict], structure: Structure) -> List[str]:
+    """Template paths not present in a Dalux folder listing, parents first.
+
+    Paths are compared in full when the listing carries ``parentFolderId``;
+    a flat listing falls back to matching by folder name, like uploads do.
+    """
+    has_tree = any("parentFolderId" in folder.get("data", {}) for folder in folders)
+    existing = folder_tree_paths(folders)
+    return [
+        path for path in template_paths(structure)
+        if path not in existing and (has_tree or match_folder(folders, path) is None)
+    ]
+
+
+def by_depth(paths: List[str]) -> List[List[str]]:
+    """Group paths into levels that can each be created in one concurrent batch"""
+    levels: Dict[int, List[str]] = {}
+    for path in paths:
+        levels.setdefault(path.count("/"), []).append(path)
+    return [levels[depth] for depth in sorted(levels)]
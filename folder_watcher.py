@@ -0,0 +1,405 @@
+"""Watched-folder ingestion for scanner and network-share drops.
+
+Polls one or more directories and ingests every new file once it has
+stopped changing (same size and mtime for ``--stable-for`` seconds).
+Metadata is derived from the file name, the subfolder it was dropped in
+(when that is a target folder such as ``07_Gradnja/03_Foto_Porocila``)
+and the watch's defaults. Files are queued in the project's workspace for
+review in the Streamlit app; watches in ``auto`` mode upload files whose
+fields are all derived straight to Dalux and queue only the rest.
+
+    python folder_watcher.py --watch /mnt/scans/2024-017 --project 2024-017
+    DALUX_API_KEY=... python folder_watcher.py --config watch.json
+
+A config file lists the watches:
+
+    {"watches": [{"path": "/mnt/scans", "project": "2024-017", "mode": "auto",
+                  "defaults": {"lok": "IZV"}}],
+     "projects": ["2024-017", "2024-021"]}
+
+Only directories whose mtime changed are listed again, so a cycle costs a
+stat per directory plus a stat per file still being written.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, List, Optional, Tuple
+
+import file_processing
+from code_registry import CodeRegistry
+from metrics import get_metrics
+from workspace_store import WORKSPACE_DIR, WorkspaceStore
+
+
+STATE_PATH = os.path.join(WORKSPACE_DIR, "watcher.db")
+
+# Editors, scanners and copy tools write these while a file is incomplete
+IGNORED_PREFIXES = (".", "~$")
+IGNORED_SUFFIXES = (".tmp", ".part", ".partial", ".crdownload", ".download")
+
+WATCH_MODES = ("review", "auto")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingested (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    project TEXT NOT NULL DEFAULT '',
+    detail TEXT NOT NULL DEFAULT '',
+    ingested_at REAL NOT NULL
+);
+"""
+
+
+def is_ignored(name: str) -> bool:
+    return name.startswith(IGNORED_PREFIXES) or name.lower().endswith(IGNORED_SUFFIXES)
+
+
+class DirectoryScanner:
+    """Incremental poller for one directory tree.
+
+    A directory is listed again only when its mtime changed (an entry was
+    created, removed or renamed). New or changed files wait in ``pending``
+    and are re-stat'ed each poll until size and mtime have been stable for
+    ``stable_for`` seconds. Because some network shares do not update
+    directory mtimes reliably, every ``full_rescan_every`` polls all
+    directories are listed regardless.
+    """
+
+    def __init__(self, root: str, stable_for: float = 10.0, full_rescan_every: int = 60,
+                 known: Optional[Dict[str, Tuple[int, int]]] = None):
+        self.root = os.path.abspath(root)
+        self.stable_for = stable_for
+        self.full_rescan_every = full_rescan_every
+        self.known: Dict[str, Tuple[int, int]] = dict(known or {})
+        self.pending: Dict[str, Tuple[int, int, float]] = {}
+        self._dirs: Dict[str, Tuple[int, List[str]]] = {}
+        self._polls = 0
+
+    def _list_dir(self, path: str) -> Optional[List[str]]:
+        """Queue new files of ``path``; returns its subdirectories"""
+        subdirs = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if is_ignored(entry.name):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        stat = entry.stat()
+                        signature = (stat.st_size, stat.st_mtime_ns)
+                        if self.known.get(entry.path) != signature and entry.path not in self.pending:
+                            self.pending[entry.path] = (*signature, time.monotonic())
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            return None
+        return subdirs
+
+    def _scan(self, full: bool):
+        stack = [self.root]
+        while stack:
+            path = stack.pop()
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                self._dirs.pop(path, None)
+                continue
+            cached = self._dirs.get(path)
+            if full or cached is None or cached[0] != mtime:
+                subdirs = self._list_dir(path)
+                if subdirs is None:
+                    self._dirs.pop(path, None)
+                    continue
+                self._dirs[path] = (mtime, subdirs)
+            stack.extend(self._dirs[path][1])
+
+    def poll(self) -> List[Tuple[str, int, int]]:
+        """Files that became stable since the last poll, as (path, size, mtime_ns)"""
+        self._polls += 1
+        full = self.full_rescan_every > 0 and self._polls % self.full_rescan_every == 0
+        self._scan(full)
+
+        now = time.monotonic()
+        ready = []
+        for path, (size, mtime_ns, since) in list(self.pending.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                del self.pending[path]
+                continue
+            if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+                # Still being written, restart the debounce
+                self.pending[path] = (stat.st_size, stat.st_mtime_ns, now)
+            elif now - since >= self.stable_for:
+                del self.pending[path]
+                self.known[path] = (size, mtime_ns)
+                ready.append((path, size, mtime_ns))
+        return ready
+
+
+class FolderWatcher:
+    """Classifies stable files of the watched folders and routes them.
+
+    ``watches`` are dicts with ``path``, ``project``, ``mode`` (review or
+    auto) and optional field ``defaults``. Processed files are recorded in
+    a small SQLite state file, so a restart does not ingest them again.
+    """
+
+    def __init__(self, watches: List[Dict], store: WorkspaceStore, registry: CodeRegistry,
+                 projects: Tuple[str, ...] = (), state_path: str = STATE_PATH,
+                 stable_for: float = 10.0, full_rescan_every: int = 60,
+                 api_key: str = "", base_url: str = "https://node2.field.dalux.com/service/api",
+                 max_concurrency: int = 100, verify: bool = False):
+        self.watches = watches
+        self.store = store
+        self.registry = registry
+        self.projects = tuple(sorted(
+            set(projects) | {watch["project"] for watch in watches if watch.get("project")}
+        ))
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.verify = verify
+        self.metrics = get_metrics()
+
+        os.makedirs(os.path.dirname(os.path.abspath(state_path)), exist_ok=True)
+        self._conn = sqlite3.connect(state_path)
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+        known = {
+            path: (size, mtime_ns)
+            for path, size, mtime_ns in self._conn.execute("SELECT path, size, mtime_ns FROM ingested")
+        }
+        self.scanners = [
+            DirectoryScanner(watch["path"], stable_for=stable_for,
+                             full_rescan_every=full_rescan_every, known=known)
+            for watch in watches
+        ]
+
+    def classify(self, watch: Dict, root: str, path: str) -> Tuple[Dict, bool]:
+        """Metadata entry for ``path`` and whether every field was derived"""
+        file_name = os.path.basename(path)
+        entry = file_processing.build_file_entry(file_name)
+        entry.update(watch.get("defaults", {}))
+
+        entry.update(file_processing.classify_filename(
+            file_name, self.registry.snapshot().options, self.projects,
+            projekt_sifra=watch.get("project", "")
+        ))
+        if not entry.get('projekt_sifra'):
+            entry['projekt_sifra'] = watch.get("project", "")
+
+        # A file dropped in e.g. <watch>/07_Gradnja/03_Foto_Porocila targets that
+        # folder, if the project's template has it
+        _, folder_index = file_processing.project_folder_options(entry['projekt_sifra'])
+        relative_dir = os.path.relpath(os.path.dirname(path), root).replace(os.sep, '/')
+        if relative_dir in folder_index:
+            entry['target_subfolder'] = relative_dir
+
+        confident = bool(entry['projekt_sifra']) and file_processing.is_file_complete(entry)
+        return entry, confident
+
+    def _record(self, path: str, size: int, mtime_ns: int, status: str,
+                project: str = "", detail: str = ""):
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ingested (path, size, mtime_ns, status, project, detail, ingested_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, size, mtime_ns, status, project, detail, time.time())
+            )
+        self.metrics.inc("watcher_files_total", status=status)
+
+    def _queue(self, watch: Dict, path: str, entry: Dict) -> str:
+        """Add a file to the review workspace of the watch's project"""
+        workspace_id = watch.get("project") or entry['projekt_sifra']
+        entry = {key: value for key, value in entry.items() if key != 'blob_path'}
+        with open(path, 'rb') as f:
+            stored = self.store.add_file(workspace_id, os.path.basename(path), f, entry)
+        return "queued" if stored else "duplicate"
+
+    def _upload(self, batch: List[Tuple[Dict, str, int, int, Dict]]) -> Dict[str, str]:
+        """Upload confidently classified files; returns path -> error for failures"""
+        from batch_upload import upload_files_by_project
+
+        by_key = {}
+        failures = {}
+        entries = []
+        for watch, path, size, mtime_ns, entry in batch:
+            entry = {**entry, 'blob_path': path}
+            key = (entry['projekt_sifra'], entry['target_subfolder'],
+                   file_processing.generate_new_filename(entry, entry['projekt_sifra']))
+            if key in by_key:
+                # Both would upload as the same Dalux file; let a reviewer rename this one
+                failures[path] = f"Same target as {by_key[key]}: {'/'.join(key)}"
+                continue
+            by_key[key] = path
+            entries.append(entry)
+        if not entries:
+            return failures
+
+        files_by_project = file_processing.build_files_by_project(entries, "")
+        try:
+            results = upload_files_by_project(
+                self.api_key, files_by_project, self.base_url, self.max_concurrency,
+                verify=self.verify
+            )
+        except Exception as e:
+            failures.update({path: str(e) for path in by_key.values()})
+            return failures
+        failures.update({
+            by_key[(detail.get("project"), detail["folder"], detail["file"])]: detail.get("error", "")
+            for detail in results["details"]
+            if detail["status"] != "success"
+            and (detail.get("project"), detail["folder"], detail["file"]) in by_key
+        })
+        return failures
+
+    def run_once(self) -> Dict[str, int]:
+        """One polling cycle over all watches; returns counts per outcome"""
+        with self.metrics.timer("watcher_scan_seconds"):
+            ready = [
+                (watch, scanner, file_info)
+                for watch, scanner in zip(self.watches, self.scanners)
+                for file_info in scanner.poll()
+            ]
+        try:
+            return self._route(ready)
+        except Exception:
+            self._retry_unrecorded(ready)
+            raise
+
+    def _retry_unrecorded(self, ready: List[Tuple[Dict, DirectoryScanner, Tuple[str, int, int]]]):
+        """Hand files of a failed cycle that were not recorded back to their scanner"""
+        for watch, scanner, (path, size, mtime_ns) in ready:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns FROM ingested WHERE path = ?", (path,)
+            ).fetchone()
+            if row != (size, mtime_ns):
+                scanner.known.pop(path, None)
+                scanner.pending[path] = (size, mtime_ns, time.monotonic())
+
+    def _route(self, ready: List[Tuple[Dict, DirectoryScanner, Tuple[str, int, int]]]) -> Dict[str, int]:
+        summary = {"queued": 0, "uploaded": 0, "duplicate": 0, "failed": 0}
+        uploads = []
+
+        for watch, scanner, (path, size, mtime_ns) in ready:
+            try:
+                entry, confident = self.classify(watch, scanner.root, path)
+                if confident and watch.get("mode") == "auto" and self.api_key:
+                    uploads.append((watch, path, size, mtime_ns, entry))
+                    continue
+                status = self._queue(watch, path, entry)
+                self._record(path, size, mtime_ns, status, entry['projekt_sifra'])
+                summary[status] += 1
+            except OSError as e:
+                # Vanished or unreadable; forget it so a later copy is picked up
+                scanner.known.pop(path, None)
+                self._record(path, size, mtime_ns, "failed", detail=str(e))
+                summary["failed"] += 1
+
+        if uploads:
+            failures = self._upload(uploads)
+            for watch, path, size, mtime_ns, entry in uploads:
+                if path not in failures:
+                    self._record(path, size, mtime_ns, "uploaded", entry['projekt_sifra'])
+                    summary["uploaded"] += 1
+                    continue
+                # A failed upload is left for review instead of being lost
+                try:
+                    status = self._queue(watch, path, entry)
+                except OSError:
+                    status = "failed"
+                self._record(path, size, mtime_ns, status, entry['projekt_sifra'],
+                             detail=failures[path])
+                summary[status] += 1
+                summary["failed"] += 1
+
+        return summary
+
+    def run_forever(self, interval: float = 5.0, stop_event: Optional[threading.Event] = None):
+        """Poll until ``stop_event`` is set; a failing cycle is logged and retried"""
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            try:
+                summary = self.run_once()
+            except Exception:
+                # E.g. a locked workspace database; files this cycle did not
+                # record are offered again by the scanners
+                self.metrics.inc("watcher_errors_total")
+                print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} polling cycle failed:", file=sys.stderr)
+                traceback.print_exc()
+                sys.stderr.flush()
+            else:
+                if any(summary.values()):
+                    print(json.dumps({"time": time.strftime("%Y-%m-%d %H:%M:%S"), **summary}), flush=True)
+            stop_event.wait(interval)
+
+
+def load_watches(args) -> Tuple[List[Dict], Tuple[str, ...]]:
+    watches, projects = [], ()
+    if args.config:
+        with open(args.config, encoding="utf-8") as f:
+            config = json.load(f)
+        watches.extend(config.get("watches", []))
+        projects = tuple(config.get("projects", []))
+    for path in args.watch:
+        watches.append({"path": path, "project": args.project, "mode": args.mode})
+    for watch in watches:
+        watch.setdefault("mode", "review")
+        if watch["mode"] not in WATCH_MODES:
+            raise ValueError(f"Unknown watch mode: {watch['mode']}")
+        if not watch.get("project"):
+            raise ValueError(f"Watch {watch['path']} has no project")
+    return watches, projects
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Ingest files dropped into watched folders")
+    parser.add_argument("--config", default="", help="JSON file with the watches")
+    parser.add_argument("--watch", action="append", default=[], help="directory to watch")
+    parser.add_argument("--project", default="", help="project number for --watch directories")
+    parser.add_argument("--mode", choices=WATCH_MODES, default="review",
+                        help="review: always queue; auto: upload fully classified files")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between polls")
+    parser.add_argument("--stable-for", type=float, default=10.0,
+                        help="seconds a file must stay unchanged before it is ingested")
+    parser.add_argument("--full-rescan-every", type=int, default=60,
+                        help="list every directory each N polls, 0 to disable")
+    parser.add_argument("--api-key", default=os.environ.get("DALUX_API_KEY", ""))
+    parser.add_argument("--base-url", default="https://node2.field.dalux.com/service/api")
+    parser.add_argument("--verify", action="store_true", help="verify auto uploads")
+    parser.add_argument("--once", action="store_true", help="run a single polling cycle")
+    args = parser.parse_args(argv)
+
+    try:
+        watches, projects = load_watches(args)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if not watches:
+        parser.error("Nothing to watch: pass --watch or --config")
+    if any(watch["mode"] == "auto" for watch in watches) and not args.api_key:
+        print("No Dalux API key, auto watches only queue files for review", file=sys.stderr)
+
+    watcher = FolderWatcher(
+        watches, WorkspaceStore(), CodeRegistry(), projects=projects,
+        stable_for=args.stable_for, full_rescan_every=args.full_rescan_every,
+        api_key=args.api_key, base_url=args.base_url, verify=args.verify
+    )
+    if args.once:
+        print(json.dumps(watcher.run_once()))
+        return 0
+    try:
+        watcher.run_forever(args.interval)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+"""Timing and counters for the upload and export pipeline.
+
+Metrics are off unless ``DALUX_METRICS`` is set; the default registry is
+then a NullMetrics whose methods do nothing. ``DALUX_METRICS`` is a comma
+separated list of sinks:
+
+    log                       one JSON log line per observation
+    prometheus-file:<path>    Prometheus text format, rewritten at most every 5 s
+    prometheus-http:<port>    Prometheus text format served at /metrics
+
+Any non-empty value (e.g. ``1``) enables collection without a sink, which
+is enough for the sidebar admin panel.
+"""
+import bisect
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+
+logger = logging.getLogger("dalux.metrics")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def peak_rss_bytes() -> int:
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class NullMetrics:
+    """Disabled registry: every call is a no-op."""
+
+    enabled = False
+
+    def inc(self, name: str, value: float = 1, **labels):
+        pass
+
+    def observe(self, name: str, value: float, **labels):
+        pass
+
+    def set_gauge(self, name: str, value: float, **labels):
+        pass
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        yield
+
+    def snapshot(self) -> Dict:
+        return {"counters": {}, "gauges": {}, "histograms": {}}
+
+
+class Metrics(NullMetrics):
+    """Thread-safe registry of counters, gauges and latency histograms."""
+
+    enabled = True
+
+    def __init__(self, sinks: Optional[List] = None, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.sinks = sinks or []
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.gauges: Dict[str, Dict[LabelKey, float]] = {}
+        # name -> labels -> [bucket counts..., +Inf count, sum]
+        self.histograms: Dict[str, Dict[LabelKey, List[float]]] = {}
+
+    def _record(self, kind: str, name: str, value: float, labels: Dict):
+        for sink in self.sinks:
+            try:
+                sink.record(self, kind, name, value, labels)
+            except Exception:
+                logger.exception("Metrics sink %r failed", sink)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+        self._record("counter", name, value, labels)
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self.gauges.setdefault(name, {})[_label_key(labels)] = value
+        self._record("gauge", name, value, labels)
+
+    def observe(self, name: str, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            counts = series.get(key)
+            if counts is None:
+                counts = series[key] = [0] * (len(self.buckets) + 2)
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+        self._record("histogram", name, value, labels)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def snapshot(self) -> Dict:
+        """Plain-dict copy of all series, keyed by ``name{labels}``."""
+        def series_name(name: str, key: LabelKey) -> str:
+            if not key:
+                return name
+            return name + "{" + ",".join(f"{k}={v}" for k, v in key) + "}"
+
+        with self._lock:
+            histograms = {}
+            for name, series in self.histograms.items():
+                for key, counts in series.items():
+                    count = sum(counts[:-1])
+                    histograms[series_name(name, key)] = {
+                        "count": count,
+                        "sum": counts[-1],
+                        "avg": counts[-1] / count if count else 0.0,
+                    }
+            return {
+                "counters": {series_name(n, k): v for n, s in self.counters.items() for k, v in s.items()},
+                "gauges": {series_name(n, k): v for n, s in self.gauges.items() for k, v in s.items()},
+                "histograms": histograms,
+            }
+
+    def render_prometheus(self) -> str:
+        """Current values in the Prometheus text exposition format."""
+        def fmt_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            pairs = key + extra
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                lines.extend(f"{name}{fmt_labels(k)} {v}" for k, v in series.items())
+            for name, series in sorted(self.gauges.items()):
+                lines.append(f"# TYPE {name} gauge")
+                lines.extend(f"{name}{fmt_labels(k)} {v}" for k, v in series.items())
+            for name, series in sorted(self.histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, counts in series.items():
+                    cumulative = 0
+                    for bound, count in zip(self.buckets, counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{fmt_labels(key, (('le', str(bound)),))} {cumulative}")
+                    cumulative += counts[len(self.buckets)]
+                    lines.append(f"{name}_bucket{fmt_labels(key, (('le', '+Inf'),))} {cumulative}")
+                    lines.append(f"{name}_sum{fmt_labels(key)} {counts[-1]}")
+                    lines.append(f"{name}_count{fmt_labels(key)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+class LogSink:
+    """Writes every observation as one structured JSON log line."""
+
+    def __init__(self, log: logging.Logger = logger, level: int = logging.INFO):
+        self.log = log
+        self.level = level
+
+    def record(self, metrics: Metrics, kind: str, name: str, value: float, labels: Dict):
+        if self.log.isEnabledFor(self.level):
+            self.log.log(self.level, json.dumps(
+                {"metric": name, "kind": kind, "value": value, **labels}
+            ))
+
+
+class PrometheusFileSink:
+    """Rewrites a Prometheus text file at most every ``interval`` seconds."""
+
+    def __init__(self, path: str, interval: float = 5.0):
+        self.path = path
+        self.interval = interval
+        self._last_write = 0.0
+
+    def record(self, metrics: Metrics, kind: str, name: str, value: float, labels: Dict):
+        if time.monotonic() - self._last_write >= self.interval:
+            self.flush(metrics)
+
+    def flush(self, metrics: Metrics):
+        self._last_write = time.monotonic()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(metrics.render_prometheus())
+        os.replace(tmp_path, self.path)
+
+
+def start_metrics_server(metrics: Metrics, port: int, host: str = "0.0.0.0") -> "ThreadingHTTPServer":
+    """Serve ``metrics`` at ``/metrics`` on a background thread."""
+    # Imported here so importing this module stays cheap for the app's cold start
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def configure_from_env(spec: Optional[str] = None):
+    """Build the registry described by ``DALUX_METRICS`` (see module docstring)."""
+    spec = os.environ.get("DALUX_METRICS", "") if spec is None else spec
+    if not spec.strip():
+        return NullMetrics()
+
+    sinks = []
+    http_ports = []
+    for part in spec.split(","):
+        part = part.strip()
+        if part == "log":
+            sinks.append(LogSink())
+        elif part.startswith("prometheus-file:"):
+            sinks.append(PrometheusFileSink(part.split(":", 1)[1]))
+        elif part.startswith("prometheus-http:"):
+            http_ports.append(int(part.split(":", 1)[1]))
+
+    metrics = Metrics(sinks)
+    for port in http_ports:
+        start_metrics_server(metrics, port)
+    return metrics
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """Process-wide registry, configured from the environment on first use."""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = configure_from_env()
+    return _metrics
+
+
+def set_metrics(metrics):
+    global _metrics
+    _metrics = metrics
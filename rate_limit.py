@@ -0,0 +1,61 @@
+import multiprocessing
+import os
+import threading
+import time
+from typing import Optional
+
+
+class RateLimiter:
+    """Request budget of ``rate`` requests per second, bursts up to ``burst``.
+
+    The schedule (next free slot) lives in shared memory guarded by a
+    multiprocessing lock, so one limiter handed to the workers of a process
+    pool throttles them together; it works the same across threads. Pass
+    ``ctx`` when the pool uses a non-default start method.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, ctx=None):
+        ctx = ctx or multiprocessing.get_context()
+        self.interval = 1.0 / rate
+        self.burst = max(1, burst)
+        self._next = ctx.Value('d', 0.0, lock=False)
+        self._lock = ctx.Lock()
+
+    def reserve(self) -> float:
+        """Take the next slot; returns the seconds to wait before using it"""
+        with self._lock:
+            # CLOCK_MONOTONIC is system-wide, so processes compare the same clock
+            now = time.monotonic()
+            due = max(self._next.value, now)
+            self._next.value = due + self.interval
+        return max(0.0, due - now - (self.burst - 1) * self.interval)
+
+    def wait(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+_limiter: Optional[RateLimiter] = None
+_configured = False
+_limiter_lock = threading.Lock()
+
+
+def set_rate_limiter(limiter: Optional[RateLimiter]):
+    """Use ``limiter`` for every Dalux client created in this process"""
+    global _limiter, _configured
+    with _limiter_lock:
+        _limiter = limiter
+        _configured = True
+
+
+def get_rate_limiter() -> Optional[RateLimiter]:
+    """Process-wide limiter; from DALUX_RATE_LIMIT (requests/s) unless set explicitly"""
+    global _limiter, _configured
+    if not _configured:
+        with _limiter_lock:
+            if not _configured:
+                rate = float(os.environ.get("DALUX_RATE_LIMIT") or 0)
+                _limiter = RateLimiter(rate) if rate > 0 else None
+                _configured = True
+    return _limiter
@@ -0,0 +1,265 @@
+"""Multi-process upload of very large batches (archive migrations).
+
+The batch is split into shards, by target folder (whole folders per
+shard, balanced by bytes) or by a hash of the target path, and the shards
+are uploaded by a pool of worker processes. Each worker has its own
+upload client with pooled connections and its own discovery cache, so
+reading, hashing and request handling are no longer capped by one GIL.
+
+All workers take their requests from one shared RateLimiter and record
+finished files in a shared SQLite journal. A rerun with the same journal
+skips what is already uploaded, so an interrupted migration resumes where
+it stopped. The shard results are merged into one report.
+
+There are more shards than workers (``shards_per_process``), so a slow
+shard does not leave the other workers idle and the journal is written
+in small steps.
+"""
+import hashlib
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import file_processing
+from rate_limit import RateLimiter, set_rate_limiter
+from upload_progress import merge_project_results
+
+
+SHARD_MODES = ("folder", "hash")
+
+JOURNAL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploaded (
+    project TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    file TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    file_id TEXT NOT NULL DEFAULT '',
+    uploaded_at REAL NOT NULL,
+    PRIMARY KEY (project, folder, file)
+);
+"""
+
+FileKey = Tuple[str, str, str]
+
+
+def file_key(file_data: Dict, projekt_sifra: str) -> FileKey:
+    """(project, folder, new name) of an entry, as reported in upload details"""
+    return (file_processing.file_project(file_data, projekt_sifra),
+            file_data['target_subfolder'],
+            file_processing.generate_new_filename(file_data, projekt_sifra))
+
+
+class UploadJournal:
+    """Files already uploaded, shared by the workers of a sharded upload.
+
+    SQLite in WAL mode allows one writer at a time next to readers; each
+    worker writes one transaction per shard, so lock waits stay short.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=60)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.executescript(JOURNAL_SCHEMA)
+
+    def completed(self) -> Dict[FileKey, int]:
+        """Uploaded files and their sizes"""
+        return {
+            (project, folder, file): size
+            for project, folder, file, size in self._conn.execute(
+                "SELECT project, folder, file, size FROM uploaded"
+            )
+        }
+
+    def record(self, results: Dict, sizes: Dict[FileKey, int]):
+        """Record the successfully uploaded files of a (merged) result"""
+        now = time.time()
+        rows = []
+        for detail in results["details"]:
+            key = (detail.get("project", ""), detail["folder"], detail["file"])
+            if detail["status"] != "success" or key not in sizes:
+                continue
+            file_id = ((detail.get("result") or {}).get("data") or {}).get("fileId") or ""
+            rows.append((*key, sizes[key], str(file_id), now))
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO uploaded (project, folder, file, size, file_id, uploaded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def close(self):
+        self._conn.close()
+
+
+def shard_entries(entries: List[Dict], projekt_sifra: str, shard_count: int,
+                  by: str = "folder") -> List[List[Dict]]:
+    """Split entries into at most ``shard_count`` non-empty shards.
+
+    ``folder`` keeps each (project, folder) together, assigning the
+    largest folders first to the lightest shard; ``hash`` spreads files
+    evenly by a hash of their target path, which suits batches dominated
+    by a few huge folders.
+    """
+    if by not in SHARD_MODES:
+        raise Exception(f"Unknown shard mode: {by}. Available: {', '.join(SHARD_MODES)}")
+    shards: List[List[Dict]] = [[] for _ in range(max(1, shard_count))]
+
+    if by == "hash":
+        for file_data in entries:
+            digest = hashlib.blake2b("/".join(file_key(file_data, projekt_sifra)).encode("utf-8"),
+                                     digest_size=8).digest()
+            shards[int.from_bytes(digest, "big") % len(shards)].append(file_data)
+    else:
+        groups: Dict[Tuple[str, str], List[Dict]] = {}
+        for file_data in entries:
+            groups.setdefault(file_key(file_data, projekt_sifra)[:2], []).append(file_data)
+        loads = [0] * len(shards)
+        for group in sorted(groups.values(), key=lambda g: sum(file_processing.entry_size(f) for f in g), reverse=True):
+            lightest = loads.index(min(loads))
+            shards[lightest].extend(group)
+            loads[lightest] += sum(file_processing.entry_size(f) for f in group)
+
+    return [shard for shard in shards if shard]
+
+
+# Per worker process, set up by _init_worker
+_journal: Optional[UploadJournal] = None
+
+
+def _init_worker(limiter: Optional[RateLimiter], journal_path: str):
+    global _journal
+    set_rate_limiter(limiter)
+    _journal = UploadJournal(journal_path) if journal_path else None
+
+
+def _upload_shard(index: int, entries: List[Dict], projekt_sifra: str, options: Dict) -> Dict:
+    """Upload one shard in a worker process; returns its merged results"""
+    from batch_upload import upload_files_by_project
+
+    started = time.perf_counter()
+    sizes = {file_key(f, projekt_sifra): file_processing.entry_size(f) for f in entries}
+    files_by_project = file_processing.build_files_by_project(entries, projekt_sifra)
+    try:
+        results = upload_files_by_project(
+            options["api_key"], files_by_project, options["base_url"],
+            options["max_concurrency"], options["file_area_name"],
+            verify=options["verify"], reupload_mismatched=options["reupload_mismatched"]
+        )
+    except Exception as e:
+        results = _failed_results(sizes, e)
+    if _journal is not None:
+        _journal.record(results, sizes)
+    results["shard"] = _shard_info(index, os.getpid(), sizes, time.perf_counter() - started, results)
+    return results
+
+
+def _failed_results(sizes: Dict[FileKey, int], error: Exception) -> Dict:
+    """Results with every file of a shard failed with ``error``"""
+    return {"success": 0, "failed": len(sizes), "cancelled": 0, "projects": {},
+            "details": [{"project": key[0], "folder": key[1], "file": key[2],
+                         "status": "failed", "error": str(error)} for key in sizes]}
+
+
+def _shard_info(index: int, pid: Optional[int], sizes: Dict[FileKey, int],
+                seconds: float, results: Dict) -> Dict:
+    return {
+        "index": index,
+        "pid": pid,
+        "files": len(sizes),
+        "bytes": sum(sizes.values()),
+        "seconds": seconds,
+        "success": results["success"],
+        "failed": results["failed"],
+    }
+
+
+def provision_projects(api_key: str, projects: List[str], base_url: str,
+                       file_area_name: str = "") -> int:
+    """Create missing template folders once, before workers start uploading"""
+    from dalux_api import DaluxUploadManager
+
+    manager = DaluxUploadManager(
+        api_key, base_url=base_url,
+        file_area_names={project: file_area_name for project in projects} if file_area_name else None
+    )
+    return sum(len(manager.provision_folders(project)["created"]) for project in projects)
+
+
+def upload_sharded(api_key: str, entries: List[Dict], projekt_sifra: str, base_url: str,
+                   processes: Optional[int] = None, shard_by: str = "folder",
+                   shards_per_process: int = 4, max_concurrency: int = 100,
+                   file_area_name: str = "", verify: bool = False,
+                   reupload_mismatched: bool = False, provision_folders: bool = False,
+                   journal_path: str = "", rate_limit: float = 0.0) -> Dict:
+    """Upload complete ``entries`` with a pool of ``processes`` workers.
+
+    ``max_concurrency`` applies per worker; ``rate_limit`` (requests per
+    second, 0 for none) applies to all workers together. With
+    ``journal_path`` files already in the journal with the same size are
+    skipped and counted as ``journal_skipped``. ``base_url`` may be a list
+    of URLs, assigned to the shards in turn (e.g. several stub servers in a
+    benchmark).
+    """
+    processes = processes or os.cpu_count() or 1
+    base_urls = [base_url] if isinstance(base_url, str) else list(base_url)
+    entries = [f for f in entries if file_processing.is_file_complete(f)]
+
+    skipped = 0
+    if journal_path:
+        journal = UploadJournal(journal_path)
+        done = journal.completed()
+        journal.close()
+        pending = [f for f in entries if done.get(file_key(f, projekt_sifra)) != file_processing.entry_size(f)]
+        skipped = len(entries) - len(pending)
+        entries = pending
+
+    folders_created = None
+    if provision_folders:
+        projects = sorted({file_processing.file_project(f, projekt_sifra) for f in entries})
+        folders_created = provision_projects(api_key, projects, base_urls[0], file_area_name)
+
+    shards = shard_entries(entries, projekt_sifra, processes * shards_per_process, by=shard_by)
+    limiter = RateLimiter(rate_limit, burst=processes) if rate_limit > 0 else None
+    workers = max(1, min(processes, len(shards)))
+
+    started = time.perf_counter()
+    shard_results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(limiter, journal_path)) as pool:
+        futures = {
+            pool.submit(_upload_shard, index, shard, projekt_sifra, {
+                "api_key": api_key,
+                "base_url": base_urls[index % len(base_urls)],
+                "max_concurrency": max_concurrency,
+                "file_area_name": file_area_name,
+                "verify": verify,
+                "reupload_mismatched": reupload_mismatched,
+            }): index
+            for index, shard in enumerate(shards)
+        }
+        for future in as_completed(futures):
+            try:
+                shard_results.append(future.result())
+            except Exception as e:
+                # The worker died (e.g. BrokenProcessPool) without returning;
+                # report the whole shard failed, a rerun retries whatever the
+                # journal does not hold
+                index = futures[future]
+                sizes = {file_key(f, projekt_sifra): file_processing.entry_size(f) for f in shards[index]}
+                results = _failed_results(sizes, e)
+                results["shard"] = _shard_info(index, None, sizes, 0.0, results)
+                shard_results.append(results)
+
+    shard_results.sort(key=lambda results: results["shard"]["index"])
+    merged = merge_project_results(shard_results)
+    merged["shards"] = [results["shard"] for results in shard_results]
+    merged["processes"] = workers
+    merged["seconds"] = time.perf_counter() - started
+    merged["journal_skipped"] = skipped
+    if folders_created is not None:
+        merged["folders_created"] = folders_created
+    return merged
@@ -1,53 +1,20 @@
-import os
 import io
-import zipfile
+import importlib.util
+import uuid
 import streamlit as st
 from datetime import datetime
-from pathlib import Path
-from typing import Dict, List
-try:
-    from dalux_api import DaluxUploadManager
-    DALUX_AVAILABLE = True
-except ImportError:
-    DALUX_AVAILABLE = False
-
-# Constants
-TIP_OPTIONS = {
-    "NAC": "Načrt", "DOK": "Dokument", "FOT": "Fotografija", "SIT": "Situacija",
-    "PRO": "Projekt", "DOP": "Dopis", "POR": "Poročilo", "PON": "Ponudba",
-    "POG": "Pogodba", "NAR": "Naročilo", "RAC": "Račun", "KOI": "Kontrola",
-    "TER": "Terminski plan", "SPE": "Specifikacija", "EVD": "Evidenca"
-}
-
-FAZA_OPTIONS = {
-    "PON": "Ponudba", "PRO": "Projektiranje", "PGD": "PGD",
-    "PZI": "PZI", "PID": "PID", "IZV": "Izvedba",
-    "ZAK": "Zaključek", "GAR": "Garancija", "SPL": "Splošno"
-}
-
-LOK_OPTIONS = {
-    "NAR": "Naročnik", "IZV": "Izvajalec", "NAD": "Nadzornik",
-    "PRO": "Projektant", "PDI": "Podizvajalec", "DOB": "Dobavitelj",
-    "SKO": "Ostalo"
-}
-
-MAPNA_STRUKTURA = {
-    "00_Navodila": [],
-    "01_Pogodba_Admin": [
-        "01_Ponudbe", "02_Pogodba", "03_Dodatki_Pogodbi",
-        "04_Imenovanja", "05_Odlocbe", "06_Zavarovanja"
-    ],
-    "02_Projektna_dok": ["01_IDZ", "02_PGD", "03_PZI", "04_PID", "05_Soglasja"],
-    "03_Izvedbena_dok": ["01_Atesti", "02_Delavniski_Nacrti", "03_Izjave_Certifikati", "04_Tehnicna_Dok"],
-    "04_Planiranje": ["01_Terminski_Plan", "02_Fazni_Plan", "03_Sestanki"],
-    "05_Nabava": ["01_Narocila", "02_Podizvajalci", "03_Dobavnice", "04_Ponudbe_Dobav"],
-    "06_Financno": ["01_Situacije", "02_Dodatna_Dela", "03_Racuni", "04_Poravnave"],
-    "07_Gradnja": ["01_Gradbeni_Dnevnik", "02_Zapisniki", "03_Foto_Porocila", "04_Kontrole", "05_Meritve"],
-    "08_Korespondenca": ["01_Dopisi", "02_Odgovori", "03_Zahtevki", "04_Reklamacije"],
-    "09_Prevzem_garancije": ["01_PID_Izvedeno", "02_Tehnicni_Prevzem", "03_Uporabno_Dovoljenje",
-                             "04_Garancije", "05_Vzdrz_Navodila"],
-    "10_Interno": ["01_Interni_Zapiski", "02_Kolektor"]
-}
+from typing import Dict, Optional
+from upload_progress import format_progress
+from upload_jobs import ACTIVE_STATUSES, UploadJobManager
+import file_processing
+import upload_plan
+from metrics import get_metrics
+from workspace_store import CLAIM_PAGE_SIZE, WorkspaceStore, session_workspace_id
+from code_registry import CodeRegistry
+from dalux_cache import select_file_area
+from file_processing import is_file_complete
+# dalux_api (and requests with it) is imported on first Dalux use, not per session start
+DALUX_AVAILABLE = importlib.util.find_spec("requests") is not None
 
 # Page config
 st.set_page_config(
@@ -117,13 +84,6 @@ def init_session_state():
     if 'projekt_started' not in st.session_state:
         st.session_state.projekt_started = False
 
-    if 'TIP_OPTIONS' not in st.session_state:
-        st.session_state.TIP_OPTIONS = TIP_OPTIONS.copy()
-    if 'FAZA_OPTIONS' not in st.session_state:
-        st.session_state.FAZA_OPTIONS = FAZA_OPTIONS.copy()
-    if 'LOK_OPTIONS' not in st.session_state:
-        st.session_state.LOK_OPTIONS = LOK_OPTIONS.copy()
-
     if 'dalux_api_key' not in st.session_state:
         st.session_state.dalux_api_key = ""
     if 'dalux_connected' not in st.session_state:
@@ -132,6 +92,8 @@ def init_session_state():
         st.session_state.dalux_project_id = ""
     if 'dalux_file_area_id' not in st.session_state:
         st.session_state.dalux_file_area_id = ""
+    if 'dalux_file_area_name' not in st.session_state:
+        st.session_state.dalux_file_area_name = ""
     if 'upload_mode' not in st.session_state:
         st.session_state.upload_mode = "zip"  # "zip" or "dalux"
 
@@ -139,125 +101,216 @@ def init_session_state():
         st.session_state.load_projects = False
     if 'temp_api_key' not in st.session_state:
         st.session_state.temp_api_key = ""
+    if 'active_job_id' not in st.session_state:
+        st.session_state.active_job_id = ""
+    if 'workspace_id' not in st.session_state:
+        st.session_state.workspace_id = ""
+    if 'dalux_projects' not in st.session_state:
+        st.session_state.dalux_projects = {}
+    if 'resolved_plan' not in st.session_state:
+        st.session_state.resolved_plan = None
 
 init_session_state()
 
 # Helper functions
+@st.cache_resource
+def get_workspace_store() -> WorkspaceStore:
+    """Process-wide persistent workspace store"""
+    return WorkspaceStore()
+
+@st.cache_resource
+def get_code_registry() -> CodeRegistry:
+    """Process-wide TIP/FAZA/LOK code dictionaries shared by all sessions"""
+    return CodeRegistry()
+
+def session_token() -> str:
+    """Owner of this session's workspaces; kept in the URL so a reload reopens them"""
+    token = st.query_params.get("ws", "")
+    if not (token.isalnum() and len(token) == 32):
+        token = uuid.uuid4().hex
+        st.query_params["ws"] = token
+    return token
+
+def open_workspace(project_number: str):
+    """Load this session's workspace of a project into the session"""
+    workspace_id = session_workspace_id(project_number, session_token())
+    st.session_state.workspace_id = workspace_id
+    st.session_state.files = list(get_workspace_store().iter_files(workspace_id))
+
 def add_file_to_processing(uploaded_file):
-    """Add uploaded file to processing list"""
-    file_content = uploaded_file.read()
+    """Add uploaded file to processing list and persist it in the workspace"""
     file_name = uploaded_file.name
     
     # Check if already added
-    existing = [f['original_name'] for f in st.session_state.files]
-    if file_name in existing:
+    if any(f['original_name'] == file_name for f in st.session_state.files):
         return False
     
-    entry = {
-        'original_name': file_name,
-        'content': file_content,
-        'extension': os.path.splitext(file_name)[1][1:],
-        'tip': '',
-        'faza': '',
-        'lok': '',
-        'ime': os.path.splitext(file_name)[0].replace(' ', '_')[:100],
-        'datum': '',
-        'target_subfolder': ''
-    }
+    entry = get_workspace_store().add_file(
+        st.session_state.workspace_id, file_name, uploaded_file,
+        file_processing.build_file_entry(file_name)
+    )
+    if entry is None:
+        return False
     st.session_state.files.append(entry)
     return True
 
-def upload_to_dalux():
-    """Upload all files to Dalux"""
+def set_file_field(file_data: Dict, field: str, value: str):
+    """Update one metadata field, persisting it only when it changed"""
+    if file_data.get(field) == value:
+        return
+    file_data[field] = value
+    get_workspace_store().update_file(
+        st.session_state.workspace_id, file_data['file_id'], **{field: value}
+    )
+
+@st.cache_resource
+def get_job_manager() -> UploadJobManager:
+    """Process-wide job manager shared by all sessions"""
+    return UploadJobManager()
+
+@st.cache_resource
+def get_upload_manager(api_key: str):
+    """Upload manager per API key; its discovery cache outlives reruns"""
+    from dalux_api import DaluxUploadManager
+    return DaluxUploadManager(api_key)
+
+def upload_to_dalux(verify: bool = False, reupload_mismatched: bool = False,
+                    provision_folders: bool = False):
+    """Submit all complete files as a background Dalux upload job"""
     if not DALUX_AVAILABLE:
         st.error("Dalux API module not available")
-        return False
+        return None
     
     try:
-        manager = DaluxUploadManager(st.session_state.dalux_api_key)
-        
-        # Prepare files organized by folder
-        files_dict = {}
-        for file_data in st.session_state.files:
-            if is_file_complete(file_data):
-                folder_path = file_data['target_subfolder']
-                filename = generate_new_filename(file_data)
-                content = file_data['content']
-                
-                if folder_path not in files_dict:
-                    files_dict[folder_path] = []
-                files_dict[folder_path].append((filename, content))
-        
-        # Upload using project_id
-        with st.spinner("Nalagam datoteke v Dalux..."):
-            results = manager.bulk_upload_from_structure(
-                st.session_state.projekt_sifra,  
-                files_dict
-            )
+        # Prepare files organized by project, then by folder
+        files_by_project = file_processing.build_files_by_project(
+            st.session_state.files, st.session_state.projekt_sifra
+        )
         
-        return results
+        file_area_names = {}
+        if st.session_state.dalux_file_area_name:
+            file_area_names[st.session_state.projekt_sifra] = st.session_state.dalux_file_area_name
+        
+        job_id = get_job_manager().submit_multi(
+            st.session_state.dalux_api_key,
+            files_by_project,
+            file_area_names=file_area_names,
+            verify=verify,
+            reupload_mismatched=reupload_mismatched,
+            provision_folders=provision_folders
+        )
+        st.session_state.active_job_id = job_id
+        return job_id
     
     except Exception as e:
         st.error(f"Napaka pri nalaganju v Dalux: {str(e)}")
         return None
 
-def generate_new_filename(file_data: Dict) -> str:
-    """Generate new filename from metadata"""
-    parts = [
-        st.session_state.projekt_sifra,
-        file_data.get('tip', ''),
-        file_data.get('faza', ''),
-        file_data.get('lok', ''),
-        file_data.get('ime', '')
-    ]
-    
-    if file_data.get('datum'):
-        try:
-            dt = datetime.strptime(file_data['datum'], "%Y%m%d")
-            parts.append(dt.strftime("%Y%m%d"))
-        except:
-            pass
-    
-    parts = [p for p in parts if p]
-    if not parts:
-        return ""
-    
-    ext = file_data.get('extension', '')
-    return f"{'-'.join(parts)}{'.' + ext if ext else ''}"
-    
+JOB_STATUS_LABELS = {
+    "queued": "⏳ V čakalni vrsti",
+    "running": "☁️ Nalaganje poteka",
+    "completed": "✅ Končano",
+    "failed": "❌ Napaka",
+    "cancelled": "⏹️ Preklicano",
+    "interrupted": "⚠️ Prekinjeno (ponovni zagon strežnika)"
+}
 
-def is_file_complete(file_data: Dict) -> bool:
-    """Check if file has all required data"""
-    return all([
-        file_data.get('tip'),
-        file_data.get('faza'),
-        file_data.get('lok'),
-        file_data.get('ime'),
-        file_data.get('target_subfolder')
-    ])
+def render_upload_job(job_id: str):
+    """Show a background upload job; its status is polled only while it is active"""
+    job = get_job_manager().get(job_id)
+    if job and job['status'] in ACTIVE_STATUSES:
+        render_active_upload_job(job_id)
+    else:
+        render_upload_job_status(job)
 
+@st.fragment(run_every=2)
+def render_active_upload_job(job_id: str):
+    job = get_job_manager().get(job_id)
+    if job and job['status'] not in ACTIVE_STATUSES:
+        # Finished: one full rerun swaps in the view that is not polled
+        st.rerun()
+    render_upload_job_status(job)
+
+def render_upload_job_status(job: Optional[Dict]):
+    """Status of a background upload job with cancel/retry controls"""
+    manager = get_job_manager()
+    if not job:
+        st.info("Nalaganje ni več na voljo")
+        return
+    job_id = job['id']
+    
+    st.markdown(f"**Nalaganje `{job['id']}`** · projekt {job['project_number']} · {JOB_STATUS_LABELS.get(job['status'], job['status'])}")
+    
+    event = job.get('progress')
+    if event:
+        total = event['total_bytes'] or 1
+        st.progress(min(event['bytes_sent'] / total, 1.0),
+                    text=f"{event['files_done']}/{event['total_files']} datotek")
+        st.caption(format_progress(event))
+    elif job['status'] == 'queued':
+        st.progress(0.0, text="Čakam na prost termin za nalaganje...")
+    
+    btn_col1, btn_col2 = st.columns(2)
+    with btn_col1:
+        if st.button("⏹️ Prekliči", key=f"cancel_{job_id}",
+                     disabled=job['status'] not in ACTIVE_STATUSES,
+                     use_container_width=True):
+            manager.cancel(job_id)
+            st.rerun()
+    with btn_col2:
+        if st.button("🔁 Ponovi neuspešne", key=f"retry_{job_id}",
+                     disabled=not manager.can_retry(job_id),
+                     use_container_width=True):
+            new_job_id = manager.retry(job_id)
+            if new_job_id:
+                st.session_state.active_job_id = new_job_id
+            st.rerun()
+    
+    if job.get('error'):
+        st.error(f"Napaka pri nalaganju v Dalux: {job['error']}")
+    
+    results = job.get('results')
+    if results:
+        st.success(f"✅ Uspešno naloženih: {results['success']}")
+        if results['failed'] > 0:
+            st.error(f"❌ Neuspešnih: {results['failed']}")
+        if 'verified' in results:
+            st.caption(
+                f"🔒 Preverjenih: {results['verified']} · neujemajočih: {results.get('mismatched', 0)}"
+                f" · ponovno naloženih: {results.get('reuploaded', 0)}"
+                f" · nepreverjenih: {results.get('unverified', 0)}"
+            )
+        if results.get('folders_created'):
+            st.caption(f"📁 Ustvarjenih map: {results['folders_created']}")
+        
+        if len(results.get('projects', {})) > 1:
+            st.dataframe(
+                [{"projekt": number, "uspešnih": r['success'], "neuspešnih": r['failed'],
+                  "preklicanih": r['cancelled'], "napaka": r.get('error') or ""}
+                 for number, r in results['projects'].items()],
+                hide_index=True, use_container_width=True
+            )
+        
+        # Show details
+        with st.expander("📋 Podrobnosti nalaganja"):
+            for detail in results['details']:
+                if detail['status'] == 'success':
+                    verified = " 🔒" if detail.get('verified') else (" ❔ nepreverjeno" if detail.get('unverified') else "")
+                    st.success(f"✅ {detail['file']} → {detail['folder']}{verified}")
+                elif detail['status'] == 'cancelled':
+                    st.warning(f"⏹️ {detail['file']}: {detail['error']}")
+                else:
+                    st.error(f"❌ {detail['file']}: {detail['error']}")
 
+def generate_new_filename(file_data: Dict) -> str:
+    """Generate new filename from metadata"""
+    return file_processing.generate_new_filename(file_data, st.session_state.projekt_sifra)
 
 def create_zip_with_structure() -> io.BytesIO:
     """Create ZIP file with proper folder structure and renamed files"""
-    zip_buffer = io.BytesIO()
-    
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        # Create folder structure (empty folders)
-        for main, subs in MAPNA_STRUKTURA.items():
-            zip_file.writestr(f"{main}/", "")
-            for sub in subs:
-                zip_file.writestr(f"{main}/{sub}/", "")
-        
-        # Add renamed files
-        for file_data in st.session_state.files:
-            if is_file_complete(file_data):
-                new_name = generate_new_filename(file_data)
-                target_path = f"{file_data['target_subfolder']}/{new_name}"
-                zip_file.writestr(target_path, file_data['content'])
-    
-    zip_buffer.seek(0)
-    return zip_buffer
+    return file_processing.create_zip_with_structure(
+        st.session_state.files, st.session_state.projekt_sifra
+    )
 
 def add_custom_option(dict_key: str, code: str, desc: str):
     code = code.strip().upper()
@@ -267,10 +320,9 @@ def add_custom_option(dict_key: str, code: str, desc: str):
         return "❌ Vnesi kodo in opis"
     if len(code) != 3:
         return "❌ Koda mora imeti 3 črke"
-    if code in st.session_state[dict_key]:
+    if get_code_registry().add_code(dict_key, code, desc) is None:
         return "❌ Ta koda že obstaja"
     
-    st.session_state[dict_key][code] = desc
     return f"✅ Dodano: {code} — {desc}"
 
 # Main app
@@ -304,11 +356,10 @@ if not st.session_state.projekt_started:
         if st.session_state.get('load_projects', False) and st.session_state.get('temp_api_key'):
             if DALUX_AVAILABLE:
                 try:
-                    from dalux_api import DaluxAPIClient
-                    client = DaluxAPIClient(st.session_state.temp_api_key)
+                    manager = get_upload_manager(st.session_state.temp_api_key)
                     
                     with st.spinner("Nalagam projekte..."):
-                        projects = client.get_all_projects()
+                        projects = manager.list_projects()
                     
                     if projects:
                         # Create options for selectbox
@@ -325,6 +376,20 @@ if not st.session_state.projekt_started:
                             key="project_selector"
                         )
                         
+                        file_areas = []
+                        file_area_name = ""
+                        if selected:
+                            file_areas = manager.get_file_areas(project_options[selected]['projectId'])
+                            area_names = [fa['data'].get('fileAreaName', '') for fa in file_areas]
+                            if len(area_names) > 1:
+                                file_area_name = st.selectbox(
+                                    "Področje datotek:",
+                                    options=area_names,
+                                    key="file_area_selector"
+                                )
+                            elif area_names:
+                                file_area_name = area_names[0]
+                        
                         st.markdown("<br>", unsafe_allow_html=True)
                         
                         if st.button("▶ Začni projekt", type="primary", use_container_width=True, disabled=not selected):
@@ -332,17 +397,18 @@ if not st.session_state.projekt_started:
                             st.session_state.projekt_sifra = project_data['number']
                             st.session_state.dalux_api_key = st.session_state.temp_api_key
                             st.session_state.dalux_project_id = project_data['projectId']
+                            st.session_state.dalux_projects = {
+                                data['number']: data.get('projectName', '') for data in project_options.values()
+                            }
                             st.session_state.projekt_started = True
+                            open_workspace(project_data['number'])
                             
                             # Setup file area
-                            try:
-                                manager = DaluxUploadManager(st.session_state.dalux_api_key)
-                                file_areas = manager.client.get_file_areas(project_data['projectId'])
-                                if file_areas:
-                                    st.session_state.dalux_file_area_id = file_areas[0]["data"]["fileAreaId"]
-                                    st.session_state.dalux_connected = True
-                            except:
-                                pass
+                            if file_areas:
+                                file_area = select_file_area(file_areas, file_area_name)
+                                st.session_state.dalux_file_area_id = file_area["fileAreaId"]
+                                st.session_state.dalux_file_area_name = file_area.get("fileAreaName", "")
+                                st.session_state.dalux_connected = True
                             
                             # Clean up temp state
                             st.session_state.load_projects = False
@@ -387,8 +453,11 @@ with st.sidebar:
         st.session_state.projekt_sifra = ""
         st.session_state.dalux_project_id = ""
         st.session_state.dalux_file_area_id = ""
+        st.session_state.dalux_file_area_name = ""
         st.session_state.dalux_api_key = ""
         st.session_state.dalux_connected = False
+        # The workspace stays on disk and is reloaded when the project is picked again
+        st.session_state.workspace_id = ""
         st.session_state.files = []
         st.session_state.current_index = 0
         st.session_state.current_page = 0
@@ -401,11 +470,66 @@ with st.sidebar:
         st.success("✅ Povezan z Dalux")
         st.caption(f"Projekt ID: {st.session_state.dalux_project_id}")
         st.caption(f"Šifra: {st.session_state.projekt_sifra}")
+        if st.session_state.dalux_file_area_name:
+            st.caption(f"Področje: {st.session_state.dalux_file_area_name}")
+        if st.button("🔄 Osveži Dalux predpomnilnik", use_container_width=True,
+                     help="Ponovno preberi projekte, področja in mape iz Dalux"):
+            get_upload_manager(st.session_state.dalux_api_key).invalidate()
+            st.success("Predpomnilnik osvežen")
     else:
         st.info("ℹ️ Dalux povezava se vzpostavi pri izbiri projekta")
     
+    # Files queued for review by the folder watcher (folder_watcher.py) in the
+    # project's workspace; taken into this session's workspace a page at a time
+    if st.session_state.workspace_id:
+        queued = get_workspace_store().count_files(st.session_state.projekt_sifra)
+        if queued > 0:
+            st.info(f"📥 {queued} novih datotek iz nadzorovane mape")
+            if st.button(f"📥 Prevzemi nove datoteke (do {CLAIM_PAGE_SIZE})", use_container_width=True):
+                st.session_state.files.extend(get_workspace_store().claim_files(
+                    st.session_state.projekt_sifra, st.session_state.workspace_id, limit=CLAIM_PAGE_SIZE
+                ))
+                st.rerun()
+    
+    if st.session_state.dalux_api_key:
+        jobs = get_job_manager().list_jobs(st.session_state.dalux_api_key)
+        if jobs:
+            st.subheader("☁️ Nalaganja v ozadju")
+            for job in jobs[:5]:
+                label = f"{JOB_STATUS_LABELS.get(job['status'], job['status'])} · {job['project_number']} · {job['total_files']} dat."
+                if st.button(label, key=f"attach_{job['id']}", use_container_width=True):
+                    st.session_state.active_job_id = job['id']
+                    st.rerun()
+    
     st.markdown("---")
     
+    metrics = get_metrics()
+    if metrics.enabled:
+        with st.expander("📊 Metrike (admin)", expanded=False):
+            snapshot = metrics.snapshot()
+            if snapshot['histograms']:
+                st.caption("Trajanje (s)")
+                st.dataframe(
+                    [{"metrika": name, "število": h['count'], "povprečje": round(h['avg'], 4), "skupaj": round(h['sum'], 2)}
+                     for name, h in sorted(snapshot['histograms'].items())],
+                    hide_index=True, use_container_width=True
+                )
+            if snapshot['counters'] or snapshot['gauges']:
+                st.caption("Števci")
+                st.dataframe(
+                    [{"metrika": name, "vrednost": value}
+                     for name, value in sorted({**snapshot['counters'], **snapshot['gauges']}.items())],
+                    hide_index=True, use_container_width=True
+                )
+            st.download_button(
+                "⬇️ Prometheus izvoz",
+                data=metrics.render_prometheus(),
+                file_name="dalux_metrics.prom",
+                mime="text/plain",
+                use_container_width=True
+            )
+        st.markdown("---")
+    
     st.header("ℹ️ Navodila")
     with st.expander("📖 Kako uporabljati", expanded=False):
         st.markdown("""
@@ -447,6 +571,7 @@ with st.sidebar:
         st.metric("Napredek", f"{complete}/{len(st.session_state.files)}")
         
         if st.button("🗑️ Počisti vse", type="secondary"):
+            get_workspace_store().clear(st.session_state.workspace_id)
             st.session_state.files = []
             st.session_state.current_index = 0
             st.rerun()
@@ -531,7 +656,8 @@ with col1:
             with col_delete:
                 if st.button("❌", key=f"delete_{idx}", help="Odstrani datoteko"):
                     # Remove the file
-                    st.session_state.files.pop(idx)
+                    removed = st.session_state.files.pop(idx)
+                    get_workspace_store().delete_file(st.session_state.workspace_id, removed['file_id'])
                     
                     # Adjust current index if needed
                     if len(st.session_state.files) > 0:
@@ -575,33 +701,49 @@ with col2:
         
         st.markdown("---")
         
+        # Files of a mixed batch can be routed to other projects
+        project_numbers = [st.session_state.projekt_sifra] + sorted(
+            n for n in st.session_state.dalux_projects if n != st.session_state.projekt_sifra
+        )
+        file_projekt = current_file.get('projekt_sifra') or st.session_state.projekt_sifra
+        projekt = st.selectbox(
+            "PROJEKT:",
+            options=project_numbers,
+            format_func=lambda x: f"{x} - {st.session_state.dalux_projects.get(x, '')}".rstrip(" -"),
+            index=project_numbers.index(file_projekt) if file_projekt in project_numbers else 0,
+            key=f"projekt_{st.session_state.current_index}",
+            help="Privzeto projekt seje; za mešane pakete izberi drug projekt"
+        )
+        set_file_field(current_file, 'projekt_sifra', "" if projekt == st.session_state.projekt_sifra else projekt)
+        
         # Form
+        codes = get_code_registry().snapshot()
         tip = st.selectbox(
             "TIP dokumenta: *",
-            options=[""] + list(st.session_state.TIP_OPTIONS.keys()),
-            format_func=lambda x: f"{x} - {st.session_state.TIP_OPTIONS.get(x, '')}" if x else "⚠️ Izberi TIP...",
-            index=list(TIP_OPTIONS.keys()).index(current_file['tip']) + 1 if current_file['tip'] in TIP_OPTIONS else 0,
+            options=codes.option_lists["TIP_OPTIONS"],
+            format_func=lambda x: f"{x} - {codes.options['TIP_OPTIONS'].get(x, '')}" if x else "⚠️ Izberi TIP...",
+            index=codes.index_of("TIP_OPTIONS", current_file['tip']),
             key=f"tip_{st.session_state.current_index}"
         )
-        current_file['tip'] = tip
+        set_file_field(current_file, 'tip', tip)
         
         faza = st.selectbox(
             "FAZA projekta: *",
-            options=[""] + list(st.session_state.FAZA_OPTIONS.keys()),
-            format_func=lambda x: f"{x} - {st.session_state.FAZA_OPTIONS.get(x, '')}" if x else "⚠️ Izberi FAZO...",
-            index=list(FAZA_OPTIONS.keys()).index(current_file['faza']) + 1 if current_file['faza'] in FAZA_OPTIONS else 0,
+            options=codes.option_lists["FAZA_OPTIONS"],
+            format_func=lambda x: f"{x} - {codes.options['FAZA_OPTIONS'].get(x, '')}" if x else "⚠️ Izberi FAZO...",
+            index=codes.index_of("FAZA_OPTIONS", current_file['faza']),
             key=f"faza_{st.session_state.current_index}"
         )
-        current_file['faza'] = faza
+        set_file_field(current_file, 'faza', faza)
         
         lok = st.selectbox(
             "LOK (Vloga): *",
-            options=[""] + list(st.session_state.LOK_OPTIONS.keys()),
-            format_func=lambda x: f"{x} - {st.session_state.LOK_OPTIONS.get(x, '')}" if x else "⚠️ Izberi LOK...",
-            index=list(LOK_OPTIONS.keys()).index(current_file['lok']) + 1 if current_file['lok'] in LOK_OPTIONS else 0,
+            options=codes.option_lists["LOK_OPTIONS"],
+            format_func=lambda x: f"{x} - {codes.options['LOK_OPTIONS'].get(x, '')}" if x else "⚠️ Izberi LOK...",
+            index=codes.index_of("LOK_OPTIONS", current_file['lok']),
             key=f"lok_{st.session_state.current_index}"
         )
-        current_file['lok'] = lok
+        set_file_field(current_file, 'lok', lok)
         
         ime = st.text_input(
             "IME dokumenta (maks. 100 znakov): *",
@@ -610,7 +752,7 @@ with col2:
             help="Presledki bodo samodejno zamenjani z _",
             key=f"ime_{st.session_state.current_index}"
         )
-        current_file['ime'] = ime.replace(' ', '_')[:100]
+        set_file_field(current_file, 'ime', ime.replace(' ', '_')[:100])
         st.caption(f"Znakov: {len(current_file['ime'])}/100")
         
         datum = st.text_input(
@@ -620,26 +762,22 @@ with col2:
             help="Format: YYYY-MM-DD",
             key=f"datum_{st.session_state.current_index}"
         )
-        current_file['datum'] = datum
+        set_file_field(current_file, 'datum', datum)
         
         # Target subfolder picker
         st.markdown("**Ciljna podmapa: ***")
         
-        # Create flat list of all possible paths
-        all_paths = []
-        for main, subs in MAPNA_STRUKTURA.items():
-            all_paths.append(main)
-            for sub in subs:
-                all_paths.append(f"{main}/{sub}")
-        
+        # Folders of the template of the file's project
+        target_project = file_processing.file_project(current_file, st.session_state.projekt_sifra)
+        folder_options, folder_index = file_processing.project_folder_options(target_project)
         target_subfolder = st.selectbox(
             "Izberi kam bo datoteka shranjena:",
-            options=[""] + all_paths,
-            index=all_paths.index(current_file['target_subfolder']) + 1 if current_file['target_subfolder'] in all_paths else 0,
-            key=f"target_{st.session_state.current_index}",
+            options=folder_options,
+            index=folder_index.get(current_file['target_subfolder'], 0),
+            key=f"target_{st.session_state.current_index}_{target_project}",
             help="Izberi mapo iz strukture projekta"
         )
-        current_file['target_subfolder'] = target_subfolder
+        set_file_field(current_file, 'target_subfolder', target_subfolder)
         
         st.markdown("---")
         # Check if file just became complete and trigger rerun
@@ -685,6 +823,9 @@ with col2:
 st.markdown("---")
 st.header("📥 3. Prenesi rezultat ali naloži v Dalux")
 
+if st.session_state.active_job_id:
+    render_upload_job(st.session_state.active_job_id)
+
 if st.session_state.files:
     complete_files = sum(1 for f in st.session_state.files if is_file_complete(f))
     incomplete_files = len(st.session_state.files) - complete_files
@@ -697,6 +838,78 @@ if st.session_state.files:
     with col3:
         st.metric("Manjka", incomplete_files)
     
+    with st.expander("🧾 Načrt (brez nalaganja)", expanded=False):
+        st.caption("Pregled rezultata samo iz podatkov, brez branja vsebine datotek")
+        resolve_folders = st.checkbox(
+            "Razreši mape in preveri obstoječe datoteke v Dalux",
+            disabled=not (DALUX_AVAILABLE and st.session_state.dalux_connected),
+            key="plan_resolve_folders"
+        )
+        if resolve_folders:
+            # Dalux is only queried on request, not on every rerun of the page
+            if st.button("🔎 Sestavi načrt", key="plan_build"):
+                manager = get_upload_manager(st.session_state.dalux_api_key)
+                file_area_names = {}
+                if st.session_state.dalux_file_area_name:
+                    file_area_names[st.session_state.projekt_sifra] = st.session_state.dalux_file_area_name
+                st.session_state.resolved_plan = {
+                    "plan": upload_plan.build_plan(
+                        st.session_state.files, st.session_state.projekt_sifra,
+                        *upload_plan.dalux_resolvers(manager, file_area_names)
+                    ),
+                    "built_at": datetime.now().strftime('%H:%M:%S'),
+                }
+        if resolve_folders and st.session_state.resolved_plan is not None:
+            plan = st.session_state.resolved_plan["plan"]
+            st.caption(f"Načrt z Dalux ob {st.session_state.resolved_plan['built_at']} · "
+                       "po spremembah ga sestavi znova")
+        else:
+            if resolve_folders:
+                st.caption("Prikazan je načrt brez Dalux; za preverjanje map klikni »Sestavi načrt«")
+            plan = upload_plan.build_plan(st.session_state.files, st.session_state.projekt_sifra)
+        summary = upload_plan.plan_summary(plan)
+        st.write(
+            f"⬆️ Za nalaganje: **{summary['upload']}** ({summary['upload_bytes'] / (1024 * 1024):.1f} MB) · "
+            f"⏭️ Preskočenih: **{summary['skip']}** · ⚠️ Kolizij: **{summary['collide']}**"
+        )
+        st.dataframe(plan, hide_index=True, use_container_width=True)
+        
+        plan_name = f"nacrt_{st.session_state.projekt_sifra}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        dl_col1, dl_col2 = st.columns(2)
+        with dl_col1:
+            st.download_button("⬇️ CSV", upload_plan.plan_to_csv(plan), file_name=f"{plan_name}.csv",
+                               mime="text/csv", use_container_width=True)
+        with dl_col2:
+            st.download_button("⬇️ JSON", upload_plan.plan_to_json(plan), file_name=f"{plan_name}.json",
+                               mime="application/json", use_container_width=True)
+        
+        previous = st.file_uploader("Primerjaj s prejšnjim načrtom (CSV ali JSON)",
+                                    type=["csv", "json"], key="previous_plan")
+        if previous is not None:
+            try:
+                diff = upload_plan.diff_plans(
+                    upload_plan.load_plan(previous.getvalue().decode("utf-8-sig")), plan
+                )
+            except (ValueError, KeyError) as e:
+                st.error(f"Načrta ni mogoče prebrati: {str(e)}")
+            else:
+                st.write(f"➕ Novih: **{len(diff['added'])}** · ➖ Odstranjenih: **{len(diff['removed'])}** · "
+                         f"✏️ Spremenjenih: **{len(diff['changed'])}**")
+                if diff['changed']:
+                    st.dataframe(
+                        [{"projekt": row['project'], "datoteka": row['original_name'],
+                          "spremembe": "; ".join(f"{field}: {old} → {new}"
+                                                 for field, (old, new) in row['changes'].items())}
+                         for row in diff['changed']],
+                        hide_index=True, use_container_width=True
+                    )
+                if diff['added'] or diff['removed']:
+                    st.dataframe(
+                        [{"sprememba": "dodana", **row} for row in diff['added']]
+                        + [{"sprememba": "odstranjena", **row} for row in diff['removed']],
+                        hide_index=True, use_container_width=True
+                    )
+    
     if complete_files == len(st.session_state.files):
         st.success("🎉 Vse datoteke so pripravljene!")
         
@@ -731,24 +944,28 @@ if st.session_state.files:
             elif not st.session_state.dalux_connected:
                 st.warning("⚠️ Najprej se poveži z Dalux v stranskem meniju")
             else:
-                st.info(f"📤 Naložil bom {complete_files} datotek v Dalux projekt: {st.session_state.projekt_sifra}")
+                upload_projects = sorted({
+                    file_processing.file_project(f, st.session_state.projekt_sifra) for f in st.session_state.files
+                })
+                st.info(f"📤 Naložil bom {complete_files} datotek v Dalux projekt: {', '.join(upload_projects)}")
                 
+                verify = st.checkbox(
+                    "🔒 Preveri naložene datoteke",
+                    help="Po nalaganju primerja velikost in kontrolno vsoto vsake datoteke s podatki v Dalux"
+                )
+                reupload_mismatched = st.checkbox(
+                    "Neujemajoče datoteke samodejno naloži ponovno",
+                    disabled=not verify
+                )
+                provision_folders = st.checkbox(
+                    "📁 Ustvari manjkajoče mape",
+                    value=True,
+                    help="Pred nalaganjem v Dalux ustvari mape iz predloge mapne strukture, ki jih projekt še nima"
+                )
                 
                 if st.button("☁️ NALOŽI V DALUX", type="primary", use_container_width=True):
-                    results = upload_to_dalux()
-                    
-                    if results:
-                        st.success(f"✅ Uspešno naloženih: {results['success']}")
-                        if results['failed'] > 0:
-                            st.error(f"❌ Neuspešnih: {results['failed']}")
-                        
-                        # Show details
-                        with st.expander("📋 Podrobnosti nalaganja"):
-                            for detail in results['details']:
-                                if detail['status'] == 'success':
-                                    st.success(f"✅ {detail['file']} → {detail['folder']}")
-                                else:
-                                    st.error(f"❌ {detail['file']}: {detail['error']}")
+                    if upload_to_dalux(verify, verify and reupload_mismatched, provision_folders):
+                        st.rerun()
     
     elif complete_files > 0:
         st.warning(f"⚠️ {incomplete_files} datotekam še manjkajo podatki. Izpolni vse, da lahko preneseš ZIP ali naloži v Dalux.")
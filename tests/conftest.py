@@ -0,0 +1,40 @@
+import os
+import sys
+import types
+
+import pytest
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def uploads(monkeypatch):
+    """Fake dalux_async uploader.
+
+    Files whose name contains one of ``failing`` fail; every call's
+    ``files_by_project`` is kept in ``calls`` and the uploaded names in
+    ``uploaded``.
+    """
+    state = {"failing": set(), "uploaded": [], "calls": []}
+
+    def bulk_upload_multi_project_sync(api_key, files_by_project, **kwargs):
+        state["calls"].append(files_by_project)
+        details = []
+        for project, files_dict in files_by_project.items():
+            for folder, files in files_dict.items():
+                for name, _ in files:
+                    failed = any(part in name for part in state["failing"])
+                    if not failed:
+                        state["uploaded"].append(name)
+                    details.append({"project": project, "folder": folder, "file": name,
+                                    "status": "failed" if failed else "success",
+                                    "result": {"data": {"fileId": f"id-{name}"}}})
+        failed = sum(1 for detail in details if detail["status"] == "failed")
+        return {"success": len(details) - failed, "failed": failed, "cancelled": 0,
+                "details": details, "projects": {}}
+
+    module = types.ModuleType("dalux_async")
+    module.bulk_upload_multi_project_sync = bulk_upload_multi_project_sync
+    monkeypatch.setitem(sys.modules, "dalux_async", module)
+    return state
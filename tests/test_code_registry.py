@@ -0,0 +1,58 @@
+import pytest
+
+from code_registry import DEFAULT_CODES, CodeRegistry
+
+
+@pytest.fixture
+def registry_path(tmp_path):
+    return str(tmp_path / "codes.db")
+
+
+def test_adding_a_code_bumps_the_version_and_keeps_old_snapshots(registry_path):
+    registry = CodeRegistry(registry_path)
+    before = registry.snapshot()
+    assert before.version == 0
+    assert dict(before.options["TIP_OPTIONS"]) == DEFAULT_CODES["TIP_OPTIONS"]
+
+    after = registry.add_code("TIP_OPTIONS", "ZAP", "Zapisnik")
+    assert after is registry.snapshot()
+    assert (after.version, registry.version) == (1, 1)
+    assert after.options["TIP_OPTIONS"]["ZAP"] == "Zapisnik"
+    assert after.option_lists["TIP_OPTIONS"][-1] == "ZAP"
+    assert "ZAP" not in before.options["TIP_OPTIONS"]
+    assert "ZAP" not in before.option_lists["TIP_OPTIONS"]
+    with pytest.raises(TypeError):
+        after.options["TIP_OPTIONS"]["ZAP"] = "Drugo"
+
+
+def test_existing_and_unknown_codes_are_rejected(registry_path):
+    registry = CodeRegistry(registry_path)
+
+    assert registry.add_code("FAZA_OPTIONS", "IZV", "Izvedba") is None
+    assert registry.add_code("FAZA_OPTIONS", "GAR", "Garancija") is None
+    with pytest.raises(ValueError, match="Unknown code dictionary: VRSTA_OPTIONS"):
+        registry.add_code("VRSTA_OPTIONS", "X", "X")
+    assert registry.version == 0
+
+
+def test_added_codes_survive_reopening(registry_path):
+    registry = CodeRegistry(registry_path)
+    registry.add_code("LOK_OPTIONS", "INV", "Investitor")
+    registry.add_code("LOK_OPTIONS", "UPR", "Upravljavec")
+
+    reopened = CodeRegistry(registry_path).snapshot()
+    assert reopened.version == 2
+    assert reopened.option_lists["LOK_OPTIONS"][-2:] == ("INV", "UPR")
+    assert dict(reopened.options["TIP_OPTIONS"]) == DEFAULT_CODES["TIP_OPTIONS"]
+
+
+def test_index_of_matches_the_selectbox_options(registry_path):
+    registry = CodeRegistry(registry_path)
+    snapshot = registry.add_code("TIP_OPTIONS", "ZAP", "Zapisnik")
+    options = snapshot.option_lists["TIP_OPTIONS"]
+
+    assert options[0] == ""
+    for code in ("NAC", "EVD", "ZAP"):
+        assert options[snapshot.index_of("TIP_OPTIONS", code)] == code
+    assert snapshot.index_of("TIP_OPTIONS", "XYZ") == 0
+    assert snapshot.index_of("TIP_OPTIONS", "") == 0
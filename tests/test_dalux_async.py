@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from benchmarks.stub_server import start_stub_server
+from dalux_async import AsyncDaluxAPIClient, AsyncDaluxUploadManager
+from dalux_cache import DaluxDiscoveryCache
+
+
+class FakeAsyncClient:
+    """Answers discovery from memory; each upload takes ``upload_seconds``"""
+
+    def __init__(self, upload_seconds=0.01):
+        self.upload_seconds = upload_seconds
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.started = 0
+
+    async def get_all_projects(self):
+        return [{"data": {"projectId": f"id-{number}", "number": number,
+                          "projectName": f"Projekt {number}"}} for number in ("P1", "P2")]
+
+    async def get_file_areas(self, project_id):
+        return [{"data": {"fileAreaId": "fa", "fileAreaName": "Dokumenti"}}]
+
+    async def get_folders(self, project_id, file_area_id):
+        return [{"data": {"folderId": "f1", "folderName": "00_Navodila"}}]
+
+    async def upload_complete_file(self, project_id, file_area_id, folder_id, filename,
+                                   file_content, **kwargs):
+        self.started += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.upload_seconds)
+        finally:
+            self.in_flight -= 1
+        return {"data": {"fileId": f"id-{filename}"}}
+
+    async def close(self):
+        pass
+
+
+def _files(count):
+    return {"00_Navodila": [(f"doc{i}.pdf", b"x") for i in range(count)]}
+
+
+def _manager(max_concurrency, client):
+    manager = AsyncDaluxUploadManager("key", max_concurrency=max_concurrency,
+                                      cache=DaluxDiscoveryCache())
+    manager.client = client
+    return manager
+
+
+def test_upload_slots_are_shared_across_projects():
+    client = FakeAsyncClient()
+    manager = _manager(3, client)
+    results = asyncio.run(manager.bulk_upload_multi_project({"P1": _files(10), "P2": _files(10)}))
+
+    assert results["success"] == 20
+    assert client.max_in_flight == 3
+
+
+def test_cancel_reports_every_unfinished_file():
+    client = FakeAsyncClient(upload_seconds=60)
+    manager = _manager(2, client)
+
+    async def upload_then_cancel():
+        cancel = asyncio.Event()
+        upload = asyncio.ensure_future(
+            manager.bulk_upload_from_structure("P1", _files(6), cancel_event=cancel)
+        )
+        while client.started < 2:
+            await asyncio.sleep(0.01)
+        cancel.set()
+        return await upload
+
+    results = asyncio.run(upload_then_cancel())
+    assert (results["success"], results["failed"], results["cancelled"]) == (0, 0, 6)
+    assert client.started == 2
+    assert {detail["status"] for detail in results["details"]} == {"cancelled"}
+
+
+def test_client_uploads_against_the_stub_server():
+    server, state, base_url = start_stub_server()
+    try:
+        async def upload():
+            async with AsyncDaluxAPIClient("key", base_url=base_url) as client:
+                project = await client.find_project_by_number("BENCH")
+                file_area_id = (await client.get_file_areas(project["projectId"]))[0]["data"]["fileAreaId"]
+                folder_id = await client.get_or_create_folder(project["projectId"], file_area_id,
+                                                              "00_Navodila")
+                return await client.upload_complete_file(project["projectId"], file_area_id,
+                                                         folder_id, "a.pdf", b"abc" * 100)
+
+        result = asyncio.run(upload())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert result["data"]["fileSize"] == 300
+    assert state.stats()["calls"]["finalize"] == 1
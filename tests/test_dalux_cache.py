@@ -0,0 +1,27 @@
+from dalux_cache import DaluxDiscoveryCache
+
+
+def test_folder_files_expire_after_their_own_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("dalux_cache.time.monotonic", lambda: now[0])
+    cache = DaluxDiscoveryCache(ttl=900, files_ttl=60)
+    cache.set_folders("p", "fa", [{"folderId": "f1"}])
+    cache.set_folder_files("p", "fa", "f1", [{"fileName": "a.pdf"}])
+
+    now[0] += 30
+    assert cache.get_folder_files("p", "fa", "f1") == [{"fileName": "a.pdf"}]
+    now[0] += 60
+    assert cache.get_folder_files("p", "fa", "f1") is None
+    assert cache.get_folders("p", "fa") == [{"folderId": "f1"}]
+
+
+def test_folder_files_invalidation():
+    cache = DaluxDiscoveryCache()
+    cache.set_folder_files("p", "fa", "f1", [])
+    cache.set_folder_files("p", "fa", "f2", [])
+    cache.invalidate_folder_files("p", "fa", "f1")
+    assert cache.get_folder_files("p", "fa", "f1") is None
+    assert cache.get_folder_files("p", "fa", "f2") == []
+
+    cache.invalidate("p")
+    assert cache.get_folder_files("p", "fa", "f2") is None
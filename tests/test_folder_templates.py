@@ -0,0 +1,139 @@
+import json
+import zipfile
+
+import pytest
+
+import file_processing
+import folder_templates
+from dalux_cache import DaluxDiscoveryCache
+
+TEMPLATES = {
+    "default": "standard",
+    "templates": {"ceste": {"00_Navodila": [], "07_Gradnja": {"01_Odseki": ["01_Odsek_A"]}}},
+    "projects": {"2024-017": "ceste"},
+}
+
+
+@pytest.fixture
+def templates_path(tmp_path):
+    path = tmp_path / "folder_templates.json"
+    path.write_text(json.dumps(TEMPLATES), encoding="utf-8")
+    return str(path)
+
+
+def _tree(*paths):
+    """Dalux folder listing with parent ids for ``paths`` (parents first)"""
+    ids, items = {}, []
+    for path in paths:
+        parent, _, name = path.rpartition("/")
+        ids[path] = f"f{len(items)}"
+        data = {"folderId": ids[path], "folderName": name}
+        if parent:
+            data["parentFolderId"] = ids[parent]
+        items.append({"data": data})
+    return items
+
+
+def test_projects_get_their_configured_template(templates_path):
+    config = folder_templates.load_templates(templates_path)
+    assert set(config["templates"]) == {"standard", "ceste"}
+
+    assert folder_templates.template_paths(folder_templates.template_for_project("2024-017", templates_path)) == [
+        "00_Navodila", "07_Gradnja", "07_Gradnja/01_Odseki", "07_Gradnja/01_Odseki/01_Odsek_A",
+    ]
+    assert folder_templates.template_for_project("2024-021", templates_path) is folder_templates.MAPNA_STRUKTURA
+    with pytest.raises(Exception, match="Folder template not found: ceste2"):
+        folder_templates.get_template("ceste2", templates_path)
+
+
+def test_missing_template_file_leaves_the_standard_template(tmp_path):
+    config = folder_templates.load_templates(str(tmp_path / "none.json"))
+    assert config["templates"] == {"standard": folder_templates.MAPNA_STRUKTURA}
+    assert config["projects"] == {}
+
+
+def test_missing_folders_compare_full_paths():
+    structure = TEMPLATES["templates"]["ceste"]
+    # 01_Odseki exists, but under the wrong parent
+    folders = _tree("00_Navodila", "07_Gradnja", "00_Navodila/01_Odseki")
+
+    missing = folder_templates.missing_folders(folders, structure)
+    assert missing == ["07_Gradnja/01_Odseki", "07_Gradnja/01_Odseki/01_Odsek_A"]
+    assert folder_templates.by_depth(missing) == [["07_Gradnja/01_Odseki"],
+                                                  ["07_Gradnja/01_Odseki/01_Odsek_A"]]
+    assert folder_templates.missing_folders(_tree(*folder_templates.template_paths(structure)),
+                                            structure) == []
+
+
+class FolderClient:
+    """Client double with a folder tree that grows as folders are created"""
+
+    def __init__(self, folders, failing=()):
+        self.folders = list(folders)
+        self.failing = set(failing)
+        self.listings = 0
+
+    def get_all_projects(self):
+        return [{"data": {"projectId": "p", "number": "P1", "projectName": "Projekt"}}]
+
+    def get_file_areas(self, project_id):
+        return [{"data": {"fileAreaId": "fa", "fileAreaName": "Dokumenti"}}]
+
+    def get_folders(self, project_id, file_area_id):
+        self.listings += 1
+        return list(self.folders)
+
+    def create_folder(self, project_id, file_area_id, name, parent_id=None):
+        if name in self.failing:
+            raise Exception(f"Failed to create folder {name}")
+        data = {"folderId": f"new-{len(self.folders)}", "folderName": name}
+        if parent_id:
+            data["parentFolderId"] = parent_id
+        self.folders.append({"data": data})
+        return data
+
+
+def test_provision_creates_missing_levels_in_order():
+    pytest.importorskip("requests")
+    from dalux_api import DaluxUploadManager
+
+    structure = TEMPLATES["templates"]["ceste"]
+    manager = DaluxUploadManager("key", cache=DaluxDiscoveryCache())
+    manager.client = FolderClient(_tree("00_Navodila"), failing={"01_Odsek_A"})
+
+    result = manager.provision_folders("P1", structure)
+    assert result["created"] == ["07_Gradnja", "07_Gradnja/01_Odseki"]
+    assert [item["folder"] for item in result["failed"]] == ["07_Gradnja/01_Odseki/01_Odsek_A"]
+    created = {item["data"]["folderName"]: item["data"] for item in manager.client.folders}
+    assert created["01_Odseki"]["parentFolderId"] == created["07_Gradnja"]["folderId"]
+
+    # The cached tree now has the new folders; only the failed one is retried
+    manager.client.failing.clear()
+    assert manager.provision_folders("P1", structure)["created"] == ["07_Gradnja/01_Odseki/01_Odsek_A"]
+    listings = manager.client.listings
+    assert manager.provision_folders("P1", structure) == {"created": [], "failed": []}
+    assert manager.client.listings == listings
+
+
+def _entry(project, folder, name):
+    entry = file_processing.build_file_entry(f"{name}.pdf", b"data")
+    entry.update({"projekt_sifra": project, "tip": "DOK", "faza": "IZV", "lok": "IZV",
+                  "ime": name, "target_subfolder": folder})
+    return entry
+
+
+def test_zip_lays_out_each_project_with_its_template(monkeypatch, templates_path):
+    monkeypatch.setattr(file_processing, "template_for_project",
+                        lambda project: folder_templates.template_for_project(project, templates_path))
+    files = [_entry("2024-017", "07_Gradnja/01_Odseki", "odsek"),
+             _entry("2024-021", "00_Navodila", "navodila")]
+
+    with zipfile.ZipFile(file_processing.create_zip_with_structure(files, "2024-017")) as archive:
+        names = set(archive.namelist())
+    assert "2024-017/07_Gradnja/01_Odseki/2024-017-DOK-IZV-IZV-odsek.pdf" in names
+    assert "2024-021/00_Navodila/2024-021-DOK-IZV-IZV-navodila.pdf" in names
+    assert "2024-017/01_Pogodba_Admin/" not in names
+    assert "2024-021/01_Pogodba_Admin/" in names
+
+    with zipfile.ZipFile(file_processing.create_zip_with_structure(files[:1], "2024-017")) as archive:
+        assert "07_Gradnja/01_Odseki/2024-017-DOK-IZV-IZV-odsek.pdf" in archive.namelist()
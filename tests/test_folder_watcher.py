@@ -0,0 +1,128 @@
+import sqlite3
+import threading
+
+import pytest
+
+import batch_upload
+import folder_watcher
+from code_registry import CodeRegistry
+from folder_watcher import DirectoryScanner, FolderWatcher
+from workspace_store import WorkspaceStore
+
+PROJECT = "2024-017"
+FOTO = "07_Gradnja/03_Foto_Porocila"
+
+
+def _drop(root, relative_path, content=b"scan"):
+    path = root.joinpath(*relative_path.split("/"))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return str(path)
+
+
+@pytest.fixture
+def watch_dir(tmp_path):
+    path = tmp_path / "watch"
+    path.mkdir()
+    return path
+
+
+def _watcher(tmp_path, watch_dir, mode="review", **kwargs):
+    return FolderWatcher(
+        [{"path": str(watch_dir), "project": PROJECT, "mode": mode}],
+        WorkspaceStore(str(tmp_path / "workspace")), CodeRegistry(str(tmp_path / "codes.db")),
+        state_path=str(tmp_path / "watcher.db"), stable_for=0, **kwargs
+    )
+
+
+def test_file_is_ready_once_it_stops_changing(watch_dir, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(folder_watcher.time, "monotonic", lambda: now[0])
+    path = _drop(watch_dir, "a.pdf", b"1")
+    _drop(watch_dir, "b.pdf.part")
+    scanner = DirectoryScanner(str(watch_dir), stable_for=10)
+
+    assert scanner.poll() == []
+    now[0] += 5
+    with open(path, "ab") as f:
+        f.write(b"2")
+    assert scanner.poll() == []
+    now[0] += 8
+    assert scanner.poll() == []
+    now[0] += 2
+    assert [ready[0] for ready in scanner.poll()] == [path]
+    assert scanner.poll() == []
+
+
+def test_dropped_file_is_classified_and_queued_once(tmp_path, watch_dir):
+    _drop(watch_dir, f"{FOTO}/{PROJECT}-FOT-IZV-IZV-Izkop-20240301.jpg")
+    watcher = _watcher(tmp_path, watch_dir)
+
+    assert watcher.run_once()["queued"] == 1
+    [queued] = watcher.store.list_files(PROJECT)
+    assert (queued['tip'], queued['faza'], queued['lok'], queued['ime']) == ("FOT", "IZV", "IZV", "Izkop")
+    assert queued['target_subfolder'] == FOTO
+    assert not any(watcher.run_once().values())
+
+    # A restart remembers what was ingested
+    assert not any(_watcher(tmp_path, watch_dir).run_once().values())
+
+
+def test_colliding_auto_uploads_are_queued_for_review(tmp_path, watch_dir, monkeypatch):
+    uploaded = []
+
+    def upload_files_by_project(api_key, files_by_project, *args, **kwargs):
+        details = []
+        for project, files_dict in files_by_project.items():
+            for folder, files in files_dict.items():
+                for name, _ in files:
+                    uploaded.append(name)
+                    details.append({"project": project, "folder": folder, "file": name,
+                                    "status": "success"})
+        return {"details": details}
+
+    monkeypatch.setattr(batch_upload, "upload_files_by_project", upload_files_by_project)
+    _drop(watch_dir, f"{FOTO}/{PROJECT}-FOT-IZV-IZV-Izkop.jpg", b"first")
+    _drop(watch_dir, f"{FOTO}/{PROJECT}-fot-izv-izv-Izkop.jpg", b"second")
+    watcher = _watcher(tmp_path, watch_dir, mode="auto", api_key="key")
+
+    summary = watcher.run_once()
+    assert (summary["uploaded"], summary["queued"], summary["failed"]) == (1, 1, 1)
+    assert uploaded == [f"{PROJECT}-FOT-IZV-IZV-Izkop.jpg"]
+    [detail] = [row[0] for row in watcher._conn.execute(
+        "SELECT detail FROM ingested WHERE status = 'queued'"
+    )]
+    assert detail.startswith("Same target as")
+
+
+def test_failed_cycle_is_logged_and_its_files_retried(tmp_path, watch_dir, monkeypatch, capsys):
+    _drop(watch_dir, "a.pdf")
+    watcher = _watcher(tmp_path, watch_dir)
+    add_file = watcher.store.add_file
+    calls = []
+
+    def locked_once(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return add_file(*args)
+
+    monkeypatch.setattr(watcher.store, "add_file", locked_once)
+    stop = threading.Event()
+    run_once = watcher.run_once
+    summaries = []
+
+    def run_twice():
+        try:
+            summaries.append(run_once())
+            return summaries[-1]
+        finally:
+            if len(calls) > 1:
+                stop.set()
+
+    monkeypatch.setattr(watcher, "run_once", run_twice)
+    watcher.run_forever(interval=0, stop_event=stop)
+
+    assert "polling cycle failed" in capsys.readouterr().err
+    assert summaries == [{"queued": 1, "uploaded": 0, "duplicate": 0, "failed": 0}]
+    assert watcher.store.count_files(PROJECT) == 1
@@ -0,0 +1,137 @@
+import logging
+
+import pytest
+
+from metrics import LogSink, Metrics, NullMetrics, PrometheusFileSink, configure_from_env
+
+
+def _read_prometheus(path):
+    """Samples of a Prometheus text file by ``name{labels}``, and the declared types"""
+    samples, types = {}, {}
+    with open(path, encoding="utf-8") as f:
+        for line in f.read().splitlines():
+            if line.startswith("# TYPE "):
+                _, _, name, kind = line.split(" ")
+                types[name] = kind
+            elif line:
+                series, value = line.rsplit(" ", 1)
+                samples[series] = float(value)
+    return samples, types
+
+
+def test_configure_from_env(monkeypatch, tmp_path):
+    monkeypatch.delenv("DALUX_METRICS", raising=False)
+    assert isinstance(configure_from_env(), NullMetrics)
+    assert not configure_from_env("  ").enabled
+
+    metrics = configure_from_env("1")
+    assert metrics.enabled and metrics.sinks == []
+
+    path = str(tmp_path / "dalux.prom")
+    monkeypatch.setenv("DALUX_METRICS", f"log, prometheus-file:{path}")
+    log_sink, file_sink = configure_from_env().sinks
+    assert isinstance(log_sink, LogSink)
+    assert isinstance(file_sink, PrometheusFileSink) and file_sink.path == path
+
+
+def test_log_sink_writes_one_json_line_per_observation(caplog):
+    metrics = Metrics([LogSink()])
+    with caplog.at_level(logging.INFO, logger="dalux.metrics"):
+        metrics.inc("dalux_files_total", status="success")
+    assert caplog.messages == ['{"metric": "dalux_files_total", "kind": "counter", '
+                               '"value": 1, "status": "success"}']
+
+
+def test_prometheus_file_round_trip(tmp_path):
+    path = str(tmp_path / "dalux.prom")
+    sink = PrometheusFileSink(path, interval=3600)
+    metrics = Metrics([sink], buckets=(0.1, 1.0))
+
+    metrics.inc("dalux_files_total", status="success")
+    sink.flush(metrics)
+    # Not rewritten again within the interval
+    assert _read_prometheus(path)[0] == {'dalux_files_total{status="success"}': 1.0}
+    metrics.inc("dalux_files_total", 2, status="success")
+    metrics.set_gauge("zip_peak_rss_bytes", 1024)
+    for seconds in (0.05, 0.5, 5.0):
+        metrics.observe("dalux_request_seconds", seconds, endpoint="upload")
+    assert _read_prometheus(path)[0] == {'dalux_files_total{status="success"}': 1.0}
+
+    sink.flush(metrics)
+    samples, types = _read_prometheus(path)
+    assert types == {"dalux_files_total": "counter", "zip_peak_rss_bytes": "gauge",
+                     "dalux_request_seconds": "histogram"}
+    assert samples == pytest.approx({
+        'dalux_files_total{status="success"}': 3.0,
+        "zip_peak_rss_bytes": 1024.0,
+        'dalux_request_seconds_bucket{endpoint="upload",le="0.1"}': 1.0,
+        'dalux_request_seconds_bucket{endpoint="upload",le="1.0"}': 2.0,
+        'dalux_request_seconds_bucket{endpoint="upload",le="+Inf"}': 3.0,
+        'dalux_request_seconds_sum{endpoint="upload"}': 5.55,
+        'dalux_request_seconds_count{endpoint="upload"}': 3.0,
+    })
+
+
+class _Response:
+    def __init__(self, status_code, items=()):
+        self.status_code = status_code
+        self.headers = {"Retry-After": "0"}
+        self.items = list(items)
+
+    def json(self):
+        return {"items": self.items}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise Exception(f"HTTP {self.status_code}")
+
+
+class _ScriptedSession:
+    """Answers requests with the given status codes, in order"""
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+
+    def request(self, method, url, **kwargs):
+        status = self.statuses.pop(0)
+        if isinstance(status, Exception):
+            raise status
+        return _Response(status, [{"data": {"projectId": "p", "number": "P1"}}])
+
+
+def _client(*statuses):
+    pytest.importorskip("requests")
+    from dalux_api import DaluxAPIClient
+
+    client = DaluxAPIClient("key", max_retries=2, metrics=Metrics())
+    client.session = _ScriptedSession(*statuses)
+    return client
+
+
+def test_send_counts_retries_and_times_each_attempt():
+    client = _client(503, 429, 200)
+    assert [p["data"]["number"] for p in client.get_all_projects()] == ["P1"]
+
+    snapshot = client.metrics.snapshot()
+    assert snapshot["counters"] == {"dalux_retries_total{endpoint=projects}": 2}
+    assert {series: stats["count"] for series, stats in snapshot["histograms"].items()} == {
+        "dalux_request_seconds{endpoint=projects,status=503}": 1,
+        "dalux_request_seconds{endpoint=projects,status=429}": 1,
+        "dalux_request_seconds{endpoint=projects,status=200}": 1,
+    }
+
+
+def test_send_gives_up_after_max_retries_and_times_connection_errors():
+    import requests
+
+    client = _client(503, 503, 503)
+    with pytest.raises(Exception, match="HTTP 503"):
+        client.get_all_projects()
+    assert client.metrics.snapshot()["counters"] == {"dalux_retries_total{endpoint=projects}": 2}
+
+    client.session = _ScriptedSession(requests.ConnectionError("refused"))
+    with pytest.raises(requests.ConnectionError):
+        client.get_all_projects()
+    histograms = client.metrics.snapshot()["histograms"]
+    assert histograms["dalux_request_seconds{endpoint=projects,status=error}"]["count"] == 1
+    assert histograms["dalux_request_seconds{endpoint=projects,status=503}"]["count"] == 3
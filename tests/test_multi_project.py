@@ -0,0 +1,85 @@
+import pytest
+
+import file_processing
+from dalux_cache import DaluxDiscoveryCache
+from upload_progress import failed_project_results, merge_project_results
+
+
+def _entry(name, project="", folder="00_Navodila", **fields):
+    entry = file_processing.build_file_entry(f"{name}.pdf", name.encode())
+    entry.update({"projekt_sifra": project, "tip": "DOK", "faza": "IZV", "lok": "IZV",
+                  "ime": name, "target_subfolder": folder}, **fields)
+    return entry
+
+
+def test_files_are_grouped_by_their_own_project():
+    files = [_entry("a", "2024-017"), _entry("b"), _entry("c", "2024-021", folder="07_Gradnja"),
+             _entry("d", "2024-021", tip="")]
+    by_project = file_processing.build_files_by_project(files, "2024-001")
+
+    assert {project: {folder: [name for name, _ in named] for folder, named in files_dict.items()}
+            for project, files_dict in by_project.items()} == {
+        "2024-017": {"00_Navodila": ["2024-017-DOK-IZV-IZV-a.pdf"]},
+        "2024-001": {"00_Navodila": ["2024-001-DOK-IZV-IZV-b.pdf"]},
+        "2024-021": {"07_Gradnja": ["2024-021-DOK-IZV-IZV-c.pdf"]},
+    }
+
+
+def test_merged_reports_sum_the_accounting_of_shared_projects():
+    ok = {"success": 2, "failed": 0, "cancelled": 0, "verified": 2,
+          "details": [{"file": "a.pdf", "status": "success"}, {"file": "b.pdf", "status": "success"}]}
+    failed = failed_project_results({"00_Navodila": [("c.pdf", b"c")]}, "Project not found: P2")
+    assert failed["details"] == [{"file": "c.pdf", "folder": "00_Navodila", "status": "failed",
+                                  "error": "Project not found: P2"}]
+
+    shard = merge_project_results({"P1": ok, "P2": failed})
+    assert (shard["success"], shard["failed"], shard["verified"]) == (2, 1, 2)
+    assert [detail["project"] for detail in shard["details"]] == ["P1", "P1", "P2"]
+    assert shard["projects"]["P2"] == {"success": 0, "failed": 1, "cancelled": 0,
+                                       "error": "Project not found: P2"}
+
+    merged = merge_project_results([shard, merge_project_results({"P1": ok})])
+    assert (merged["success"], merged["failed"], merged["verified"]) == (4, 1, 4)
+    assert len(merged["details"]) == 5
+    assert merged["projects"]["P1"] == {"success": 4, "failed": 0, "cancelled": 0, "error": None}
+    assert merged["projects"]["P2"]["error"] == "Project not found: P2"
+
+
+class ProjectsClient:
+    """Client double that knows project P1 only"""
+
+    def __init__(self):
+        self.uploaded = []
+
+    def get_all_projects(self):
+        return [{"data": {"projectId": "id-P1", "number": "P1", "projectName": "Projekt 1"}}]
+
+    def get_file_areas(self, project_id):
+        return [{"data": {"fileAreaId": "fa", "fileAreaName": "Dokumenti"}}]
+
+    def get_folders(self, project_id, file_area_id):
+        return [{"data": {"folderId": "f1", "folderName": "00_Navodila"}}]
+
+    def upload_complete_file(self, project_id, file_area_id, folder_id, filename,
+                             file_content, **kwargs):
+        self.uploaded.append((project_id, folder_id, filename))
+        return {"data": {"fileId": f"id-{filename}"}}
+
+
+def test_project_that_cannot_be_set_up_fails_only_its_own_files():
+    pytest.importorskip("requests")
+    from dalux_api import DaluxUploadManager
+
+    manager = DaluxUploadManager("key", cache=DaluxDiscoveryCache())
+    manager.client = ProjectsClient()
+    files = {"00_Navodila": [("a.pdf", b"a"), ("b.pdf", b"b")]}
+    results = manager.bulk_upload_multi_project({"P1": files, "P9": {"00_Navodila": [("c.pdf", b"c")]}})
+
+    assert (results["success"], results["failed"]) == (2, 1)
+    assert manager.client.uploaded == [("id-P1", "f1", "a.pdf"), ("id-P1", "f1", "b.pdf")]
+    assert results["projects"]["P1"] == {"success": 2, "failed": 0, "cancelled": 0, "error": None}
+    assert results["projects"]["P9"]["failed"] == 1
+    assert "P9" in results["projects"]["P9"]["error"]
+    assert {(detail["project"], detail["file"], detail["status"]) for detail in results["details"]} == {
+        ("P1", "a.pdf", "success"), ("P1", "b.pdf", "success"), ("P9", "c.pdf", "failed"),
+    }
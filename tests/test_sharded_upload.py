@@ -0,0 +1,87 @@
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import rate_limit
+import sharded_upload
+from sharded_upload import UploadJournal, file_key, upload_sharded
+
+
+def _entry(name, content):
+    return {"original_name": f"{name}.pdf", "extension": "pdf", "tip": "DOK", "faza": "IZV",
+            "lok": "IZV", "ime": name, "datum": "", "target_subfolder": "00_Navodila",
+            "content": content}
+
+
+@pytest.fixture(autouse=True)
+def in_process_workers(monkeypatch):
+    # One worker thread instead of processes, so the fake uploader is used;
+    # the worker initializer's globals are restored afterwards
+    monkeypatch.setattr(sharded_upload, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(sharded_upload, "_journal", None)
+    monkeypatch.setattr(rate_limit, "_limiter", rate_limit._limiter)
+    monkeypatch.setattr(rate_limit, "_configured", rate_limit._configured)
+
+
+def test_rerun_resumes_from_the_journal(tmp_path, uploads):
+    journal_path = str(tmp_path / "journal.db")
+    entries = [_entry(f"dok{i}", b"x" * (i + 1)) for i in range(4)]
+    uploads["failing"] = {"dok2"}
+
+    first = upload_sharded("key", entries, "P1", "http://stub", processes=1,
+                           journal_path=journal_path)
+    assert (first["success"], first["failed"], first["journal_skipped"]) == (3, 1, 0)
+
+    journal = UploadJournal(journal_path)
+    done = journal.completed()
+    journal.close()
+    assert len(done) == 3
+    assert done[file_key(entries[0], "P1")] == 1
+
+    uploads["failing"] = set()
+    uploads["uploaded"].clear()
+    second = upload_sharded("key", entries, "P1", "http://stub", processes=1,
+                            journal_path=journal_path)
+    assert (second["success"], second["failed"], second["journal_skipped"]) == (1, 0, 3)
+    assert len(uploads["uploaded"]) == 1 and "dok2" in uploads["uploaded"][0]
+
+
+def test_changed_size_is_uploaded_again(tmp_path, uploads):
+    journal_path = str(tmp_path / "journal.db")
+    entries = [_entry("dok", b"abc")]
+    upload_sharded("key", entries, "P1", "http://stub", processes=1, journal_path=journal_path)
+
+    uploads["uploaded"].clear()
+    results = upload_sharded("key", [_entry("dok", b"abcd")], "P1", "http://stub",
+                             processes=1, journal_path=journal_path)
+    assert results["journal_skipped"] == 0
+    assert len(uploads["uploaded"]) == 1
+
+
+def test_dead_worker_fails_its_shard(tmp_path, uploads, monkeypatch):
+    upload_shard = sharded_upload._upload_shard
+
+    def crash_first_shard(index, *args):
+        if index == 0:
+            raise BrokenProcessPool("worker died")
+        return upload_shard(index, *args)
+
+    monkeypatch.setattr(sharded_upload, "_upload_shard", crash_first_shard)
+    journal_path = str(tmp_path / "journal.db")
+    entries = [_entry(f"dok{i}", b"x") for i in range(4)]
+    for i, entry in enumerate(entries):
+        entry["target_subfolder"] = f"0{i}_Mapa"
+
+    results = upload_sharded("key", entries, "P1", "http://stub", processes=1,
+                             shards_per_process=2, journal_path=journal_path)
+    crashed = results["shards"][0]
+    assert crashed["failed"] == crashed["files"] > 0
+    assert results["failed"] == crashed["failed"]
+    assert results["success"] + results["failed"] == 4
+    assert all("worker died" in detail["error"]
+               for detail in results["details"] if detail["status"] == "failed")
+
+    journal = UploadJournal(journal_path)
+    assert len(journal.completed()) == results["success"]
+    journal.close()
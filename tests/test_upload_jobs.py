@@ -0,0 +1,112 @@
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+from upload_jobs import ACTIVE_STATUSES, UploadJobManager
+
+FILES = {"P1": {"00_Navodila": [("a.pdf", b"a"), ("b.pdf", b"b")]}}
+
+
+def _wait(manager, job_id):
+    deadline = time.monotonic() + 5
+    while manager.get(job_id)["status"] in ACTIVE_STATUSES:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    return manager.get(job_id)
+
+
+def test_completed_job_releases_its_files(tmp_path, uploads):
+    manager = UploadJobManager(str(tmp_path))
+    job_id = manager.submit_multi("key", FILES)
+    assert _wait(manager, job_id)["status"] == "completed"
+    assert not manager.can_retry(job_id)
+    assert manager._payloads == {}
+    assert manager._cancel_events == {}
+
+
+def test_retry_resubmits_failed_files_and_releases_the_original(tmp_path, uploads):
+    uploads["failing"] = {"b.pdf"}
+    manager = UploadJobManager(str(tmp_path))
+    job_id = manager.submit_multi("key", FILES)
+    _wait(manager, job_id)
+    assert manager.can_retry(job_id)
+
+    uploads["failing"] = set()
+    retry_id = manager.retry(job_id)
+    assert job_id not in manager._payloads
+    assert _wait(manager, retry_id)["results"]["success"] == 1
+    assert uploads["calls"][-1] == {"P1": {"00_Navodila": [("b.pdf", b"b")]}}
+    assert manager._payloads == {}
+
+
+def test_unretried_payload_expires(tmp_path, uploads):
+    uploads["failing"] = {"a.pdf"}
+    manager = UploadJobManager(str(tmp_path), payload_ttl=0)
+    job_id = manager.submit_multi("key", FILES)
+    _wait(manager, job_id)
+    assert not manager.can_retry(job_id)
+    assert manager._payloads == {}
+
+
+@pytest.fixture
+def sync_uploads(monkeypatch):
+    """dalux_async missing: a fake blocking manager that runs until cancelled"""
+    state = {"cancel_event": None, "started": threading.Event()}
+
+    class DaluxUploadManager:
+        def __init__(self, api_key, **kwargs):
+            pass
+
+        def bulk_upload_multi_project(self, files_by_project, cancel_event=None, **kwargs):
+            state["cancel_event"] = cancel_event
+            state["started"].set()
+            assert cancel_event.wait(5)
+            return {"success": 0, "failed": 0, "cancelled": 2, "details": [], "projects": {}}
+
+    module = types.ModuleType("dalux_api")
+    module.DaluxUploadManager = DaluxUploadManager
+    monkeypatch.setitem(sys.modules, "dalux_api", module)
+    monkeypatch.setitem(sys.modules, "dalux_async", None)
+    return state
+
+
+def test_blocking_fallback_is_cancelled(tmp_path, sync_uploads):
+    manager = UploadJobManager(str(tmp_path))
+    job_id = manager.submit_multi("key", FILES)
+    assert sync_uploads["started"].wait(5)
+    assert manager.cancel(job_id)
+    job = _wait(manager, job_id)
+    assert job["status"] == "cancelled"
+    assert job["results"]["cancelled"] == 2
+
+
+def test_import_error_while_uploading_fails_the_job(tmp_path, uploads, monkeypatch):
+    def broken_upload(*args, **kwargs):
+        raise ImportError("No module named 'certifi'")
+
+    monkeypatch.setattr(sys.modules["dalux_async"], "bulk_upload_multi_project_sync", broken_upload)
+    monkeypatch.setitem(sys.modules, "dalux_api", None)
+    manager = UploadJobManager(str(tmp_path))
+    job = _wait(manager, manager.submit_multi("key", FILES))
+    assert job["status"] == "failed"
+    assert "certifi" in job["error"]
+
+
+def test_finished_jobs_are_pruned(tmp_path, uploads):
+    manager = UploadJobManager(str(tmp_path), max_finished=2)
+    job_ids = [manager.submit_multi("key", FILES) for _ in range(3)]
+    # Two workers, so jobs may finish out of submission order
+    job_ids.sort(key=lambda job_id: _wait(manager, job_id)["finished_at"])
+
+    latest = manager.submit_multi("key", FILES)
+    _wait(manager, latest)
+    assert manager.get(job_ids[0]) is None
+    assert not (tmp_path / f"{job_ids[0]}.json").exists()
+    assert [manager.get(job_id) is not None for job_id in job_ids[1:]] == [True, True]
+
+    reloaded = UploadJobManager(str(tmp_path), retention=0)
+    assert reloaded.jobs == {}
+    assert not list(tmp_path.glob("*.json"))
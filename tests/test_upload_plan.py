@@ -0,0 +1,100 @@
+import file_processing
+import upload_plan
+
+
+def _entry(name, folder="00_Navodila", content=b"data", **fields):
+    entry = file_processing.build_file_entry(f"{name}.pdf", content)
+    entry.update({"tip": "DOK", "faza": "IZV", "lok": "IZV", "ime": name,
+                  "target_subfolder": folder}, **fields)
+    return entry
+
+
+def _actions(plan):
+    return {row["original_name"]: (row["action"], row["reason"]) for row in plan}
+
+
+def test_offline_plan_skips_incomplete_and_flags_same_targets():
+    incomplete = _entry("brez_tipa", tip="")
+    twin = _entry("zapisnik", content=b"other")
+    twin["original_name"] = "zapisnik (1).pdf"
+    plan = upload_plan.build_plan([_entry("zapisnik"), twin, incomplete, _entry("dopis")], "P1")
+
+    assert _actions(plan) == {
+        "zapisnik.pdf": ("collide", "Same target as zapisnik (1).pdf"),
+        "zapisnik (1).pdf": ("collide", "Same target as zapisnik.pdf"),
+        "brez_tipa.pdf": ("skip", "Missing required fields"),
+        "dopis.pdf": ("upload", ""),
+    }
+    assert plan[3]["target_path"] == "00_Navodila/P1-DOK-IZV-IZV-dopis.pdf"
+    assert upload_plan.plan_summary(plan)["upload_bytes"] == 4
+
+
+def test_resolvers_are_called_once_per_folder():
+    calls = []
+
+    def folder_id_for(project, folder_path):
+        calls.append(folder_path)
+        if folder_path == "99_Manjka":
+            raise Exception("Folder not found: 99_Manjka")
+        return f"id-{folder_path}"
+
+    def existing_names(project, folder_id):
+        calls.append(folder_id)
+        return {"P1-DOK-IZV-IZV-obstaja.pdf"}
+
+    files = [_entry("obstaja"), _entry("nova"), _entry("drugje", folder="99_Manjka"),
+             _entry("tudi_drugje", folder="99_Manjka")]
+    plan = upload_plan.build_plan(files, "P1", folder_id_for, existing_names)
+
+    assert _actions(plan) == {
+        "obstaja.pdf": ("collide", "Already exists in Dalux"),
+        "nova.pdf": ("upload", ""),
+        "drugje.pdf": ("skip", "Folder not found: 99_Manjka"),
+        "tudi_drugje.pdf": ("skip", "Folder not found: 99_Manjka"),
+    }
+    assert plan[1]["folder_id"] == "id-00_Navodila"
+    assert calls == ["00_Navodila", "id-00_Navodila", "99_Manjka"]
+
+
+def test_plan_survives_csv_and_json_round_trips():
+    plan = upload_plan.build_plan([_entry("a"), _entry("b", tip="")], "P1")
+
+    assert upload_plan.load_plan(upload_plan.plan_to_csv(plan)) == plan
+    assert upload_plan.load_plan(upload_plan.plan_to_json(plan)) == plan
+
+
+def test_diff_of_a_reloaded_plan():
+    old = upload_plan.build_plan([_entry("a"), _entry("b"), _entry("c")], "P1")
+    new = upload_plan.build_plan([_entry("a"), _entry("b", folder="01_Pogodba_Admin"),
+                                  _entry("d")], "P1")
+    diff = upload_plan.diff_plans(upload_plan.load_plan(upload_plan.plan_to_csv(old)), new)
+
+    assert [row["original_name"] for row in diff["added"]] == ["d.pdf"]
+    assert [row["original_name"] for row in diff["removed"]] == ["c.pdf"]
+    assert diff["changed"] == [{
+        "project": "P1", "original_name": "b.pdf",
+        "changes": {"target_path": ["00_Navodila/P1-DOK-IZV-IZV-b.pdf",
+                                    "01_Pogodba_Admin/P1-DOK-IZV-IZV-b.pdf"]},
+    }]
+
+
+def test_dalux_resolvers_pick_the_file_area_per_call():
+    class Manager:
+        file_area_names = {}
+
+        def __init__(self):
+            self.setups = []
+
+        def setup_project(self, project, file_area_name=None):
+            self.setups.append((project, file_area_name))
+            return f"id-{project}", f"fa-{file_area_name}"
+
+        def get_folder_id(self, project_id, file_area_id, folder_path):
+            return f"{file_area_id}/{folder_path}"
+
+    manager = Manager()
+    folder_id_for, _ = upload_plan.dalux_resolvers(manager, {"P1": "Arhiv"})
+    assert folder_id_for("P1", "00_Navodila") == "fa-Arhiv/00_Navodila"
+    assert folder_id_for("P2", "00_Navodila") == "fa-None/00_Navodila"
+    assert manager.setups == [("P1", "Arhiv"), ("P2", None)]
+    assert manager.file_area_names == {}
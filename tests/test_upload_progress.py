@@ -0,0 +1,81 @@
+import pytest
+
+from blob_store import BlobReader
+from upload_progress import ProgressReader, UploadProgressTracker
+
+
+def _tracked_reader(tracker, name, content, chunk_size=4):
+    return ProgressReader(
+        content, lambda sent: tracker.set_file_bytes(name, "00_Navodila", sent),
+        chunk_size=chunk_size
+    )
+
+
+def test_retried_body_is_not_counted_twice():
+    tracker = UploadProgressTracker(total_files=1, total_bytes=10)
+    reader = _tracked_reader(tracker, "a.pdf", b"0123456789")
+
+    # A failed attempt that got part of the way, then a full retry
+    attempt = iter(reader)
+    for _ in range(3):
+        next(attempt)
+    assert tracker.bytes_sent == 8
+    assert b"".join(reader) == b"0123456789"
+    assert tracker.bytes_sent == 10
+
+
+def test_bytes_are_tracked_per_file():
+    tracker = UploadProgressTracker(total_files=2, total_bytes=16)
+    first = _tracked_reader(tracker, "a.pdf", b"x" * 10)
+    second = _tracked_reader(tracker, "b.pdf", b"y" * 6)
+
+    list(first)
+    list(second)
+    list(first)
+    assert tracker.bytes_sent == 16
+    assert tracker.snapshot()["eta_s"] == 0
+
+
+def test_total_is_clamped(tmp_path):
+    path = tmp_path / "blob"
+    path.write_bytes(b"z" * 12)
+    # The entry announced fewer bytes than the blob holds
+    tracker = UploadProgressTracker(total_files=1, total_bytes=8)
+    list(_tracked_reader(tracker, "a.pdf", BlobReader(str(path))))
+    assert tracker.bytes_sent == 8
+
+
+class _Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {"Retry-After": "0"}
+
+    def raise_for_status(self):
+        pass
+
+
+class _FlakySession:
+    """Reads the whole request body, answering 503 to the first request"""
+
+    def __init__(self):
+        self.bodies = []
+
+    def request(self, method, url, data=None, **kwargs):
+        self.bodies.append(b"".join(data))
+        return _Response(503 if len(self.bodies) == 1 else 200)
+
+
+def test_send_retry_counts_each_byte_once():
+    pytest.importorskip("requests")
+    from dalux_api import DaluxAPIClient
+
+    content = b"abcdefghij" * 1000
+    client = DaluxAPIClient("key")
+    client.session = _FlakySession()
+    tracker = UploadProgressTracker(total_files=1, total_bytes=len(content))
+    client.upload_file_content(
+        "p", "fa", "guid", content, "a.pdf",
+        on_chunk=lambda sent: tracker.set_file_bytes("a.pdf", "00_Navodila", sent)
+    )
+    assert client.session.bodies == [content, content]
+    assert tracker.bytes_sent == len(content)
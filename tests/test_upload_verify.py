@@ -0,0 +1,145 @@
+import hashlib
+import threading
+
+import pytest
+
+from upload_verify import UploadVerifier, mark_mismatches
+
+
+def _uploaded(verifier, name, content, folder="00_Navodila"):
+    detail = {"file": name, "folder": folder}
+    verifier.expect(detail, len(content))(hashlib.sha256(content).hexdigest())
+    detail.update({"status": "success", "result": {"data": {"fileId": name}}})
+    return detail
+
+
+def _remote(name, content):
+    return {"data": {"fileId": name, "fileName": name, "fileSize": len(content),
+                     "sha256": hashlib.sha256(content).hexdigest()}}
+
+
+def test_size_difference_is_a_mismatch():
+    verifier = UploadVerifier()
+    detail = _uploaded(verifier, "a.pdf", b"abcd")
+    mismatches = verifier.check("00_Navodila", [_remote("a.pdf", b"ab")])
+    assert [item["detail"] for item in mismatches] == [detail]
+
+    results = {"success": 1, "failed": 0, "details": [detail]}
+    mark_mismatches(results, mismatches)
+    assert (results["success"], results["failed"], results["mismatched"]) == (0, 1, 1)
+
+
+def test_missing_remote_file_is_unverified_not_mismatched():
+    verifier = UploadVerifier()
+    detail = _uploaded(verifier, "a.pdf", b"abcd")
+    assert verifier.check("00_Navodila", []) == []
+
+    results = {"success": 1, "failed": 0, "details": [detail]}
+    mark_mismatches(results, [])
+    assert results["success"] == 1
+    assert results["unverified"] == 1
+    assert results["verified"] == 0
+
+
+def test_failed_listing_keeps_uploads_successful():
+    verifier = UploadVerifier()
+    details = [_uploaded(verifier, f"{i}.pdf", b"x" * i) for i in range(3)]
+    verifier.mark_unverified("00_Navodila", "Could not list remote files: timeout")
+
+    results = {"success": 3, "failed": 0, "details": details}
+    mark_mismatches(results, [])
+    assert (results["success"], results["failed"], results["unverified"]) == (3, 0, 3)
+    assert all(detail["status"] == "success" for detail in details)
+
+
+class FakeDaluxClient:
+    """Client double: stores uploads and lists them, failing the first listings"""
+
+    def __init__(self, listing_failures=0, truncate=()):
+        self.listing_failures = listing_failures
+        self.truncate = set(truncate)
+        self.finalized = []
+
+    def get_all_projects(self):
+        return [{"data": {"projectId": "p", "number": "P1", "projectName": "Projekt"}}]
+
+    def get_file_areas(self, project_id):
+        return [{"data": {"fileAreaId": "fa", "fileAreaName": "Dokumenti"}}]
+
+    def get_folders(self, project_id, file_area_id):
+        return [{"data": {"folderId": "f0", "folderName": "00_Navodila"}}]
+
+    def upload_complete_file(self, project_id, file_area_id, folder_id, filename, content,
+                             on_stage=None, on_chunk=None, on_digest=None):
+        if on_digest:
+            on_digest(hashlib.sha256(content).hexdigest())
+        stored = content[:len(content) // 2] if filename in self.truncate else content
+        self.truncate.discard(filename)
+        file_data = {"fileId": f"id-{len(self.finalized)}", "fileName": filename, "folderId": folder_id,
+                     "fileSize": len(stored), "sha256": hashlib.sha256(stored).hexdigest()}
+        self.finalized.append(file_data)
+        return {"data": file_data}
+
+    def get_folder_files(self, project_id, file_area_id, folder_id):
+        if self.listing_failures:
+            self.listing_failures -= 1
+            raise Exception("Failed to get folder files: Read timed out")
+        return [{"data": file_data} for file_data in self.finalized if file_data["folderId"] == folder_id]
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    pytest.importorskip("requests")
+    import dalux_api
+    from dalux_cache import DaluxDiscoveryCache
+
+    monkeypatch.setattr(dalux_api.time, "sleep", lambda seconds: None)
+    manager = dalux_api.DaluxUploadManager("key", cache=DaluxDiscoveryCache())
+    return manager
+
+
+FILES = {"00_Navodila": [(f"doc{i}.pdf", bytes([i]) * (100 + i)) for i in range(5)]}
+
+
+def test_listing_failure_is_retried(manager):
+    manager.client = FakeDaluxClient(listing_failures=1)
+    results = manager.bulk_upload_from_structure("P1", FILES, verify=True, reupload_mismatched=True)
+
+    assert results["success"] == 5
+    assert results["verified"] == 5
+    assert len(manager.client.finalized) == 5
+
+
+def test_persistent_listing_failure_does_not_reupload(manager):
+    manager.client = FakeDaluxClient(listing_failures=100)
+    results = manager.bulk_upload_from_structure("P1", FILES, verify=True, reupload_mismatched=True)
+
+    assert (results["success"], results["failed"]) == (5, 0)
+    assert results["unverified"] == 5
+    assert results["mismatched"] == 0
+    assert len(manager.client.finalized) == 5
+
+
+def test_truncated_upload_is_reuploaded(manager):
+    manager.client = FakeDaluxClient(truncate={"doc2.pdf"})
+    results = manager.bulk_upload_from_structure("P1", FILES, verify=True, reupload_mismatched=True)
+
+    assert results["success"] == 5
+    assert results["reuploaded"] == 1
+    assert len(manager.client.finalized) == 6
+
+
+def test_cancelled_batch_stops_and_skips_verification(manager):
+    cancel = threading.Event()
+    manager.client = FakeDaluxClient()
+    upload = manager.client.upload_complete_file
+
+    def upload_then_cancel(*args, **kwargs):
+        cancel.set()
+        return upload(*args, **kwargs)
+
+    manager.client.upload_complete_file = upload_then_cancel
+    results = manager.bulk_upload_from_structure("P1", FILES, verify=True, cancel_event=cancel)
+
+    assert (results["success"], results["cancelled"]) == (1, 4)
+    assert "verified" not in results
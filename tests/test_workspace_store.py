@@ -0,0 +1,82 @@
+import io
+import os
+
+import file_processing
+from workspace_store import WorkspaceStore, session_workspace_id
+
+
+def _add(store, workspace_id, name, content=b"data"):
+    return store.add_file(workspace_id, name, io.BytesIO(content), file_processing.build_file_entry(name))
+
+
+def test_sessions_of_a_project_do_not_share_files(tmp_path):
+    store = WorkspaceStore(str(tmp_path))
+    first = session_workspace_id("P1", "a" * 32)
+    second = session_workspace_id("P1", "b" * 32)
+    _add(store, first, "a.pdf")
+    _add(store, second, "b.pdf")
+
+    store.clear(first)
+    assert store.list_files(first) == []
+    assert [f['original_name'] for f in store.list_files(second)] == ["b.pdf"]
+
+
+def test_claim_moves_queued_files_a_page_at_a_time(tmp_path):
+    store = WorkspaceStore(str(tmp_path))
+    session = session_workspace_id("P1", "a" * 32)
+    for i in range(5):
+        _add(store, "P1", f"{i}.pdf", content=bytes([i]))
+
+    claimed = store.claim_files("P1", session, limit=3)
+    assert [f['original_name'] for f in claimed] == ["0.pdf", "1.pdf", "2.pdf"]
+    assert store.count_files("P1") == 2
+    assert store.claim_files("P1", session_workspace_id("P1", "b" * 32), limit=3)[0]['original_name'] == "3.pdf"
+    assert store.count_files(session) == 3
+
+
+def test_claim_drops_duplicate_names(tmp_path):
+    store = WorkspaceStore(str(tmp_path))
+    session = session_workspace_id("P1", "a" * 32)
+    _add(store, session, "a.pdf", content=b"mine")
+    queued = _add(store, "P1", "a.pdf", content=b"watched")
+
+    assert store.claim_files("P1", session) == []
+    assert store.count_files("P1") == 0
+    assert not store.blobs.exists(queued['blob_id'])
+
+
+def test_blob_deleted_while_spooling_is_put_back(tmp_path):
+    store = WorkspaceStore(str(tmp_path))
+    first = _add(store, "P1@a", "a.pdf", content=b"same")
+    spool = store.blobs.spool
+
+    def spool_then_delete(stream):
+        spooled = spool(stream)
+        # Another session removes the only other file with this content
+        store.delete_file("P1@a", first['file_id'])
+        return spooled
+
+    store.blobs.spool = spool_then_delete
+    second = _add(store, "P1@b", "b.pdf", content=b"same")
+    assert second['blob_id'] == first['blob_id']
+    with open(second['blob_path'], "rb") as f:
+        assert f.read() == b"same"
+    assert os.listdir(os.path.join(str(tmp_path), "blobs", "tmp")) == []
+
+
+def test_shared_blob_survives_deleting_one_file(tmp_path):
+    store = WorkspaceStore(str(tmp_path))
+    first = _add(store, "P1@a", "a.pdf", content=b"same")
+    second = _add(store, "P1@b", "b.pdf", content=b"same")
+    store.clear("P1@a")
+    assert store.blobs.exists(second['blob_id'])
+    store.delete_file("P1@b", second['file_id'])
+    assert not store.blobs.exists(first['blob_id'])
+
+
+def test_iter_files_pages_through_the_workspace(tmp_path):
+    store = WorkspaceStore(str(tmp_path))
+    for i in range(7):
+        _add(store, "P1@a", f"{i}.pdf", content=bytes([i]))
+    names = [f['original_name'] for f in store.iter_files("P1@a", page_size=3)]
+    assert names == [f"{i}.pdf" for i in range(7)]
@@ -0,0 +1,311 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from blob_store import Content
+
+
+JOB_DIR = os.environ.get("DALUX_JOB_DIR", ".upload_jobs")
+MAX_CONCURRENT_JOBS = int(os.environ.get("DALUX_MAX_CONCURRENT_JOBS", "2"))
+# Seconds the files of a failed or cancelled job stay in memory for a retry
+PAYLOAD_TTL = float(os.environ.get("DALUX_JOB_PAYLOAD_TTL", "1800"))
+# Finished jobs are forgotten after this many seconds, keeping at most MAX_FINISHED_JOBS
+JOB_RETENTION = float(os.environ.get("DALUX_JOB_RETENTION", str(7 * 24 * 3600)))
+MAX_FINISHED_JOBS = int(os.environ.get("DALUX_MAX_FINISHED_JOBS", "200"))
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def owner_key(api_key: str) -> str:
+    """Stable, non-reversible owner id so a user can find their jobs again."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+class UploadJobManager:
+    """In-process manager for Dalux uploads that run in the background.
+
+    Jobs run on a shared thread pool, so the ``max_concurrent`` cap applies
+    across all Streamlit sessions. Job status and results are written to
+    ``job_dir`` as JSON; the API key and file contents are only kept in
+    memory, so jobs loaded after a restart can be viewed but not retried.
+    A finished job keeps them for ``payload_ttl`` seconds if it has files
+    left to retry, and releases them at once otherwise or when retried.
+    Finished jobs are removed from memory and ``job_dir`` after
+    ``retention`` seconds, or earlier once more than ``max_finished`` of
+    them have piled up (oldest first).
+    """
+
+    def __init__(self, job_dir: str = JOB_DIR, max_concurrent: int = MAX_CONCURRENT_JOBS,
+                 payload_ttl: float = PAYLOAD_TTL, retention: float = JOB_RETENTION,
+                 max_finished: int = MAX_FINISHED_JOBS):
+        self.job_dir = job_dir
+        self.max_concurrent = max_concurrent
+        self.payload_ttl = payload_ttl
+        self.retention = retention
+        self.max_finished = max_finished
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent,
+                                           thread_name_prefix="dalux-upload")
+        self.jobs: Dict[str, Dict] = {}
+        self._payloads: Dict[str, Dict] = {}
+        # Job id -> monotonic time after which its payload is dropped
+        self._payload_expiry: Dict[str, float] = {}
+        self._cancel_events: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        os.makedirs(job_dir, exist_ok=True)
+        self._load_jobs()
+
+    def _load_jobs(self):
+        for name in os.listdir(self.job_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.job_dir, name), encoding="utf-8") as f:
+                    job = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if job.get("status") in ACTIVE_STATUSES:
+                # The process that ran this job is gone
+                job["status"] = "interrupted"
+                job["finished_at"] = time.time()
+                self._persist(job)
+            self.jobs[job["id"]] = job
+        self._prune_jobs()
+
+    def _persist(self, job: Dict):
+        path = os.path.join(self.job_dir, f"{job['id']}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+
+    def _finish(self, job_id: str, retryable: bool):
+        """Release a finished job's payload, or keep it for a retry until it expires.
+
+        Call with ``self._lock`` held.
+        """
+        self._cancel_events.pop(job_id, None)
+        if retryable and job_id in self._payloads:
+            self._payload_expiry[job_id] = time.monotonic() + self.payload_ttl
+        else:
+            self._release(job_id)
+
+    def _release(self, job_id: str):
+        self._payloads.pop(job_id, None)
+        self._payload_expiry.pop(job_id, None)
+
+    def _expire_payloads(self):
+        """Drop payloads whose retry window has passed; call with ``self._lock`` held"""
+        now = time.monotonic()
+        for job_id in [job_id for job_id, expiry in self._payload_expiry.items() if expiry <= now]:
+            self._release(job_id)
+
+    def _prune_jobs(self):
+        """Forget finished jobs past the retention; call with ``self._lock`` held"""
+        finished = sorted(
+            (job for job in self.jobs.values() if job["status"] not in ACTIVE_STATUSES),
+            key=lambda job: job.get("finished_at") or job["created_at"]
+        )
+        cutoff = time.time() - self.retention
+        expired = [job for job in finished if (job.get("finished_at") or job["created_at"]) < cutoff]
+        excess = max(0, len(finished) - self.max_finished)
+        for job in finished[:max(len(expired), excess)]:
+            self.jobs.pop(job["id"], None)
+            self._release(job["id"])
+            try:
+                os.remove(os.path.join(self.job_dir, f"{job['id']}.json"))
+            except FileNotFoundError:
+                pass
+
+    def submit(self, api_key: str, project_number: str,
+               files_dict: Dict[str, List[Tuple[str, Content]]],
+               file_area_name: Optional[str] = None) -> str:
+        return self.submit_multi(
+            api_key, {project_number: files_dict},
+            file_area_names={project_number: file_area_name} if file_area_name else None
+        )
+
+    def submit_multi(self, api_key: str,
+                     files_by_project: Dict[str, Dict[str, List[Tuple[str, Content]]]],
+                     file_area_names: Optional[Dict[str, str]] = None,
+                     verify: bool = False, reupload_mismatched: bool = False,
+                     provision_folders: bool = False) -> str:
+        """Submit one job covering files of several projects.
+
+        ``file_area_names`` picks the file area per project number; projects
+        without an entry upload into their first file area. ``verify`` checks
+        every upload against the remote file metadata afterwards;
+        ``provision_folders`` creates missing template folders beforehand.
+        """
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "id": job_id,
+            "owner": owner_key(api_key),
+            "project_number": ", ".join(files_by_project),
+            "projects": list(files_by_project),
+            "status": "queued",
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "total_files": sum(
+                len(files) for files_dict in files_by_project.values() for files in files_dict.values()
+            ),
+            "progress": None,
+            "results": None,
+            "error": None,
+        }
+        with self._lock:
+            self._expire_payloads()
+            self._prune_jobs()
+            self.jobs[job_id] = job
+            self._payloads[job_id] = {
+                "api_key": api_key,
+                "files_by_project": files_by_project,
+                "file_area_names": dict(file_area_names or {}),
+                "verify": verify,
+                "reupload_mismatched": reupload_mismatched,
+                "provision_folders": provision_folders,
+            }
+            self._cancel_events[job_id] = threading.Event()
+            self._persist(job)
+        self.executor.submit(self._run, job_id)
+        return job_id
+
+    def _run(self, job_id: str):
+        with self._lock:
+            cancel_event = self._cancel_events.get(job_id)
+            if cancel_event is None or cancel_event.is_set():
+                # Cancelled while queued; cancel() already finished it
+                return
+            payload = self._payloads[job_id]
+            # Under the same lock, so cancel() sees either queued or running
+            self.jobs[job_id].update(status="running", started_at=time.time())
+            self._persist(self.jobs[job_id])
+
+        last_saved = [0.0]
+
+        def on_progress(event: Dict):
+            # Keep the in-memory copy live; write to disk at most once a second
+            with self._lock:
+                self.jobs[job_id]["progress"] = event
+                if time.monotonic() - last_saved[0] >= 1.0:
+                    last_saved[0] = time.monotonic()
+                    self._persist(self.jobs[job_id])
+
+        try:
+            try:
+                from dalux_async import bulk_upload_multi_project_sync
+            except ImportError:
+                bulk_upload_multi_project_sync = None
+            if bulk_upload_multi_project_sync is not None:
+                results = bulk_upload_multi_project_sync(
+                    payload["api_key"], payload["files_by_project"],
+                    cancel_event=cancel_event, progress_callback=on_progress,
+                    file_area_names=payload["file_area_names"],
+                    verify=payload["verify"],
+                    reupload_mismatched=payload["reupload_mismatched"],
+                    provision_folders=payload["provision_folders"]
+                )
+            else:
+                from dalux_api import DaluxUploadManager
+                manager = DaluxUploadManager(payload["api_key"],
+                                             file_area_names=payload["file_area_names"])
+                results = manager.bulk_upload_multi_project(
+                    payload["files_by_project"], progress_callback=on_progress,
+                    verify=payload["verify"],
+                    reupload_mismatched=payload["reupload_mismatched"],
+                    provision_folders=payload["provision_folders"],
+                    cancel_event=cancel_event
+                )
+            # Upload results may hold non-serialisable API responses
+            results = json.loads(json.dumps(results, default=str))
+            status = "cancelled" if cancel_event.is_set() else "completed"
+            fields = {"status": status, "results": results}
+            retryable = bool(results.get("failed") or results.get("cancelled"))
+        except Exception as e:
+            fields = {"status": "failed", "error": str(e)}
+            retryable = True
+        with self._lock:
+            self.jobs[job_id].update(fields, finished_at=time.time())
+            self._persist(self.jobs[job_id])
+            self._finish(job_id, retryable)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list_jobs(self, api_key: str) -> List[Dict]:
+        owner = owner_key(api_key)
+        with self._lock:
+            jobs = [dict(job) for job in self.jobs.values() if job["owner"] == owner]
+        return sorted(jobs, key=lambda job: job["created_at"], reverse=True)
+
+    def cancel(self, job_id: str) -> bool:
+        with self._lock:
+            job = self.jobs.get(job_id)
+            event = self._cancel_events.get(job_id)
+            if not job or not event or job["status"] not in ACTIVE_STATUSES:
+                return False
+            event.set()
+            if job["status"] == "queued":
+                job.update(status="cancelled", finished_at=time.time())
+                self._persist(job)
+                self._finish(job_id, retryable=True)
+        return True
+
+    def _can_retry(self, job_id: str) -> bool:
+        self._expire_payloads()
+        job = self.jobs.get(job_id)
+        return (
+            job is not None
+            and job_id in self._payloads
+            and job["status"] not in ACTIVE_STATUSES
+        )
+
+    def can_retry(self, job_id: str) -> bool:
+        with self._lock:
+            return self._can_retry(job_id)
+
+    def retry(self, job_id: str) -> Optional[str]:
+        """Resubmit the files of ``job_id`` that did not upload successfully.
+
+        The retry job takes over the remaining files, so the original job's
+        payload is released.
+        """
+        with self._lock:
+            if not self._can_retry(job_id):
+                return None
+            results = self.jobs[job_id].get("results")
+            payload = self._payloads[job_id]
+            self._release(job_id)
+
+        files_by_project = payload["files_by_project"]
+        if results:
+            succeeded = {
+                (detail.get("project"), detail["folder"], detail["file"])
+                for detail in results["details"]
+                if detail["status"] == "success"
+            }
+            remaining = {}
+            for project_number, files_dict in files_by_project.items():
+                for folder_path, files in files_dict.items():
+                    pending = [
+                        (filename, content) for filename, content in files
+                        if (project_number, folder_path, filename) not in succeeded
+                    ]
+                    if pending:
+                        remaining.setdefault(project_number, {})[folder_path] = pending
+            files_by_project = remaining
+            if not files_by_project:
+                return None
+
+        return self.submit_multi(payload["api_key"], files_by_project,
+                                 file_area_names=payload["file_area_names"],
+                                 verify=payload["verify"],
+                                 reupload_mismatched=payload["reupload_mismatched"],
+                                 provision_folders=payload["provision_folders"])
@@ -0,0 +1,166 @@
+"""Dry-run plan of a ZIP export or Dalux upload.
+
+The plan is built from file metadata only, no content is read, so a
+batch of thousands of files can be reviewed in seconds. Each row maps an
+original file to its generated name, target path, Dalux folder id and
+the action that would be taken:
+
+- ``upload``: the file would be written/uploaded
+- ``skip``: required fields or the target folder are missing
+- ``collide``: another file in the batch, or an existing Dalux file,
+  has the same target path
+"""
+import csv
+import io
+import json
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import file_processing
+
+
+PLAN_FIELDS = ("project", "original_name", "new_name", "target_path",
+               "folder_id", "size", "action", "reason")
+
+FolderIdResolver = Callable[[str, str], str]
+ExistingNames = Callable[[str, str], Set[str]]
+
+
+def build_plan(files: List[Dict], projekt_sifra: str,
+               folder_id_for: Optional[FolderIdResolver] = None,
+               existing_names: Optional[ExistingNames] = None) -> List[Dict]:
+    """Plan rows for ``files`` in their current order.
+
+    ``folder_id_for(project, folder_path)`` resolves the Dalux folder and
+    may raise if it does not exist; ``existing_names(project, folder_id)``
+    lists the names already in a Dalux folder. Both are optional, so a
+    plan can be made offline. Each is called once per distinct folder.
+    """
+    folder_ids: Dict[Tuple[str, str], Tuple[str, str]] = {}
+    remote: Dict[Tuple[str, str], Set[str]] = {}
+    plan = []
+    by_target: Dict[Tuple[str, str], List[Dict]] = {}
+
+    for file_data in files:
+        project = file_processing.file_project(file_data, projekt_sifra)
+        new_name = file_processing.generate_new_filename(file_data, projekt_sifra)
+        folder_path = file_data.get('target_subfolder', '')
+        row = {
+            "project": project,
+            "original_name": file_data['original_name'],
+            "new_name": new_name,
+            "target_path": f"{folder_path}/{new_name}" if folder_path else "",
+            "folder_id": "",
+            "size": file_processing.entry_size(file_data),
+            "action": "upload",
+            "reason": "",
+        }
+        plan.append(row)
+
+        if not file_processing.is_file_complete(file_data):
+            row.update(action="skip", reason="Missing required fields")
+            continue
+
+        if folder_id_for is not None:
+            key = (project, folder_path)
+            if key not in folder_ids:
+                try:
+                    folder_ids[key] = (folder_id_for(project, folder_path), "")
+                except Exception as e:
+                    folder_ids[key] = ("", str(e))
+            row["folder_id"], error = folder_ids[key]
+            if error:
+                row.update(action="skip", reason=error)
+                continue
+
+        by_target.setdefault((project, row["target_path"]), []).append(row)
+
+        if existing_names is not None and row["folder_id"]:
+            key = (project, row["folder_id"])
+            if key not in remote:
+                try:
+                    remote[key] = existing_names(project, row["folder_id"])
+                except Exception:
+                    remote[key] = set()
+            if new_name in remote[key]:
+                row.update(action="collide", reason="Already exists in Dalux")
+
+    for rows in by_target.values():
+        if len(rows) > 1:
+            for row in rows:
+                others = ", ".join(r["original_name"] for r in rows if r is not row)
+                row.update(action="collide", reason=f"Same target as {others}")
+
+    return plan
+
+
+def dalux_resolvers(manager, file_area_names: Optional[Dict[str, str]] = None
+                    ) -> Tuple[FolderIdResolver, ExistingNames]:
+    """Resolvers backed by a DaluxUploadManager and its discovery cache.
+
+    ``file_area_names`` picks the file area per project for this plan
+    only, so a manager shared between sessions is left unchanged.
+    """
+    file_area_names = file_area_names or {}
+
+    def folder_id_for(project: str, folder_path: str) -> str:
+        project_id, file_area_id = manager.setup_project(project, file_area_names.get(project))
+        return manager.get_folder_id(project_id, file_area_id, folder_path)
+
+    def existing_names(project: str, folder_id: str) -> Set[str]:
+        project_id, file_area_id = manager.setup_project(project, file_area_names.get(project))
+        return {
+            (item.get("data") or item).get("fileName")
+            for item in manager.get_folder_files(project_id, file_area_id, folder_id)
+        }
+
+    return folder_id_for, existing_names
+
+
+def plan_summary(plan: List[Dict]) -> Dict[str, int]:
+    summary = {"upload": 0, "skip": 0, "collide": 0}
+    for row in plan:
+        summary[row["action"]] += 1
+    summary["upload_bytes"] = sum(row["size"] for row in plan if row["action"] == "upload")
+    return summary
+
+
+def plan_to_csv(plan: List[Dict]) -> str:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=PLAN_FIELDS)
+    writer.writeheader()
+    writer.writerows(plan)
+    return buffer.getvalue()
+
+
+def plan_to_json(plan: List[Dict]) -> str:
+    return json.dumps({"summary": plan_summary(plan), "files": plan}, ensure_ascii=False, indent=2)
+
+
+def load_plan(text: str) -> List[Dict]:
+    """Read a plan exported as JSON or CSV"""
+    if text.lstrip().startswith("{"):
+        return json.loads(text)["files"]
+    rows = list(csv.DictReader(io.StringIO(text)))
+    for row in rows:
+        row["size"] = int(row.get("size") or 0)
+    return rows
+
+
+def diff_plans(old: List[Dict], new: List[Dict]) -> Dict[str, List[Dict]]:
+    """Rows added, removed and changed between two plans, keyed by project and original name"""
+    old_rows = {(row["project"], row["original_name"]): row for row in old}
+    new_rows = {(row["project"], row["original_name"]): row for row in new}
+    changed = []
+    for key in new_rows.keys() & old_rows.keys():
+        changes = {
+            field: [old_rows[key].get(field), new_rows[key].get(field)]
+            for field in PLAN_FIELDS
+            if str(old_rows[key].get(field, "")) != str(new_rows[key].get(field, ""))
+        }
+        if changes:
+            changed.append({"project": key[0], "original_name": key[1], "changes": changes})
+    return {
+        "added": [row for key, row in new_rows.items() if key not in old_rows],
+        "removed": [row for key, row in old_rows.items() if key not in new_rows],
+        "changed": sorted(changed, key=lambda row: (row["project"], row["original_name"])),
+    }
@@ -0,0 +1,218 @@
+import hashlib
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from blob_store import Content, iter_chunks
+
+
+ProgressCallback = Callable[[Dict], None]
+
+CHUNK_SIZE = 256 * 1024
+
+
+class UploadProgressTracker:
+    """Collects upload progress and emits it as event dicts to a callback.
+
+    Stage changes are always emitted; byte counts are throttled to one event
+    per ``min_interval`` seconds so a UI callback is not flooded per chunk.
+    Bytes are tracked per file, so a file that is sent again (a retried
+    request or a re-upload) replaces its count instead of adding to it.
+    """
+
+    def __init__(self, total_files: int, total_bytes: int,
+                 callback: Optional[ProgressCallback] = None,
+                 min_interval: float = 0.25):
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.callback = callback
+        self.min_interval = min_interval
+        self.bytes_sent = 0
+        self.files_done = 0
+        self.started_at = time.monotonic()
+        self._last_emit = 0.0
+        self._file_bytes: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> Dict:
+        elapsed = max(time.monotonic() - self.started_at, 1e-6)
+        rate = self.bytes_sent / elapsed
+        remaining = max(self.total_bytes - self.bytes_sent, 0)
+        return {
+            "bytes_sent": self.bytes_sent,
+            "total_bytes": self.total_bytes,
+            "files_done": self.files_done,
+            "total_files": self.total_files,
+            "elapsed_s": elapsed,
+            "mb_per_s": rate / (1024 * 1024),
+            "eta_s": remaining / rate if rate > 0 else None,
+        }
+
+    def _emit(self, event: Dict):
+        self._last_emit = time.monotonic()
+        if self.callback is not None:
+            self.callback({**self.snapshot(), **event})
+
+    def stage(self, filename: str, folder: str, stage: str, error: str = ""):
+        """Report a file entering ``stage`` (slot, upload, finalize, success, failed, cancelled)."""
+        if stage in ("success", "failed", "cancelled"):
+            self.files_done += 1
+        event = {"file": filename, "folder": folder, "stage": stage}
+        if error:
+            event["error"] = error
+        self._emit(event)
+
+    def set_file_bytes(self, filename: str, folder: str, sent: int):
+        """Report ``sent`` bytes of a file uploaded so far in its current attempt"""
+        with self._lock:
+            key = (folder, filename)
+            self.bytes_sent += sent - self._file_bytes.get(key, 0)
+            self._file_bytes[key] = sent
+            # Clamped in case a file is larger than announced
+            self.bytes_sent = min(self.bytes_sent, self.total_bytes)
+        if time.monotonic() - self._last_emit >= self.min_interval:
+            self._emit({"file": filename, "folder": folder, "stage": "upload"})
+
+
+class MultiProjectProgress:
+    """Merges the progress events of concurrently uploading projects.
+
+    Each project's uploader gets its own callback from ``for_project``; the
+    merged event (summed bytes and files, tagged with the project of the
+    latest event) is passed on to ``callback``.
+    """
+
+    def __init__(self, callback: Optional[ProgressCallback] = None):
+        self.callback = callback
+        self._latest: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def for_project(self, project_number: str,
+                    files_dict: Dict[str, List[Tuple[str, Content]]]) -> ProgressCallback:
+        self._latest[project_number] = {
+            "bytes_sent": 0,
+            "total_bytes": sum(len(content) for files in files_dict.values() for _, content in files),
+            "files_done": 0,
+            "total_files": sum(len(files) for files in files_dict.values()),
+            "elapsed_s": 0.0,
+            "mb_per_s": 0.0,
+        }
+
+        def on_event(event: Dict):
+            with self._lock:
+                self._latest[project_number] = event
+                merged = self._merge()
+            if self.callback is not None:
+                self.callback({**event, **merged, "project": project_number})
+
+        return on_event
+
+    def _merge(self) -> Dict:
+        snapshots = self._latest.values()
+        merged = {
+            key: sum(snapshot[key] for snapshot in snapshots)
+            for key in ("bytes_sent", "total_bytes", "files_done", "total_files", "mb_per_s")
+        }
+        merged["elapsed_s"] = max(snapshot["elapsed_s"] for snapshot in snapshots)
+        rate = merged["mb_per_s"] * 1024 * 1024
+        remaining = max(merged["total_bytes"] - merged["bytes_sent"], 0)
+        merged["eta_s"] = remaining / rate if rate > 0 else None
+        return merged
+
+
+def failed_project_results(files_dict: Dict[str, List[Tuple[str, Content]]], error: str) -> Dict:
+    """Results for a project whose setup failed before any file was uploaded"""
+    details = [
+        {"file": filename, "folder": folder_path, "status": "failed", "error": error}
+        for folder_path, files in files_dict.items()
+        for filename, _ in files
+    ]
+    return {"success": 0, "failed": len(details), "cancelled": 0,
+            "error": error, "details": details}
+
+
+def merge_project_results(project_results: Union[Dict[str, Dict], List[Dict]]) -> Dict:
+    """Combine bulk upload results into one report.
+
+    Takes per-project results keyed by project number, or a list of
+    reports merged before (e.g. one per shard; shards may cover the same
+    project). Top-level counts and details span all of them, each detail
+    tagged with its project; ``projects`` sums the per-project accounting.
+    """
+    if isinstance(project_results, dict):
+        project_results = [
+            {**results, "projects": {project_number: results},
+             "details": [{**detail, "project": project_number} for detail in results["details"]]}
+            for project_number, results in project_results.items()
+        ]
+    merged = {"success": 0, "failed": 0, "cancelled": 0, "details": [], "projects": {}}
+    for results in project_results:
+        for key in ("success", "failed", "cancelled"):
+            merged[key] += results.get(key, 0)
+        # Only present when the upload was verified or folders provisioned
+        for key in ("verified", "unverified", "mismatched", "reuploaded", "folders_created"):
+            if key in results:
+                merged[key] = merged.get(key, 0) + results[key]
+        merged["details"].extend(results["details"])
+        for project_number, counts in results.get("projects", {}).items():
+            project = merged["projects"].setdefault(
+                project_number, {"success": 0, "failed": 0, "cancelled": 0, "error": None}
+            )
+            for key in ("success", "failed", "cancelled"):
+                project[key] += counts.get(key, 0)
+            project["error"] = project["error"] or counts.get("error")
+    return merged
+
+
+class ProgressReader:
+    """Request body that yields ``content`` in chunks and reports progress.
+
+    ``content`` may be bytes, sliced without copying, or a BlobReader, read
+    one chunk at a time. Each chunk is a fresh object because an async
+    transport may still hold it after asking for the next one. Defines
+    ``__len__`` so requests sends a Content-Length instead of switching to
+    chunked transfer encoding. After each chunk ``on_chunk`` gets the bytes
+    sent so far in this pass, so a retried request, which iterates again
+    from the start, reports from zero rather than on top of the failed
+    attempt. With ``on_digest`` the SHA-256 of the chunks is computed as
+    they are sent and reported after the last one; a retried request
+    recomputes it from the start.
+    """
+
+    def __init__(self, content: Content, on_chunk: Optional[Callable[[int], None]] = None,
+                 chunk_size: int = CHUNK_SIZE,
+                 on_digest: Optional[Callable[[str], None]] = None):
+        self.content = content
+        self.on_chunk = on_chunk
+        self.chunk_size = chunk_size
+        self.on_digest = on_digest
+
+    def __len__(self) -> int:
+        return len(self.content)
+
+    def __iter__(self) -> Iterator[Union[bytes, memoryview]]:
+        hasher = hashlib.sha256() if self.on_digest is not None else None
+        sent = 0
+        for chunk in iter_chunks(self.content, self.chunk_size):
+            if hasher is not None:
+                hasher.update(chunk)
+            yield chunk
+            sent += len(chunk)
+            if self.on_chunk is not None:
+                self.on_chunk(sent)
+        if hasher is not None:
+            self.on_digest(hasher.hexdigest())
+
+
+def format_progress(event: Dict) -> str:
+    """Human readable one-line summary of a progress event for the UI."""
+    done_mb = event["bytes_sent"] / (1024 * 1024)
+    total_mb = event["total_bytes"] / (1024 * 1024)
+    eta = event.get("eta_s")
+    eta_text = f"{int(eta // 60)}:{int(eta % 60):02d}" if eta is not None else "--:--"
+    project = f"[{event['project']}] " if event.get('project') else ""
+    return (
+        f"{project}{event['files_done']}/{event['total_files']} datotek · "
+        f"{done_mb:.1f}/{total_mb:.1f} MB · {event['mb_per_s']:.2f} MB/s · "
+        f"ETA {eta_text} · {event.get('file', '')} ({event.get('stage', '')})"
+    )
@@ -0,0 +1,105 @@
+from typing import Callable, Dict, List, Optional
+
+
+class UploadVerifier:
+    """Checks uploaded files against the remote file metadata.
+
+    ``expect`` is called for every uploaded file and returns the
+    ``on_digest`` callback for the upload, so the SHA-256 is computed while
+    the bytes are streamed out instead of by reading the file again. After
+    the batch, each folder's remote listing is fetched once and passed to
+    ``check``.
+
+    Only a size or checksum difference is a mismatch. A folder that could
+    not be listed, or a file missing from the listing, leaves the upload
+    ``unverified``: it still counts as a success and is never re-uploaded.
+    """
+
+    def __init__(self):
+        self.pending: Dict[str, List[Dict]] = {}
+
+    def expect(self, detail: Dict, size: int) -> Callable[[str], None]:
+        item = {"detail": detail, "size": size, "sha256": None}
+        self.pending.setdefault(detail["folder"], []).append(item)
+
+        def on_digest(sha256: str):
+            item["sha256"] = sha256
+            detail["sha256"] = sha256
+
+        return on_digest
+
+    def folders(self) -> List[str]:
+        """Folders with at least one successfully uploaded file"""
+        return [
+            folder_path for folder_path, items in self.pending.items()
+            if any(item["detail"].get("status") == "success" for item in items)
+        ]
+
+    def mark_unverified(self, folder_path: str, reason: str):
+        """Flag the successful uploads of a folder that could not be checked"""
+        for item in self.pending.get(folder_path, []):
+            if item["detail"].get("status") == "success":
+                item["detail"].update({"unverified": True, "verify_error": reason})
+
+    def check(self, folder_path: str, remote_files: List[Dict]) -> List[Dict]:
+        """Compare one folder's uploads with its remote listing; returns the mismatches"""
+        by_id, by_name = {}, {}
+        for remote in remote_files:
+            data = remote.get("data", remote)
+            by_id[data.get("fileId")] = data
+            # Later listing entries are newer revisions of the same name
+            by_name[data.get("fileName")] = data
+
+        mismatches = []
+        for item in self.pending.get(folder_path, []):
+            detail = item["detail"]
+            if detail.get("status") != "success":
+                continue
+            file_id = ((detail.get("result") or {}).get("data") or {}).get("fileId")
+            remote = by_id.get(file_id) if file_id else None
+            if remote is None:
+                remote = by_name.get(detail["file"])
+            if remote is None:
+                # The listing may lag behind finalize; not proof of a bad upload
+                detail.update({"unverified": True, "verify_error": "Remote file not found"})
+                continue
+            error = check_remote_file(remote, item["size"], item["sha256"])
+            if error:
+                mismatches.append({**item, "error": error})
+            else:
+                detail["verified"] = True
+                detail.pop("unverified", None)
+                detail.pop("verify_error", None)
+        return mismatches
+
+
+def check_remote_file(remote: Optional[Dict], size: int, sha256: Optional[str]) -> str:
+    """Empty string if ``remote`` matches the uploaded bytes, otherwise the reason.
+
+    Size is always compared; the hash only when the remote metadata has one.
+    """
+    if remote is None:
+        return "Remote file not found"
+    remote_size = remote.get("fileSize")
+    if remote_size is not None and int(remote_size) != size:
+        return f"Size mismatch: remote {remote_size} B, local {size} B"
+    remote_hash = remote.get("sha256")
+    if remote_hash and sha256 and remote_hash.lower() != sha256:
+        return "Checksum mismatch"
+    return ""
+
+
+def mark_mismatches(results: Dict, mismatches: List[Dict]):
+    """Turn verified-bad uploads into failures so they are retried"""
+    for item in mismatches:
+        detail = item["detail"]
+        detail.update({"status": "failed", "error": f"Verification failed: {item['error']}"})
+        detail.pop("verified", None)
+        results["success"] -= 1
+        results["failed"] += 1
+    results["mismatched"] = results.get("mismatched", 0) + len(mismatches)
+    results["verified"] = sum(1 for detail in results["details"] if detail.get("verified"))
+    results["unverified"] = sum(
+        1 for detail in results["details"]
+        if detail.get("unverified") and detail.get("status") == "success"
+    )
@@ -0,0 +1,260 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import BinaryIO, Dict, Iterator, List, Optional
+
+from blob_store import BlobStore
+
+
+WORKSPACE_DIR = os.environ.get("WORKSPACE_DIR", ".workspace")
+
+# Queued files taken into a session workspace at once
+CLAIM_PAGE_SIZE = 200
+
+# Rows read per query when a whole workspace is listed
+LIST_PAGE_SIZE = 500
+
+# Metadata columns that the edit form may change one at a time
+EDITABLE_FIELDS = ("projekt_sifra", "tip", "faza", "lok", "ime", "datum", "target_subfolder")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS workspaces (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    file_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    workspace_id TEXT NOT NULL REFERENCES workspaces(id),
+    original_name TEXT NOT NULL,
+    extension TEXT NOT NULL DEFAULT '',
+    tip TEXT NOT NULL DEFAULT '',
+    faza TEXT NOT NULL DEFAULT '',
+    lok TEXT NOT NULL DEFAULT '',
+    ime TEXT NOT NULL DEFAULT '',
+    datum TEXT NOT NULL DEFAULT '',
+    target_subfolder TEXT NOT NULL DEFAULT '',
+    projekt_sifra TEXT NOT NULL DEFAULT '',
+    blob_id TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    UNIQUE (workspace_id, original_name)
+);
+CREATE INDEX IF NOT EXISTS files_blob ON files (blob_id);
+"""
+
+# Columns added after the first release, as (table, column, definition)
+MIGRATIONS = (
+    ("files", "projekt_sifra", "TEXT NOT NULL DEFAULT ''"),
+)
+
+
+def session_workspace_id(project_number: str, session_token: str) -> str:
+    """Workspace of one app session for a project.
+
+    The project's own workspace (its number) is the review queue that the
+    folder watcher fills; sessions take files from it with ``claim_files``.
+    """
+    return f"{project_number}@{session_token}"
+
+
+class WorkspaceStore:
+    """Persistent workspace: file metadata in SQLite, contents in a BlobStore.
+
+    Every edit is written as a single-row update, so nothing is lost on a
+    restart and no whole-state dumps are needed. Listed entries carry the
+    blob path instead of the file bytes, which are only read when a file is
+    exported or uploaded.
+    """
+
+    def __init__(self, root: str = WORKSPACE_DIR):
+        root = os.path.abspath(root)
+        os.makedirs(root, exist_ok=True)
+        self.blobs = BlobStore(os.path.join(root, "blobs"))
+        # Shared by all Streamlit sessions, hence one connection behind a lock
+        self._conn = sqlite3.connect(os.path.join(root, "workspace.db"),
+                                     check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            for table, column, definition in MIGRATIONS:
+                columns = {row['name'] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def _entry(self, row: sqlite3.Row) -> Dict:
+        entry = {key: row[key] for key in row.keys()}
+        entry['blob_path'] = self.blobs.path(row['blob_id'])
+        return entry
+
+    def _touch(self, workspace_id: str):
+        now = time.time()
+        self._conn.execute(
+            "INSERT INTO workspaces (id, created_at, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET updated_at = excluded.updated_at",
+            (workspace_id, now, now)
+        )
+
+    def add_file(self, workspace_id: str, file_name: str, stream: BinaryIO,
+                 entry: Dict) -> Optional[Dict]:
+        """Spool ``stream`` to the blob store and insert ``entry``'s metadata.
+
+        Returns the stored entry, or None if the workspace already has a
+        file with that name.
+        """
+        with self._lock:
+            exists = self._conn.execute(
+                "SELECT 1 FROM files WHERE workspace_id = ? AND original_name = ?",
+                (workspace_id, file_name)
+            ).fetchone()
+        if exists:
+            return None
+
+        # Spooling is the slow part and runs unlocked. The blob is put in
+        # place under the lock together with its row, so a concurrent delete
+        # cannot remove it in between; if one already did, it is put back.
+        tmp_path, blob_id, size = self.blobs.spool(stream)
+        try:
+            with self._lock:
+                self.blobs.commit(tmp_path, blob_id)
+                with self._conn:
+                    self._touch(workspace_id)
+                    try:
+                        cursor = self._conn.execute(
+                            "INSERT INTO files (workspace_id, original_name, extension, tip, faza, lok, "
+                            "ime, datum, target_subfolder, projekt_sifra, blob_id, size) "
+                            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            (workspace_id, file_name, entry['extension'], entry['tip'], entry['faza'],
+                             entry['lok'], entry['ime'], entry['datum'], entry['target_subfolder'],
+                             entry.get('projekt_sifra', ''), blob_id, size)
+                        )
+                        row = self._conn.execute(
+                            "SELECT * FROM files WHERE file_id = ?", (cursor.lastrowid,)
+                        ).fetchone()
+                    except sqlite3.IntegrityError:
+                        row = None
+                if row is None:
+                    self._delete_orphans([blob_id])
+                    return None
+        finally:
+            self.blobs.discard(tmp_path)
+        return self._entry(row)
+
+    def update_file(self, workspace_id: str, file_id: int, **fields):
+        """Write only the changed metadata fields of one file."""
+        unknown = set(fields) - set(EDITABLE_FIELDS)
+        if unknown:
+            raise ValueError(f"Not editable: {', '.join(sorted(unknown))}")
+        if not fields:
+            return
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE files SET {assignments} WHERE workspace_id = ? AND file_id = ?",
+                (*fields.values(), workspace_id, file_id)
+            )
+            self._touch(workspace_id)
+
+    def delete_file(self, workspace_id: str, file_id: int):
+        with self._lock:
+            with self._conn:
+                row = self._conn.execute(
+                    "SELECT blob_id FROM files WHERE workspace_id = ? AND file_id = ?",
+                    (workspace_id, file_id)
+                ).fetchone()
+                if row is None:
+                    return
+                self._conn.execute("DELETE FROM files WHERE file_id = ?", (file_id,))
+                self._touch(workspace_id)
+            self._delete_orphans([row['blob_id']])
+
+    def clear(self, workspace_id: str):
+        """Remove all files of a workspace."""
+        with self._lock:
+            with self._conn:
+                blob_ids = [r['blob_id'] for r in self._conn.execute(
+                    "SELECT DISTINCT blob_id FROM files WHERE workspace_id = ?", (workspace_id,)
+                )]
+                self._conn.execute("DELETE FROM files WHERE workspace_id = ?", (workspace_id,))
+                self._touch(workspace_id)
+            self._delete_orphans(blob_ids)
+
+    def claim_files(self, source_id: str, workspace_id: str,
+                    limit: Optional[int] = None) -> List[Dict]:
+        """Move up to ``limit`` of the oldest files of ``source_id`` to ``workspace_id``.
+
+        Files whose name ``workspace_id`` already has are dropped as
+        duplicates. Returns the moved entries; a file is only ever moved to
+        one workspace, however many sessions claim at the same time.
+        """
+        with self._lock:
+            with self._conn:
+                rows = self._conn.execute(
+                    "SELECT file_id, blob_id FROM files WHERE workspace_id = ? ORDER BY file_id LIMIT ?",
+                    (source_id, -1 if limit is None else limit)
+                ).fetchall()
+                if not rows:
+                    return []
+                moved_ids = []
+                dropped_blobs = []
+                for row in rows:
+                    try:
+                        self._conn.execute("UPDATE files SET workspace_id = ? WHERE file_id = ?",
+                                           (workspace_id, row['file_id']))
+                        moved_ids.append(row['file_id'])
+                    except sqlite3.IntegrityError:
+                        self._conn.execute("DELETE FROM files WHERE file_id = ?", (row['file_id'],))
+                        dropped_blobs.append(row['blob_id'])
+                self._touch(source_id)
+                self._touch(workspace_id)
+                moved = [
+                    self._conn.execute("SELECT * FROM files WHERE file_id = ?", (file_id,)).fetchone()
+                    for file_id in moved_ids
+                ]
+            self._delete_orphans(dropped_blobs)
+        return [self._entry(row) for row in moved]
+
+    def _delete_orphans(self, blob_ids: List[str]):
+        """Delete the blobs that no file refers to any more.
+
+        Blobs are shared between workspaces with identical content. Call with
+        ``self._lock`` held and after the deleting transaction committed:
+        ``add_file`` puts blobs in place under the same lock, so a blob is
+        never deleted while a new row starts to use it.
+        """
+        for blob_id in blob_ids:
+            if self._conn.execute("SELECT 1 FROM files WHERE blob_id = ? LIMIT 1",
+                                  (blob_id,)).fetchone() is None:
+                self.blobs.delete(blob_id)
+
+    def count_files(self, workspace_id: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM files WHERE workspace_id = ?", (workspace_id,)
+            ).fetchone()[0]
+
+    def list_files(self, workspace_id: str, offset: int = 0,
+                   limit: Optional[int] = None) -> List[Dict]:
+        """Metadata entries in insertion order, without reading any content."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM files WHERE workspace_id = ? ORDER BY file_id LIMIT ? OFFSET ?",
+                (workspace_id, -1 if limit is None else limit, offset)
+            ).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def iter_files(self, workspace_id: str, page_size: int = LIST_PAGE_SIZE) -> Iterator[Dict]:
+        """All entries of a workspace, read ``page_size`` rows at a time.
+
+        The lock is released between pages, so listing a large workspace
+        does not hold up other sessions.
+        """
+        offset = 0
+        while True:
+            page = self.list_files(workspace_id, offset=offset, limit=page_size)
+            yield from page
+            if len(page) < page_size:
+                return
+            offset += page_size